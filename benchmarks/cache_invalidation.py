@@ -0,0 +1,165 @@
+"""Benchmark the latency the cache decorator adds to write endpoints.
+
+Runs the invalidations configured on `update_timer`, `delete_timer`, `patch_room` and `erase_post` against a
+simulated Redis that waits a fixed round-trip time for every command or pipeline, and compares:
+
+- sequential: one awaited command per key and per tag script call, as done before invalidations were batched
+- pipelined: every invalidation of the request in a single pipeline
+- deferred: the pipeline runs after the endpoint returns (`defer_invalidation=True`)
+
+Usage:
+    python -m benchmarks.cache_invalidation
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Any
+from unittest.mock import patch
+
+from src.app.core.utils import cache as cache_module
+from src.app.core.utils.cache import cache
+
+ROUND_TRIP_TIME = 0.0005
+REQUESTS = 200
+
+ENDPOINTS: dict[str, dict[str, Any]] = {
+    "update_timer": {
+        "key_prefix": "user_{current_user[id]}_timer_{timer_id}",
+        "resource_id_name": "timer_id",
+        "pattern_to_invalidate_extra": ["user_{current_user[id]}_timers:*"],
+    },
+    "delete_timer": {
+        "key_prefix": "user_{current_user[id]}_timer_{timer_id}",
+        "resource_id_name": "timer_id",
+        "to_invalidate_extra": {"user_{current_user[id]}_timers": "{current_user[id]}"},
+    },
+    "patch_room": {
+        "key_prefix": "{current_user[id]}_room_cache",
+        "resource_id_name": "id",
+        "pattern_to_invalidate_extra": ["{current_user[id]}_rooms:*"],
+    },
+    "erase_post": {
+        "key_prefix": "{username}_post_cache",
+        "resource_id_name": "id",
+        "to_invalidate_extra": {"{username}_posts": "{username}"},
+    },
+}
+
+ENDPOINT_KWARGS = {"current_user": {"id": 1}, "timer_id": 1, "id": 1, "username": "user"}
+
+
+class SimulatedScript:
+    def __init__(self, redis: "SimulatedRedis", source: str) -> None:
+        self.registered_client = redis
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    async def __call__(self, keys: list[str], args: list[Any], client: Any = None) -> list[bytes]:
+        await self.registered_client.round_trip()
+        return []
+
+
+class SimulatedPipeline:
+    def __init__(self, redis: "SimulatedRedis") -> None:
+        self.redis = redis
+        self.commands = 0
+
+    async def __aenter__(self) -> "SimulatedPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.commands = 0
+
+    def unlink(self, *keys: Any) -> None:
+        self.commands += 1
+
+    def evalsha(self, *args: Any) -> None:
+        self.commands += 1
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        await self.redis.round_trip()
+        return [1] + [[] for _ in range(self.commands - 1)]
+
+
+class SimulatedRedis:
+    """Minimal stand-in for `redis.asyncio.Redis` that sleeps for a round-trip time on every call."""
+
+    def __init__(self, round_trip_time: float) -> None:
+        self.round_trip_time = round_trip_time
+        self.round_trips = 0
+
+    async def round_trip(self) -> None:
+        self.round_trips += 1
+        await asyncio.sleep(self.round_trip_time)
+
+    async def delete(self, *keys: Any) -> int:
+        await self.round_trip()
+        return len(keys)
+
+    def register_script(self, source: str) -> SimulatedScript:
+        return SimulatedScript(self, source)
+
+    def pipeline(self, transaction: bool = True) -> SimulatedPipeline:
+        return SimulatedPipeline(self)
+
+
+async def sequential_invalidate(keys: list[str], tags: list[str], patterns: list[str]) -> None:
+    """Invalidation as done before batching: one awaited command per key, then one script call for the tags."""
+    client = cache_module.client
+    assert client is not None
+
+    for key in keys:
+        await client.delete(key)
+
+    tags_to_delete: dict[str, str] = {}
+    for tag in tags:
+        cache_module._add_tag(tags_to_delete, cache_module._tag_key(tag))
+    for pattern in patterns:
+        pattern_tag = cache_module._pattern_to_tag(pattern)
+        if pattern_tag is not None:
+            cache_module._add_tag(tags_to_delete, *pattern_tag)
+
+    if tags_to_delete:
+        script = cache_module._get_script(cache_module.INVALIDATE_TAGS_SCRIPT)
+        await script(keys=list(tags_to_delete), args=list(tags_to_delete.values()))
+
+
+async def endpoint(request: Any, **kwargs: Any) -> dict[str, str]:
+    return {"message": "updated"}
+
+
+class Request:
+    method = "PATCH"
+
+
+async def measure(options: dict[str, Any], redis: SimulatedRedis) -> tuple[float, float]:
+    decorated = cache(**options)(endpoint)
+    redis.round_trips = 0
+
+    started_at = time.perf_counter()
+    for _ in range(REQUESTS):
+        await decorated(Request(), **ENDPOINT_KWARGS)
+    elapsed = time.perf_counter() - started_at
+
+    await asyncio.gather(*cache_module._background_tasks)
+    return elapsed / REQUESTS * 1000, redis.round_trips / REQUESTS
+
+
+async def main() -> None:
+    redis = SimulatedRedis(ROUND_TRIP_TIME)
+    print(f"simulated round-trip time: {ROUND_TRIP_TIME * 1000:.1f} ms, {REQUESTS} requests per endpoint")
+    print(f"{'endpoint':>14} {'sequential':>14} {'pipelined':>14} {'deferred':>14}  (ms per request, round-trips)")
+
+    with patch.object(cache_module, "client", redis):
+        for name, options in ENDPOINTS.items():
+            with patch.object(cache_module, "_invalidate", sequential_invalidate):
+                sequential = await measure(options, redis)
+            pipelined = await measure(options, redis)
+            deferred = await measure({**options, "defer_invalidation": True}, redis)
+
+            columns = " ".join(f"{latency:>10.3f} ({trips:.0f})" for latency, trips in (sequential, pipelined))
+            print(f"{name:>14} {columns} {deferred[0]:>10.3f} ({deferred[1]:.0f})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""Benchmark building cache keys in the cache decorator hot path.
+
+Compares formatting the `read_timers` and `delete_timer` templates by parsing them with a regex on every request,
+as done before templates were compiled, with the `CacheKeyTemplate` objects built once at decoration time.
+
+Usage:
+    python -m benchmarks.cache_keys
+"""
+
+import re
+import timeit
+from typing import Any
+
+from src.app.core.utils.cache import CacheKeyTemplate, _compile_extra_id
+
+READ_TIMERS_KEY = "user_{current_user[id]}_timers:page_{page}:items_per_page:{items_per_page}"
+DELETE_TIMER_KEY = "user_{current_user[id]}_timer_{timer_id}"
+DELETE_TIMER_EXTRA = {"user_{current_user[id]}_timers": "{current_user[id]}"}
+
+KWARGS: dict[str, Any] = {"current_user": {"id": 42}, "timer_id": 7, "page": 1, "items_per_page": 10, "db": None}
+LEGACY_KWARGS: dict[str, Any] = {"current_user_id": 42, "timer_id": 7, "page": 1, "items_per_page": 10, "db": None}
+NUMBER = 200_000
+
+
+def legacy_format_prefix(prefix: str, kwargs: dict[str, Any]) -> str:
+    data_dict = {key: kwargs[key] for key in re.findall(r"{(.*?)}", prefix)}
+    return prefix.format(**data_dict)
+
+
+def legacy_read_timers() -> str:
+    prefix = "user_{current_user_id}_timers:page_{page}:items_per_page:{items_per_page}"
+    return f"{legacy_format_prefix(prefix, LEGACY_KWARGS)}:{LEGACY_KWARGS['current_user_id']}"
+
+
+def legacy_delete_timer() -> list[str]:
+    keys = [f"{legacy_format_prefix('user_{current_user_id}_timer_{timer_id}', LEGACY_KWARGS)}:7"]
+    for prefix, id_template in {"user_{current_user_id}_timers": "{current_user_id}"}.items():
+        id_name = re.findall(r"{(.*?)}", id_template)[0]
+        keys.append(f"{legacy_format_prefix(prefix, LEGACY_KWARGS)}:{LEGACY_KWARGS[id_name]}")
+    return keys
+
+
+read_timers_key = CacheKeyTemplate(READ_TIMERS_KEY)
+read_timers_id = CacheKeyTemplate("{current_user[id]}")
+delete_timer_key = CacheKeyTemplate(DELETE_TIMER_KEY)
+delete_timer_extra = [(CacheKeyTemplate(prefix), _compile_extra_id(id)) for prefix, id in DELETE_TIMER_EXTRA.items()]
+
+
+def compiled_read_timers() -> str:
+    return f"{read_timers_key.format(KWARGS)}:{read_timers_id.format(KWARGS)}"
+
+
+def compiled_delete_timer() -> list[str]:
+    keys = [f"{delete_timer_key.format(KWARGS)}:7"]
+    keys.extend(f"{prefix.format(KWARGS)}:{id.format(KWARGS)}" for prefix, id in delete_timer_extra)
+    return keys
+
+
+def main() -> None:
+    assert legacy_read_timers() == compiled_read_timers()
+    assert legacy_delete_timer() == compiled_delete_timer()
+
+    print(f"{'hot path':>14} {'regex':>10} {'compiled':>10}  (nanoseconds per request)")
+    for name, legacy, compiled in (
+        ("read_timers", legacy_read_timers, compiled_read_timers),
+        ("delete_timer", legacy_delete_timer, compiled_delete_timer),
+    ):
+        legacy_time = min(timeit.repeat(legacy, number=NUMBER, repeat=5)) / NUMBER * 1e9
+        compiled_time = min(timeit.repeat(compiled, number=NUMBER, repeat=5)) / NUMBER * 1e9
+        print(f"{name:>14} {legacy_time:>10.0f} {compiled_time:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
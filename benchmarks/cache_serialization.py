@@ -0,0 +1,111 @@
+"""Benchmark the cost of serving `read_timers` pages from the cache.
+
+Compares the JSON round-trip done by the cache decorator before raw responses (parse the cached JSON, validate
+it against the response model, serialize it again) with the raw bytes path (decode the entry, return the bytes).
+
+Usage:
+    python -m benchmarks.cache_serialization
+"""
+
+import json
+import timeit
+import uuid
+from datetime import UTC, datetime
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastcrud.paginated import PaginatedListResponse, paginated_response
+from pydantic import TypeAdapter
+
+from src.app.core.utils.cache import CacheEntry
+from src.app.core.utils.serializers import JsonSerializer, get_default_serializer
+from src.app.schemas.timer import TimerRead, TimerType
+
+PAGE_SIZES = (10, 100, 1000)
+response_adapter = TypeAdapter(PaginatedListResponse[TimerRead])
+
+
+def make_page(items_per_page: int) -> dict[str, Any]:
+    now = datetime.now(UTC)
+    timers = [
+        {
+            "id": i,
+            "room_id": 1,
+            "title": f"Session {i}",
+            "display_id": None,
+            "speaker": "Speaker Name",
+            "notes": "Some notes about this session",
+            "uuid": str(uuid.uuid4()),
+            "scheduled_start_time": None,
+            "scheduled_start_date": None,
+            "is_manual_start": True,
+            "duration_seconds": 600,
+            "timer_type": TimerType.COUNTDOWN,
+            "is_active": False,
+            "is_paused": False,
+            "is_finished": False,
+            "is_stopped": False,
+            "current_time_seconds": 0,
+            "started_at": None,
+            "paused_at": None,
+            "completed_at": None,
+            "show_title": True,
+            "show_speaker": True,
+            "show_notes": False,
+            "created_at": now,
+            "updated_at": None,
+            "deleted_at": None,
+            "is_deleted": False,
+        }
+        for i in range(items_per_page)
+    ]
+    return paginated_response(crud_data={"data": timers, "total_count": 5000}, page=1, items_per_page=items_per_page)
+
+
+def legacy_miss(page: dict[str, Any]) -> bytes:
+    serialized = json.dumps(jsonable_encoder(page))
+    result = json.loads(serialized)
+    return response_adapter.dump_json(response_adapter.validate_python(result))
+
+
+def legacy_hit(stored: bytes) -> bytes:
+    result = json.loads(stored.decode())
+    return response_adapter.dump_json(response_adapter.validate_python(result))
+
+
+def raw_miss(page: dict[str, Any], serializer: Any) -> bytes:
+    entry = CacheEntry(serializer.dumps(page), content_type=serializer.content_type)
+    entry.encode()
+    return bytes(entry.to_response().body)
+
+
+def raw_hit(stored: bytes) -> bytes:
+    return bytes(CacheEntry.decode(stored).to_response().body)
+
+
+def measure(func: Any, *args: Any) -> float:
+    timer = timeit.Timer(lambda: func(*args))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main() -> None:
+    serializer = get_default_serializer()
+    print(f"serializer: {type(serializer).__name__}")
+    print(f"{'items':>6} {'legacy miss':>13} {'raw miss':>13} {'legacy hit':>13} {'raw hit':>13}  (microseconds)")
+    for items_per_page in PAGE_SIZES:
+        page = make_page(items_per_page)
+        legacy_stored = json.dumps(jsonable_encoder(page)).encode()
+        raw_stored = CacheEntry(JsonSerializer().dumps(page)).encode()
+
+        print(
+            f"{items_per_page:>6} "
+            f"{measure(legacy_miss, page):>13.1f} "
+            f"{measure(raw_miss, page, serializer):>13.1f} "
+            f"{measure(legacy_hit, legacy_stored):>13.1f} "
+            f"{measure(raw_hit, raw_stored):>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark access token signing and verification throughput.
+
+Signs and verifies `ITERATIONS` access tokens carrying the usual claims with:
+
+- the previous implementation: `jose.jwt` called with `SECRET_KEY.get_secret_value()` on every call
+- a `Keyring` for HS256, ES256 and EdDSA, with the python-jose and PyJWT backends
+
+Asymmetric keys are generated on the fly; EdDSA is only supported by PyJWT.
+
+Usage:
+    python -m benchmarks.jwt_signing
+"""
+
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose import jwt
+from pydantic import SecretStr
+
+from src.app.core.utils.jwt_keyring import Keyring
+
+ITERATIONS = 2000
+SECRET_KEY = SecretStr("a" * 64)
+
+
+def claims() -> dict[str, Any]:
+    expire = datetime.now(UTC).replace(tzinfo=None) + timedelta(minutes=30)
+    return {"sub": "userson", "id": 1, "tier_id": 2, "is_superuser": False, "exp": expire, "token_type": "access"}
+
+
+def rate(func: Callable[[], Any]) -> float:
+    started_at = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    return ITERATIONS / (time.perf_counter() - started_at)
+
+
+def write_private_key(path: Path, private_key: Any) -> str:
+    path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    )
+    return str(path)
+
+
+def main() -> None:
+    payload = claims()
+    print(f"{ITERATIONS} tokens")
+    print(f"{'implementation':>28} {'sign/s':>10} {'verify/s':>10}")
+
+    token = jwt.encode(payload, SECRET_KEY.get_secret_value(), algorithm="HS256")
+    sign = rate(lambda: jwt.encode(payload, SECRET_KEY.get_secret_value(), algorithm="HS256"))
+    verify = rate(lambda: jwt.decode(token, SECRET_KEY.get_secret_value(), algorithms=["HS256"]))
+    print(f"{'previous (jose HS256)':>28} {sign:>10.0f} {verify:>10.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        es256_key = write_private_key(Path(directory) / "es256.key", ec.generate_private_key(ec.SECP256R1()))
+        eddsa_key = write_private_key(Path(directory) / "eddsa.key", ed25519.Ed25519PrivateKey.generate())
+        for algorithm, backend, private_key_file in (
+            ("HS256", "jose", None),
+            ("HS256", "pyjwt", None),
+            ("ES256", "jose", es256_key),
+            ("ES256", "pyjwt", es256_key),
+            ("EdDSA", "pyjwt", eddsa_key),
+        ):
+            keyring = Keyring.load(
+                algorithm,
+                backend=backend,
+                secret_key=SECRET_KEY.get_secret_value(),
+                key_id="bench",
+                private_key_file=private_key_file,
+            )
+            token = keyring.encode(payload)
+            sign = rate(lambda keyring=keyring: keyring.encode(payload))
+            verify = rate(lambda keyring=keyring, token=token: keyring.decode(token))
+            print(f"{f'keyring ({backend} {algorithm})':>28} {sign:>10.0f} {verify:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
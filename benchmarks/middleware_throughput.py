@@ -0,0 +1,98 @@
+"""Benchmark the throughput cost of the application middleware.
+
+Calls a trivial FastAPI endpoint directly through ASGI, without a server or network, and reports requests per
+second with no middleware, with `ClientCacheMiddleware` as a `BaseHTTPMiddleware` (as it was implemented before)
+and with the current pure ASGI `ClientCacheMiddleware`. Add new middleware to `APPS` to keep track of their cost.
+
+Usage:
+    python -m benchmarks.middleware_throughput
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.types import Message
+
+from src.app.middleware.client_cache_middleware import ClientCacheMiddleware
+
+REQUESTS = 20_000
+
+
+class BaseHTTPClientCacheMiddleware(BaseHTTPMiddleware):
+    """`ClientCacheMiddleware` implemented with `BaseHTTPMiddleware`, for comparison."""
+
+    def __init__(self, app: FastAPI, max_age: int = 60) -> None:
+        super().__init__(app)
+        self.max_age = max_age
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        response: Response = await call_next(request)
+        if "cache-control" not in response.headers:
+            response.headers["Cache-Control"] = f"private, max-age={self.max_age}"
+        return response
+
+
+def make_app(configure: Callable[[FastAPI], None]) -> FastAPI:
+    app = FastAPI()
+    configure(app)
+
+    @app.get("/ping")
+    async def ping() -> dict[str, str]:
+        return {"status": "ok"}
+
+    return app
+
+
+APPS: dict[str, Callable[[FastAPI], None]] = {
+    "no middleware": lambda app: None,
+    "BaseHTTPMiddleware": lambda app: app.add_middleware(BaseHTTPClientCacheMiddleware),
+    "ClientCacheMiddleware": lambda app: app.add_middleware(ClientCacheMiddleware),
+}
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/ping",
+    "raw_path": b"/ping",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"testserver")],
+    "client": ("127.0.0.1", 12345),
+    "server": ("testserver", 80),
+}
+
+
+async def receive() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: Message) -> None:
+    pass
+
+
+async def measure(app: FastAPI) -> float:
+    for _ in range(100):
+        await app(dict(SCOPE), receive, send)
+
+    started_at = time.perf_counter()
+    for _ in range(REQUESTS):
+        await app(dict(SCOPE), receive, send)
+
+    return REQUESTS / (time.perf_counter() - started_at)
+
+
+async def main() -> None:
+    print(f"{'middleware':>22} {'requests/s':>12}")
+    for name, configure in APPS.items():
+        throughput = await measure(make_app(configure))
+        print(f"{name:>22} {throughput:>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Benchmark event loop lag while passwords are verified during a login storm.
+
+Starts `LOGINS` concurrent password verifications at cost `ROUNDS` while a probe coroutine sleeps for `PROBE_INTERVAL`
+in a loop and records how late it wakes up, the lag every other request of the worker would see, and compares:
+
+- inline: `bcrypt.checkpw` called from the coroutine, as `verify_password` used to
+- pool: `PasswordHasher.verify`, bcrypt running in a bounded thread pool
+- pool with backpressure: same, with a maximum wait after which logins are rejected with a 503
+
+For each mode it reports the median, p99 and maximum event loop lag, the time the storm took and the rejected logins.
+
+Usage:
+    python -m benchmarks.password_hashing
+"""
+
+import asyncio
+import statistics
+import time
+
+import bcrypt
+
+from src.app.core.exceptions.http_exceptions import ServiceUnavailableException
+from src.app.core.utils.password_hasher import PasswordHasher
+
+ROUNDS = 10
+LOGINS = 32
+PROBE_INTERVAL = 0.005
+PASSWORD = "Str1ngst!"
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started_at - PROBE_INTERVAL)
+
+
+async def inline_verify(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode(), hashed_password.encode())
+
+
+async def measure(hasher: PasswordHasher | None, hashed_password: str) -> tuple[list[float], float, int]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    verify = hasher.verify if hasher is not None else inline_verify
+    started_at = time.perf_counter()
+    results = await asyncio.gather(*(verify(PASSWORD, hashed_password) for _ in range(LOGINS)), return_exceptions=True)
+    elapsed = time.perf_counter() - started_at
+
+    stop.set()
+    await prober
+    if hasher is not None:
+        hasher.shutdown()
+
+    rejected = sum(isinstance(result, ServiceUnavailableException) for result in results)
+    return lags, elapsed, rejected
+
+
+async def main() -> None:
+    hashed_password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=ROUNDS)).decode()
+    started_at = time.perf_counter()
+    bcrypt.checkpw(PASSWORD.encode(), hashed_password.encode())
+    single = time.perf_counter() - started_at
+
+    print(f"cost {ROUNDS} ({single * 1000:.0f} ms per check), {LOGINS} concurrent logins")
+    print(f"{'mode':>30} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11} {'storm s':>8} {'rejected':>9}")
+    for name, hasher in (
+        ("inline", None),
+        ("pool (2 workers)", PasswordHasher(rounds=ROUNDS, max_workers=2, max_wait=60)),
+        ("pool (2 workers, 0.5 s wait)", PasswordHasher(rounds=ROUNDS, max_workers=2, max_wait=0.5)),
+    ):
+        lags, elapsed, rejected = await measure(hasher, hashed_password)
+        lags.sort()
+        p50 = statistics.median(lags) * 1000
+        p99 = lags[int(len(lags) * 0.99)] * 1000
+        print(f"{name:>30} {p50:>11.2f} {p99:>11.2f} {lags[-1] * 1000:>11.2f} {elapsed:>8.2f} {rejected:>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""Benchmark the exact and approximate modes of the rate limiter.
+
+Sends requests from several simulated workers, sharing a simulated Redis that waits a fixed round-trip time for every
+script call or pipeline, to a single anonymous endpoint with a limit of `LIMIT` requests per window, and compares:
+
+- exact: one `EVALSHA` of the fixed window script per request
+- approximate: local counters synchronized with `INCRBY` in batches (`RateLimiter.use_local_counters`)
+
+For each mode it reports the latency the check adds to a request, the Redis round-trips per request, and how many
+requests were admitted above the limit.
+
+Usage:
+    python -m benchmarks.rate_limit_modes
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from src.app.core.utils.rate_limit import LocalCounters, RateLimitAlgorithm, RateLimiter
+
+ROUND_TRIP_TIME = 0.0002
+WORKERS = 4
+REQUESTS = 20_000
+LIMIT = 10_000
+PERIOD = 3600
+
+
+class SimulatedScript:
+    def __init__(self, redis: "SimulatedRedis") -> None:
+        self.redis = redis
+
+    async def __call__(self, keys: list[str], args: list[Any]) -> list[int]:
+        await self.redis.round_trip()
+        count = self.redis.values[keys[0]] = self.redis.values.get(keys[0], 0) + 1
+        limit = int(args[0])
+        return [1, 0, 1000, 1000] if count > limit else [0, limit - count, 1000, 0]
+
+
+class SimulatedPipeline:
+    def __init__(self, redis: "SimulatedRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, int]] = []
+
+    async def __aenter__(self) -> "SimulatedPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.commands = []
+
+    def incrby(self, key: str, amount: int) -> None:
+        self.commands.append((key, amount))
+
+    def expireat(self, key: str, when: int) -> None:
+        self.commands.append((key, 0))
+
+    async def execute(self) -> list[int]:
+        await self.redis.round_trip()
+        results = []
+        for key, amount in self.commands:
+            self.redis.values[key] = self.redis.values.get(key, 0) + amount
+            results.append(self.redis.values[key])
+        return results
+
+
+class SimulatedRedis:
+    """Minimal stand-in for `redis.asyncio.Redis` that sleeps for a round-trip time on every call."""
+
+    def __init__(self, round_trip_time: float) -> None:
+        self.round_trip_time = round_trip_time
+        self.round_trips = 0
+        self.values: dict[str, int] = {}
+
+    async def round_trip(self) -> None:
+        self.round_trips += 1
+        await asyncio.sleep(self.round_trip_time)
+
+    def register_script(self, source: str) -> SimulatedScript:
+        return SimulatedScript(self)
+
+    def pipeline(self, transaction: bool = True) -> SimulatedPipeline:
+        return SimulatedPipeline(self)
+
+
+async def run_worker(limiter: RateLimiter | LocalCounters, requests: int) -> tuple[int, float]:
+    admitted = 0
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        if isinstance(limiter, LocalCounters):
+            result = await limiter.hit(user_id="203.0.113.7", path="/api/v1/clock", limit=LIMIT, period=PERIOD)
+        else:
+            result = await limiter.check(
+                user_id="203.0.113.7",
+                path="/api/v1/clock",
+                limit=LIMIT,
+                period=PERIOD,
+                algorithm=RateLimitAlgorithm.FIXED_WINDOW,
+                approximate=False,
+            )
+        admitted += not result.limited
+
+    return admitted, time.perf_counter() - started_at
+
+
+async def measure(approximate: bool, sync_hits: int = 50, max_error: float = 0.1) -> tuple[float, float, int]:
+    redis = SimulatedRedis(ROUND_TRIP_TIME)
+    workers: list[RateLimiter | LocalCounters]
+    if approximate:
+        workers = [
+            LocalCounters(redis, sync_interval=0.1, sync_hits=sync_hits, max_error=max_error)  # type: ignore[arg-type]
+            for _ in range(WORKERS)
+        ]
+    else:
+        limiter = RateLimiter()
+        limiter.client, limiter._scripts, limiter.local_counters = redis, {}, None  # type: ignore[assignment]
+        workers = [limiter] * WORKERS
+
+    results = await asyncio.gather(*(run_worker(worker, REQUESTS // WORKERS) for worker in workers))
+    for worker in workers:
+        if isinstance(worker, LocalCounters):
+            await worker.stop()
+
+    latency = sum(elapsed for _, elapsed in results) / REQUESTS * 1e6
+    admitted = sum(count for count, _ in results)
+    return latency, redis.round_trips / REQUESTS, admitted - LIMIT
+
+
+async def main() -> None:
+    print(
+        f"simulated round-trip time: {ROUND_TRIP_TIME * 1000:.1f} ms, {WORKERS} workers, "
+        f"{REQUESTS} requests, limit {LIMIT}"
+    )
+    print(f"{'mode':>28} {'us/request':>11} {'round-trips':>12} {'over limit':>11}")
+    for name, approximate, sync_hits, max_error in (
+        ("exact", False, 0, 0.0),
+        ("approximate (K=50)", True, 50, 0.1),
+        ("approximate (K=200)", True, 200, 0.1),
+        ("approximate (K=50, 0.1%)", True, 50, 0.001),
+    ):
+        latency, round_trips, over_limit = await measure(approximate, sync_hits, max_error)
+        print(f"{name:>28} {latency:>11.1f} {round_trips:>12.3f} {over_limit:>11}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
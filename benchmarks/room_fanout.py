@@ -0,0 +1,176 @@
+"""Load test the fan-out of room events to 10k display connections.
+
+Opens `DISPLAYS` display connections to a single room, publishes `EVENTS` events at `RATE` events per second, and
+reports how long each event took to reach the displays, the events they missed, and the displays closed as slow
+consumers. `STUCK_FRACTION` of the displays never read, to check that they are closed and do not slow down the others.
+
+By default everything runs in one process: each display is a simulated WebSocket served by the real
+`room_events_websocket` endpoint, and events are handed to the hub as the Redis subscription would. Against a running
+deployment, displays are real WebSocket connections and events are published on Redis, like `publish_room_event`:
+
+    python -m benchmarks.room_fanout --url ws://localhost:8000/api/v1/room/bench/ws --redis redis://localhost:6379
+
+Raise the open files limit (`ulimit -n`) above the number of displays for the remote mode.
+
+Usage:
+    python -m benchmarks.room_fanout
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from contextlib import suppress
+from typing import Any
+
+from src.app.api.v1.room_events import SLOW_CONSUMER_CLOSE_CODE, room_events_websocket
+from src.app.core.utils.room_events import room_event_hub
+
+DISPLAYS = 10_000
+EVENTS = 50
+RATE = 10
+STUCK_FRACTION = 0.01
+SLOW_CONSUMER_TIMEOUT = 1.0
+ROOM_ID = "bench"
+
+
+class SimulatedDisplay:
+    """The WebSocket of a display, recording how late each event arrives."""
+
+    def __init__(self, latencies: list[float], stuck: bool = False) -> None:
+        self.latencies = latencies
+        self.stuck = stuck
+        self.received = 0
+        self.close_code: int | None = None
+        self._closed = asyncio.Event()
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive(self) -> dict[str, Any]:
+        await self._closed.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send_text(self, message: str) -> None:
+        if self.stuck:
+            await asyncio.Event().wait()
+
+        event = json.loads(message)
+        if "sent_at" in event:
+            self.received += 1
+            self.latencies.append(time.perf_counter() - event["sent_at"])
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+        self._closed.set()
+
+    def disconnect(self) -> None:
+        self._closed.set()
+
+
+def event(number: int) -> str:
+    return json.dumps({"type": "tick", "number": number, "sent_at": time.perf_counter()})
+
+
+def report(latencies: list[float], received: int, expected: int, slow_consumers: int, elapsed: float) -> None:
+    latencies.sort()
+    print(f"{'delivered':>24}: {received} of {expected} ({received / expected:.2%})")
+    print(f"{'latency p50 / p99 / max':>24}: ", end="")
+    print(" / ".join(f"{latencies[int((len(latencies) - 1) * q)] * 1000:.1f} ms" for q in (0.5, 0.99, 1.0)))
+    print(f"{'slow consumers closed':>24}: {slow_consumers}")
+    print(f"{'deliveries per second':>24}: {received / elapsed:.0f}")
+
+
+async def run_local() -> None:
+    await room_event_hub.start(None, slow_consumer_timeout=SLOW_CONSUMER_TIMEOUT)
+    latencies: list[float] = []
+    stuck = int(DISPLAYS * STUCK_FRACTION)
+    displays = [SimulatedDisplay(latencies, stuck=i < stuck) for i in range(DISPLAYS)]
+    tasks = [asyncio.create_task(room_events_websocket(display, ROOM_ID)) for display in displays]  # type: ignore
+    await asyncio.sleep(0.5)
+    print(f"{DISPLAYS} displays ({stuck} stuck), {EVENTS} events at {RATE}/s, in process")
+
+    dispatch_times = []
+    started_at = time.perf_counter()
+    for number in range(EVENTS):
+        dispatch_started_at = time.perf_counter()
+        room_event_hub.dispatch(f"room:{ROOM_ID}", event(number))
+        dispatch_times.append(time.perf_counter() - dispatch_started_at)
+        await asyncio.sleep(1 / RATE)
+
+    await asyncio.sleep(SLOW_CONSUMER_TIMEOUT)
+    elapsed = time.perf_counter() - started_at
+
+    for display in displays:
+        display.disconnect()
+    await asyncio.wait(tasks, timeout=SLOW_CONSUMER_TIMEOUT * 2)
+    await room_event_hub.stop()
+
+    print(f"{'dispatch avg / max':>24}: ", end="")
+    print(f"{statistics.mean(dispatch_times) * 1000:.1f} / {max(dispatch_times) * 1000:.1f} ms")
+    report(
+        latencies,
+        received=sum(display.received for display in displays),
+        expected=(DISPLAYS - stuck) * EVENTS,
+        slow_consumers=sum(display.close_code == SLOW_CONSUMER_CLOSE_CODE for display in displays),
+        elapsed=elapsed,
+    )
+
+
+async def run_remote(url: str, redis_url: str) -> None:
+    import websockets
+    from redis.asyncio import Redis
+
+    latencies: list[float] = []
+    received = [0]
+    sockets: list[Any] = []
+    connected = asyncio.Event()
+    limit = asyncio.Semaphore(500)
+
+    async def display() -> None:
+        async with limit:
+            websocket = await websockets.connect(url, max_queue=None)
+        sockets.append(websocket)
+        if len(sockets) == DISPLAYS:
+            connected.set()
+
+        with suppress(websockets.ConnectionClosed):
+            async for message in websocket:
+                payload = json.loads(message)
+                if "sent_at" in payload:
+                    received[0] += 1
+                    latencies.append(time.time() - payload["sent_at"])
+
+    tasks = [asyncio.create_task(display()) for _ in range(DISPLAYS)]
+    await asyncio.wait_for(connected.wait(), timeout=300)
+    print(f"{DISPLAYS} displays, {EVENTS} events at {RATE}/s, against {url}")
+
+    client = Redis.from_url(redis_url)
+    started_at = time.perf_counter()
+    for number in range(EVENTS):
+        await client.publish(f"room:{ROOM_ID}", json.dumps({"type": "tick", "number": number, "sent_at": time.time()}))
+        await asyncio.sleep(1 / RATE)
+
+    await asyncio.sleep(2)
+    elapsed = time.perf_counter() - started_at
+    await asyncio.gather(*(websocket.close() for websocket in sockets), return_exceptions=True)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await client.aclose()
+    report(latencies, received[0], DISPLAYS * EVENTS, slow_consumers=0, elapsed=elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="WebSocket URL of a room on a running deployment.")
+    parser.add_argument("--redis", default="redis://localhost:6379", help="Redis the room events are published on.")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_remote(args.url, args.redis))
+    else:
+        asyncio.run(run_local())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,85 @@
 from typing import Optional
 
 from crudadmin import CRUDAdmin
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from ..core.config import EnvironmentOption, settings
-from ..core.db.database import async_get_db
+from ..core.db.database import async_get_db, local_session
+from ..core.logger import logging
+from ..core.utils.cache import invalidate_tags
+from ..core.utils.rate_limit_policies import rate_limit_policies
+from ..core.utils.user_context import user_context_cache
 from .views import register_admin_views
 
+logger = logging.getLogger(__name__)
+
+
+class UserContextInvalidationMiddleware:
+    """Middleware clearing the user context cache after users are created or edited from the admin interface.
+
+    The admin interface writes users with its own CRUD instance, so the cached contexts cannot be invalidated one user
+    at a time as the API endpoints do. Admin edits being rare, every cached context is dropped instead.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and scope["method"] not in ("GET", "HEAD") and "/User/" in scope["path"]:
+            await user_context_cache.clear()
+
+
+class RoomSnapshotInvalidationMiddleware:
+    """Middleware dropping the cached room snapshots after rooms, timers or displays are edited in the admin interface.
+
+    Like users, they are written with the admin's own CRUD instances, and a display may be linked to timers of several
+    rooms, so every cached snapshot is dropped instead of those of the rooms concerned.
+    """
+
+    paths = ("/Room/", "/Timer/", "/Display/")
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.app(scope, receive, send)
+        if (
+            scope["type"] == "http"
+            and scope["method"] not in ("GET", "HEAD")
+            and any(path in scope["path"] for path in self.paths)
+        ):
+            try:
+                await invalidate_tags("room_snapshots")
+            except Exception as e:
+                logger.warning(f"Could not invalidate the room snapshots after an admin edit: {e}")
+
+
+class RateLimitPolicyChangeMiddleware:
+    """Middleware publishing a rate limit policy change after tiers or rate limits are edited in the admin interface.
+
+    The admin interface writes them with its own CRUD instances, bypassing the endpoints that call `publish_change`,
+    so the policy tables of the workers would otherwise stay stale until they restart.
+    """
+
+    paths = ("/Tier/", "/RateLimit/")
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.app(scope, receive, send)
+        if (
+            scope["type"] == "http"
+            and scope["method"] not in ("GET", "HEAD")
+            and any(path in scope["path"] for path in self.paths)
+        ):
+            try:
+                async with local_session() as db:
+                    await rate_limit_policies.publish_change(db)
+            except Exception as e:
+                logger.warning(f"Could not publish the rate limit policy change after an admin edit: {e}")
+
 
 def create_admin_interface() -> Optional[CRUDAdmin]:
     """Create and configure the admin interface."""
@@ -50,5 +124,8 @@ def create_admin_interface() -> Optional[CRUDAdmin]:
     )
 
     register_admin_views(admin)
+    admin.app.add_middleware(UserContextInvalidationMiddleware)
+    admin.app.add_middleware(RoomSnapshotInvalidationMiddleware)
+    admin.app.add_middleware(RateLimitPolicyChangeMiddleware)
 
     return admin
@@ -1,19 +1,17 @@
-from typing import Annotated, Any, cast
+from typing import Annotated, Any
 
-from fastapi import Depends, HTTPException, Request
+from fastapi import Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
 from ..core.db.database import async_get_db
 from ..core.exceptions.http_exceptions import ForbiddenException, RateLimitException, UnauthorizedException
 from ..core.logger import logging
-from ..core.security import TokenType, oauth2_scheme, verify_token
+from ..core.security import TokenType, decode_user_claims, oauth2_scheme, verify_token
 from ..core.utils.rate_limit import rate_limiter
-from ..crud.crud_rate_limit import crud_rate_limits
-from ..crud.crud_tier import crud_tiers
-from ..crud.crud_users import crud_users
-from ..schemas.rate_limit import RateLimitRead, sanitize_path
-from ..schemas.tier import TierRead
+from ..core.utils.rate_limit_policies import rate_limit_policies
+from ..core.utils.user_context import get_user_context
+from ..schemas.rate_limit import sanitize_path
 
 logger = logging.getLogger(__name__)
 
@@ -28,13 +26,9 @@ async def get_current_user(
     if token_data is None:
         raise UnauthorizedException("User not authenticated.")
 
-    if "@" in token_data.username_or_email:
-        user = await crud_users.get(db=db, email=token_data.username_or_email, is_deleted=False)
-    else:
-        user = await crud_users.get(db=db, username=token_data.username_or_email, is_deleted=False)
-
+    user = await get_user_context(db, token_data.username_or_email)
     if user:
-        return cast(dict[str, Any], user)
+        return user
 
     raise UnauthorizedException("User not authenticated.")
 
@@ -53,7 +47,11 @@ async def get_optional_user(request: Request, db: AsyncSession = Depends(async_g
         if token_data is None:
             return None
 
-        return await get_current_user(token_value, db=db)
+        claims = decode_user_claims(token_value)
+        if claims is not None:
+            return claims
+
+        return await get_user_context(db, token_data.username_or_email)
 
     except HTTPException as http_exc:
         if http_exc.status_code != 401:
@@ -73,7 +71,10 @@ async def get_current_superuser(current_user: Annotated[dict, Depends(get_curren
 
 
 async def rate_limiter_dependency(
-    request: Request, db: Annotated[AsyncSession, Depends(async_get_db)], user: dict | None = Depends(get_optional_user)
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(async_get_db)],
+    user: dict | None = Depends(get_optional_user),
 ) -> None:
     if hasattr(request.app.state, "initialization_complete"):
         await request.app.state.initialization_complete.wait()
@@ -81,19 +82,15 @@ async def rate_limiter_dependency(
     path = sanitize_path(request.url.path)
     if user:
         user_id = user["id"]
-        tier = await crud_tiers.get(db, id=user["tier_id"], schema_to_select=TierRead)
-        if tier:
-            tier = cast(TierRead, tier)
-            rate_limit = await crud_rate_limits.get(db=db, tier_id=tier.id, path=path, schema_to_select=RateLimitRead)
-            if rate_limit:
-                rate_limit = cast(RateLimitRead, rate_limit)
-                limit, period = rate_limit.limit, rate_limit.period
-            else:
-                logger.warning(
-                    f"User {user_id} with tier '{tier.name}' has no specific rate limit for path '{path}'. \
-                        Applying default rate limit."
-                )
-                limit, period = DEFAULT_LIMIT, DEFAULT_PERIOD
+        policy = await rate_limit_policies.get(db, tier_id=user["tier_id"], path=path)
+        if policy:
+            limit, period = policy.limit, policy.period
+        elif user["tier_id"] in rate_limit_policies.tiers:
+            logger.warning(
+                f"User {user_id} with tier '{rate_limit_policies.tiers[user['tier_id']]}' has no specific rate limit \
+                    for path '{path}'. Applying default rate limit."
+            )
+            limit, period = DEFAULT_LIMIT, DEFAULT_PERIOD
         else:
             logger.warning(f"User {user_id} has no assigned tier. Applying default rate limit.")
             limit, period = DEFAULT_LIMIT, DEFAULT_PERIOD
@@ -101,6 +98,10 @@ async def rate_limiter_dependency(
         user_id = request.client.host if request.client else "unknown"
         limit, period = DEFAULT_LIMIT, DEFAULT_PERIOD
 
-    is_limited = await rate_limiter.is_rate_limited(db=db, user_id=user_id, path=path, limit=limit, period=period)
-    if is_limited:
-        raise RateLimitException("Rate limit exceeded.")
+    result = await rate_limiter.check(user_id=user_id, path=path, limit=limit, period=period)
+    if result.limited:
+        exception = RateLimitException("Rate limit exceeded.")
+        exception.headers = result.headers()
+        raise exception
+
+    response.headers.update(result.headers())
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 
+from .clock import router as clock_router
 from .login import router as login_router
 from .logout import router as logout_router
 # from .playback import router as playback_router
@@ -8,7 +9,9 @@ from .logout import router as logout_router
 # from .tasks import router as tasks_router
 # from .tiers import router as tiers_router
 from .users import router as users_router
+from .room_events import router as room_events_router
 from .rooms import router as rooms_router
+from .stats import router as stats_router
 from .timers import router as timers_router
 
 router = APIRouter(prefix="/v1")
@@ -21,4 +24,7 @@ router.include_router(users_router)
 # router.include_router(rate_limits_router)
 # router.include_router(playback_router)
 router.include_router(rooms_router)
-router.include_router(timers_router)
\ No newline at end of file
+router.include_router(room_events_router)
+router.include_router(timers_router)
+router.include_router(clock_router)
+router.include_router(stats_router)
\ No newline at end of file
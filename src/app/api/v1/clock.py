@@ -0,0 +1,39 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from ...api.dependencies import get_current_superuser
+from ...core.utils.clock_sync import clock_sync
+
+router = APIRouter(tags=["clock"])
+
+
+@router.get("/time")
+async def read_server_time(
+    t0: float | None = None, client_id: str | None = None, offset: float | None = None, rtt: float | None = None
+) -> JSONResponse:
+    """Return the server time for NTP-style clock synchronization, on the clock timer anchors are stamped with.
+
+    Send the client time as `t0`, in milliseconds since the epoch, and note the time `t3` the answer arrives. The
+    answer echoes `t0` with the times `t1` and `t2` the server received and answered the request:
+    `offset = ((t1 - t0) + (t2 - t3)) / 2` and `rtt = (t3 - t0) - (t2 - t1)`. Keep the offset with the lowest `rtt`
+    out of a few requests.
+
+    Clients may report their last `offset` and `rtt` with a `client_id`, kept for monitoring. No authentication and
+    no database access, so displays can call it as often as they need.
+    """
+    received_at = clock_sync.now_ms()
+    if client_id is not None and offset is not None and rtt is not None:
+        clock_sync.record(client_id, offset, rtt)
+
+    return JSONResponse(clock_sync.reply(t0, received_at), headers={"Cache-Control": "no-store"})
+
+
+@router.get("/time/stats", dependencies=[Depends(get_current_superuser)])
+async def read_clock_stats(client_id: str | None = None) -> dict[str, Any]:
+    """Return the distribution of the clock offsets reported by the clients of this worker, or those of one client."""
+    if client_id is not None:
+        return {"client_id": client_id, "stats": clock_sync.client_stats(client_id)}
+
+    return clock_sync.stats()
@@ -15,8 +15,10 @@ from ...core.security import (
     authenticate_user,
     create_access_token,
     create_refresh_token,
+    create_user_claims,
     verify_token,
 )
+from ...core.utils.user_context import get_user_context
 
 router = APIRouter(tags=["login"])
 
@@ -32,7 +34,7 @@ async def login_for_access_token(
         raise UnauthorizedException("Wrong username, email or password.")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = await create_access_token(data={"sub": user["username"]}, expires_delta=access_token_expires)
+    access_token = await create_access_token(data=create_user_claims(user), expires_delta=access_token_expires)
 
     refresh_token = await create_refresh_token(data={"sub": user["username"]})
     max_age = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
@@ -54,5 +56,9 @@ async def refresh_access_token(request: Request, db: AsyncSession = Depends(asyn
     if not user_data:
         raise UnauthorizedException("Invalid refresh token.")
 
-    new_access_token = await create_access_token(data={"sub": user_data.username_or_email})
+    user = await get_user_context(db, user_data.username_or_email)
+    if not user:
+        raise UnauthorizedException("Invalid refresh token.")
+
+    new_access_token = await create_access_token(data=create_user_claims(user))
     return {"access_token": new_access_token, "token_type": "bearer"}
@@ -1,12 +1,12 @@
 from typing import Optional
 
 from fastapi import APIRouter, Cookie, Depends, Response
-from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.db.database import async_get_db
 from ...core.exceptions.http_exceptions import UnauthorizedException
 from ...core.security import blacklist_tokens, oauth2_scheme
+from ...core.utils.jwt_keyring import InvalidTokenError
 
 router = APIRouter(tags=["login"])
 
@@ -27,5 +27,5 @@ async def logout(
 
         return {"message": "Logged out successfully"}
 
-    except JWTError:
+    except InvalidTokenError:
         raise UnauthorizedException("Invalid token.")
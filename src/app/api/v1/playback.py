@@ -16,15 +16,17 @@ async def get_playback_status(room_id: str):
 
 @router.post("/status/{room_id}")
 async def set_playback_status(room_id: str, status: dict):
-    """Set current playback status for a room"""
+    """Set current playback status for a room and push it to the displays of the room"""
     await redis_client.set_playback_status(room_id, status)
+    await redis_client.publish_room_event(room_id, {"type": "playback_status", "room_id": room_id, "status": status})
     return {"message": "Playback status updated", "room_id": room_id}
 
 
 @router.delete("/status/{room_id}")
 async def delete_playback_status(room_id: str):
-    """Delete playback status for a room"""
+    """Delete playback status for a room and push the deletion to the displays of the room"""
     await redis_client.delete_playback_status(room_id)
+    await redis_client.publish_room_event(room_id, {"type": "playback_status", "room_id": room_id, "status": None})
     return {"message": "Playback status deleted", "room_id": room_id}
 
 
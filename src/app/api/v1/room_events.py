@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import suppress
+from typing import Annotated
+
+from fastapi import APIRouter, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from ...core.config import settings
+from ...core.exceptions.cache_exceptions import MissingClientError
+from ...core.utils import room_state
+from ...core.utils.cache import redis_client
+from ...core.utils.clock_sync import clock_sync
+from ...core.utils.room_events import HEARTBEAT_MESSAGE, RESYNC_MESSAGE, Subscription, room_event_hub
+
+router = APIRouter(tags=["room events"])
+
+# Close codes sent to displays that stopped reading, and when the server shuts down
+SLOW_CONSUMER_CLOSE_CODE = 1013
+SERVER_STOPPING_CLOSE_CODE = 1012
+
+
+async def playback_status_message(room_id: str) -> str | None:
+    """Return the current playback status of a room as a `playback_status` event, sent first to every connection."""
+    try:
+        status = await redis_client.get_playback_status(room_id)
+    except MissingClientError:
+        return None
+
+    if status is None:
+        return None
+
+    return json.dumps({"type": "playback_status", "room_id": room_id, "status": status})
+
+
+async def missed_messages(room_id: str, since: int) -> list[str]:
+    """Return the changes of a room after the last one a display applied, or `resync` if it must reload the snapshot."""
+    try:
+        messages = await room_state.events_since(room_id, since, max_events=settings.ROOM_STATE_STREAM_LENGTH)
+    except MissingClientError:
+        return [RESYNC_MESSAGE]
+
+    return [RESYNC_MESSAGE] if messages is None else messages
+
+
+def _sse_message(message: str) -> str:
+    if message == HEARTBEAT_MESSAGE:
+        return ": heartbeat\n\n"
+
+    seq = room_state.event_seq(message)
+    return f"data: {message}\n\n" if seq is None else f"id: {seq}\ndata: {message}\n\n"
+
+
+async def _receive_until_disconnect(websocket: WebSocket, room_id: str) -> None:
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+        received_at = clock_sync.now_ms()
+        try:
+            data = json.loads(message.get("text") or "")
+        except ValueError:
+            continue
+
+        if isinstance(data, dict) and data.get("type") == "time_sync":
+            if data.get("offset") is not None and data.get("rtt") is not None:
+                client = websocket.client
+                default_id = f"{room_id}/{client.host}:{client.port}" if client else room_id
+                clock_sync.record(str(data.get("client_id") or default_id), float(data["offset"]), float(data["rtt"]))
+
+            # Answered right away rather than through the queue, so t2 is the time it is sent
+            await websocket.send_text(json.dumps(clock_sync.reply(data.get("t0"), received_at)))
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription) -> None:
+    while True:
+        batch = await subscription.next_batch()
+        if subscription.closed:
+            return
+
+        subscription.sending_since = time.monotonic()
+        for message in batch:
+            await websocket.send_text(message)
+        subscription.sending_since = None
+
+
+@router.websocket("/room/{room_id}/ws")
+async def room_events_websocket(websocket: WebSocket, room_id: str, since: int | None = None) -> None:
+    """Stream the events of a room over a WebSocket.
+
+    The first message is the current playback status of the room, if any, then every event published on the room,
+    and a `{"type": "heartbeat"}` message after `ROOM_EVENTS_HEARTBEAT_SECONDS` without events. Displays that stop
+    reading are disconnected with close code 1013 and should reconnect.
+
+    Changes of the room carry their sequence number as `seq`. Displays reconnecting with `?since=<seq>`, the last one
+    they applied, first receive the changes they missed, or `{"type": "resync"}` if they must reload the snapshot.
+
+    Displays synchronize their clock by sending `{"type": "time_sync", "t0": ...}`, answered like `GET /time`, with
+    their last `offset` and `rtt` estimates if they have some.
+    """
+    await websocket.accept()
+    with room_event_hub.subscription(room_id) as subscription:
+        status = await playback_status_message(room_id)
+        if status is not None:
+            subscription.put(status)
+
+        # Subscribed first so nothing is lost in between, live changes already replayed are sent twice
+        if since is not None:
+            for message in await missed_messages(room_id, since):
+                await websocket.send_text(message)
+
+        sender = subscription.task = asyncio.create_task(_send_events(websocket, subscription))
+        receiver = asyncio.create_task(_receive_until_disconnect(websocket, room_id))
+        done, pending = await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in (sender, receiver):
+            with suppress(asyncio.CancelledError, WebSocketDisconnect):
+                await task
+
+    if receiver not in done:
+        code = SLOW_CONSUMER_CLOSE_CODE if subscription.slow else SERVER_STOPPING_CLOSE_CODE
+        with suppress(RuntimeError, WebSocketDisconnect):
+            await websocket.close(code=code)
+
+
+@router.get("/room/{room_id}/events")
+async def room_events_stream(
+    room_id: str, since: int | None = None, last_event_id: Annotated[int | None, Header()] = None
+) -> StreamingResponse:
+    """Stream the events of a room as Server-Sent Events.
+
+    Sends the same events as the WebSocket endpoint, each as a `data:` line, and a comment line as heartbeat. Displays
+    that stop reading have their stream ended, like slow WebSocket consumers; browsers reconnect on their own.
+
+    Changes of the room carry their sequence number as event id, so browsers resume from the last one they received
+    by sending it as `Last-Event-ID` when they reconnect. `?since=<seq>` does the same for the first connection.
+    """
+    resume_from = last_event_id if last_event_id is not None else since
+
+    async def events() -> AsyncIterator[str]:
+        with room_event_hub.subscription(room_id) as subscription:
+            # The task sending the response, cancelled by the hub when a send stays blocked
+            subscription.task = asyncio.current_task()
+            status = await playback_status_message(room_id)
+            if status is not None:
+                subscription.put(status)
+
+            yield "retry: 1000\n\n"
+            if resume_from is not None:
+                yield "".join(_sse_message(message) for message in await missed_messages(room_id, resume_from))
+
+            while True:
+                batch = await subscription.next_batch()
+                if subscription.closed:
+                    return
+
+                # The response is sent while the generator waits here, so this measures the send
+                subscription.sending_since = time.monotonic()
+                yield "".join(_sse_message(message) for message in batch)
+                subscription.sending_since = None
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
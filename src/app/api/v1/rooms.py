@@ -1,15 +1,18 @@
 from typing import Annotated, Any, cast
 
 from fastapi import APIRouter, Depends, Request
+from fastapi.encoders import jsonable_encoder
 from fastcrud.paginated import PaginatedListResponse, compute_offset, paginated_response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...api.dependencies import get_current_superuser, get_current_user
-from ...core.db.database import async_get_db
+from ...core.config import settings
+from ...core.db.database import async_get_db, async_get_read_db
 from ...core.exceptions.http_exceptions import NotFoundException
+from ...core.utils import room_state
 from ...core.utils.cache import cache
-from ...crud.crud_rooms import crud_room
-from ...schemas.room import RoomCreate, RoomCreateInternal, RoomRead, RoomUpdate
+from ...crud.crud_rooms import crud_room, get_room_snapshot
+from ...schemas.room import RoomCreate, RoomCreateInternal, RoomRead, RoomSnapshot, RoomUpdate
 
 router = APIRouter(tags=["rooms"])
 
@@ -36,14 +39,16 @@ async def write_room(
 
 @router.get("/rooms", response_model=PaginatedListResponse[RoomRead])
 @cache(
-    key_prefix="{current_user_id}_rooms:page_{page}:items_per_page:{items_per_page}",
-    resource_id_name="current_user_id",
+    key_prefix="{current_user[id]}_rooms:page_{page}:items_per_page:{items_per_page}",
+    resource_id_name="current_user[id]",
     expiration=60,
+    raw_response=True,
+    cache_control="private, no-cache",
 )
 async def read_rooms(
     request: Request,
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
     page: int = 1,
     items_per_page: int = 10,
 ) -> dict:
@@ -60,12 +65,17 @@ async def read_rooms(
 
 
 @router.get("/room/{id}", response_model=RoomRead)
-@cache(key_prefix="{current_user_id}_room_cache", resource_id_name="id")
+@cache(
+    key_prefix="{current_user[id]}_room_cache",
+    resource_id_name="id",
+    raw_response=True,
+    cache_control="private, no-cache",
+)
 async def read_room(
     request: Request, 
     id: int, 
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(async_get_db)]
+    db: Annotated[AsyncSession, Depends(async_get_read_db)]
 ) -> RoomRead:
     db_room = await crud_room.get(
         db=db, id=id, created_by_user_id=current_user["id"], is_deleted=False, schema_to_select=RoomRead
@@ -76,8 +86,44 @@ async def read_room(
     return cast(RoomRead, db_room)
 
 
+@router.get("/room/{id}/snapshot", response_model=RoomSnapshot)
+@cache(
+    key_prefix="{current_user[id]}_room_snapshot",
+    resource_id_name="id",
+    tags=["room_snapshot:{id}", "room_snapshots"],
+    raw_response=True,
+    cache_control="private, no-cache",
+)
+async def read_room_snapshot(
+    request: Request,
+    id: int,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(async_get_db)],
+) -> dict[str, Any]:
+    """Return everything a display needs to boot: the room, its timers ordered by schedule and their displays.
+
+    The snapshot is cached until a room, timer or display of the room changes. Send its `ETag` back in
+    `If-None-Match` to get `304 Not Modified` while it is current. Its `seq` is the last change of the room it
+    includes: displays apply the `room_patch` and `timer_state` events that follow it. It is read from the primary
+    database, since changes are published once committed there: a replica lagging behind could miss changes
+    numbered before `seq`, which displays would then never apply.
+    """
+    # Read first, so changes made while the snapshot is loaded are replayed rather than missed
+    seq = await room_state.get_seq(str(id))
+    snapshot = await get_room_snapshot(db=db, room_id=id, created_by_user_id=current_user["id"])
+    if snapshot is None:
+        raise NotFoundException("Room not found")
+
+    return {"seq": seq, **snapshot}
+
+
 @router.patch("/room/{id}")
-@cache("{current_user_id}_room_cache", resource_id_name="id", pattern_to_invalidate_extra=["{current_user_id}_rooms:*"])
+@cache(
+    "{current_user[id]}_room_cache",
+    resource_id_name="id",
+    pattern_to_invalidate_extra=["{current_user[id]}_rooms:*"],
+    tags_to_invalidate=["room_snapshot:{id}"],
+)
 async def patch_room(
     request: Request,
     id: int,
@@ -89,12 +135,26 @@ async def patch_room(
     if db_room is None:
         raise NotFoundException("Room not found")
 
+    db_room = cast(dict[str, Any], db_room)
     await crud_room.update(db=db, object=values, id=id)
+    fields = jsonable_encoder(room_state.diff(db_room, values.model_dump(exclude_unset=True)))
+    if fields:
+        await room_state.publish_changes(
+            str(id),
+            [{"op": "update", "entity": "room", "id": id, "fields": fields}],
+            max_length=settings.ROOM_STATE_STREAM_LENGTH,
+        )
+
     return {"message": "Room updated"}
 
 
 @router.delete("/room/{id}")
-@cache("{current_user_id}_room_cache", resource_id_name="id", to_invalidate_extra={"{current_user_id}_rooms": "{current_user_id}"})
+@cache(
+    "{current_user[id]}_room_cache",
+    resource_id_name="id",
+    to_invalidate_extra={"{current_user[id]}_rooms": "{current_user[id]}"},
+    tags_to_invalidate=["room_snapshot:{id}"],
+)
 async def erase_room(
     request: Request,
     id: int,
@@ -106,12 +166,20 @@ async def erase_room(
         raise NotFoundException("Room not found")
 
     await crud_room.delete(db=db, id=id)
+    await room_state.publish_changes(
+        str(id), [{"op": "delete", "entity": "room", "id": id}], max_length=settings.ROOM_STATE_STREAM_LENGTH
+    )
 
     return {"message": "Room deleted"}
 
 
 @router.delete("/db_room/{id}", dependencies=[Depends(get_current_superuser)])
-@cache("{current_user_id}_room_cache", resource_id_name="id", to_invalidate_extra={"{current_user_id}_rooms": "{current_user_id}"})
+@cache(
+    "{current_user[id]}_room_cache",
+    resource_id_name="id",
+    to_invalidate_extra={"{current_user[id]}_rooms": "{current_user[id]}"},
+    tags_to_invalidate=["room_snapshot:{id}"],
+)
 async def erase_db_room(
     request: Request, 
     id: int, 
@@ -123,4 +191,8 @@ async def erase_db_room(
         raise NotFoundException("Room not found")
 
     await crud_room.db_delete(db=db, id=id)
+    await room_state.publish_changes(
+        str(id), [{"op": "delete", "entity": "room", "id": id}], max_length=settings.ROOM_STATE_STREAM_LENGTH
+    )
+    await room_state.forget(str(id))
     return {"message": "Room deleted from the database"}
@@ -0,0 +1,15 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from ...api.dependencies import get_current_superuser
+from ...core.db.database import get_pool_stats
+from ...core.utils.cache import get_local_cache_stats
+
+router = APIRouter(tags=["stats"])
+
+
+@router.get("/stats", dependencies=[Depends(get_current_superuser)])
+async def read_stats() -> dict[str, Any]:
+    """Return the counters of this worker: its database connection pool and its local cache, per key prefix."""
+    return {"database_pool": get_pool_stats(), "local_cache": get_local_cache_stats()}
@@ -1,21 +1,42 @@
 from typing import Annotated, Any, cast
 
 from fastapi import APIRouter, Depends, Request
+from fastapi.encoders import jsonable_encoder
 from fastcrud.paginated import PaginatedListResponse, compute_offset, paginated_response
+from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...api.dependencies import get_current_superuser, get_current_user
-from ...core.db.database import async_get_db
-from ...core.exceptions.http_exceptions import ForbiddenException, NotFoundException
-from ...core.utils.cache import cache
+from ...core.config import settings
+from ...core.db.database import async_get_db, async_get_read_db
+from ...core.exceptions.http_exceptions import ConflictException, ForbiddenException, NotFoundException
+from ...core.utils import room_state, timer_engine
+from ...core.utils.cache import cache, invalidate_tags
+from ...core.utils.timer_engine import TimerAction, TimerState, TimerTransitionError
+from ...crud.crud_display import crud_display
+from ...crud.crud_rooms import crud_room
 from ...crud.crud_timer import crud_timer
 from ...crud.crud_users import crud_users
-from ...schemas.timer import TimerCreate, TimerCreateInternal, TimerRead, TimerUpdate
+from ...schemas.display import DisplayRead
+from ...schemas.timer import (
+    TimerCreate,
+    TimerCreateInternal,
+    TimerRead,
+    TimerStateRead,
+    TimerTransition,
+    TimerUpdate,
+)
 from ...schemas.user import UserRead
 
 router = APIRouter(tags=["timers"])
 
 
+async def _publish_timer_changes(room_id: int, changes: list[dict[str, Any]]) -> None:
+    changes = jsonable_encoder(changes)
+    await room_state.publish_changes(str(room_id), changes, max_length=settings.ROOM_STATE_STREAM_LENGTH)
+    await invalidate_tags(f"room_snapshot:{room_id}")
+
+
 @router.post("/timer", response_model=TimerRead, status_code=201)
 async def create_timer(
     request: Request,
@@ -33,19 +54,25 @@ async def create_timer(
     if timer_read is None:
         raise NotFoundException("Created timer not found")
 
+    await _publish_timer_changes(
+        timer.room_id, [{"op": "create", "entity": "timer", "id": created_timer.id, "fields": timer_read}]
+    )
+
     return cast(TimerRead, timer_read)
 
 
 @router.get("/timers", response_model=PaginatedListResponse[TimerRead])
 @cache(
-    key_prefix="user_{current_user_id}_timers:page_{page}:items_per_page:{items_per_page}",
-    resource_id_name="current_user_id",
+    key_prefix="user_{current_user[id]}_timers:page_{page}:items_per_page:{items_per_page}",
+    resource_id_name="current_user[id]",
     expiration=60,
+    raw_response=True,
+    cache_control="private, no-cache",
 )
 async def read_timers(
     request: Request,
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
     page: int = 1,
     items_per_page: int = 10,
 ) -> dict:
@@ -62,9 +89,15 @@ async def read_timers(
 
 
 @router.get("/timer/{timer_id}", response_model=TimerRead)
-@cache(key_prefix="user_{current_user_id}_timer_{timer_id}", resource_id_name="timer_id")
+@cache(
+    key_prefix="user_{current_user[id]}_timer_{timer_id}",
+    resource_id_name="timer_id",
+    tags=["timer:{timer_id}"],
+    raw_response=True,
+    cache_control="private, no-cache",
+)
 async def read_timer(
-    request: Request, timer_id: int, current_user: Annotated[dict, Depends(get_current_user)], db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, timer_id: int, current_user: Annotated[dict, Depends(get_current_user)], db: Annotated[AsyncSession, Depends(async_get_read_db)]
 ) -> TimerRead:
     db_timer = await crud_timer.get(
         db=db, id=timer_id, created_by_user_id=current_user["id"], is_deleted=False, schema_to_select=TimerRead
@@ -76,7 +109,7 @@ async def read_timer(
 
 
 @router.patch("/timer/{timer_id}")
-@cache("user_{current_user_id}_timer_{timer_id}", resource_id_name="timer_id", pattern_to_invalidate_extra=["user_{current_user_id}_timers:*"])
+@cache("user_{current_user[id]}_timer_{timer_id}", resource_id_name="timer_id", pattern_to_invalidate_extra=["user_{current_user[id]}_timers:*"])
 async def update_timer(
     request: Request,
     timer_id: int,
@@ -88,16 +121,37 @@ async def update_timer(
     if db_timer is None:
         raise NotFoundException("Timer not found")
 
+    db_timer = cast(dict[str, Any], db_timer)
     # Check if current user owns the timer
-    if db_timer.created_by_user_id != current_user["id"]:
+    if db_timer["created_by_user_id"] != current_user["id"]:
         raise ForbiddenException()
 
     await crud_timer.update(db=db, object=values, id=timer_id)
+    if values.duration_seconds is not None or values.timer_type is not None:
+        await timer_engine.forget(timer_id)
+
+    changes: list[dict[str, Any]] = []
+    fields = room_state.diff(db_timer, values.model_dump(exclude_unset=True))
+    if fields.get("display_id") is not None:
+        # Snapshots only hold the displays of the room's timers, so the new one is sent along
+        display = await crud_display.get(db=db, id=fields["display_id"], is_deleted=False, schema_to_select=DisplayRead)
+        if display is not None:
+            changes.append({"op": "create", "entity": "display", "id": fields["display_id"], "fields": display})
+
+    if fields:
+        changes.append({"op": "update", "entity": "timer", "id": timer_id, "fields": fields})
+
+    await _publish_timer_changes(db_timer["room_id"], changes)
+
     return {"message": "Timer updated"}
 
 
 @router.delete("/timer/{timer_id}")
-@cache("user_{current_user_id}_timer_{timer_id}", resource_id_name="timer_id", to_invalidate_extra={"user_{current_user_id}_timers": "{current_user_id}"})
+@cache(
+    "user_{current_user[id]}_timer_{timer_id}",
+    resource_id_name="timer_id",
+    pattern_to_invalidate_extra=["user_{current_user[id]}_timers:*"],
+)
 async def delete_timer(
     request: Request,
     timer_id: int,
@@ -108,17 +162,19 @@ async def delete_timer(
     if db_timer is None:
         raise NotFoundException("Timer not found")
 
+    db_timer = cast(dict[str, Any], db_timer)
     # Check if current user owns the timer
-    if db_timer.created_by_user_id != current_user["id"]:
+    if db_timer["created_by_user_id"] != current_user["id"]:
         raise ForbiddenException()
 
     await crud_timer.delete(db=db, id=timer_id)
+    await _publish_timer_changes(db_timer["room_id"], [{"op": "delete", "entity": "timer", "id": timer_id}])
 
     return {"message": "Timer deleted"}
 
 
 @router.delete("/timer/db/{timer_id}", dependencies=[Depends(get_current_superuser)])
-@cache("user_{current_user_id}_timer_{timer_id}", resource_id_name="timer_id", to_invalidate_extra={"user_{current_user_id}_timers": "user_{current_user_id}"})
+@cache("timer_{timer_id}", resource_id_name="timer_id", tags_to_invalidate=["timer:{timer_id}"])
 async def erase_timer_from_db(
     request: Request, timer_id: int, db: Annotated[AsyncSession, Depends(async_get_db)]
 ) -> dict[str, str]:
@@ -126,5 +182,82 @@ async def erase_timer_from_db(
     if db_timer is None:
         raise NotFoundException("Timer not found")
 
+    db_timer = cast(dict[str, Any], db_timer)
     await crud_timer.db_delete(db=db, id=timer_id)
+    await _publish_timer_changes(db_timer["room_id"], [{"op": "delete", "entity": "timer", "id": timer_id}])
     return {"message": "Timer deleted from the database"}
+
+
+async def _get_room_timer(db: AsyncSession, timer_id: int, user_id: int) -> dict[str, Any]:
+    db_timer = await crud_timer.get(db=db, id=timer_id, is_deleted=False, schema_to_select=TimerRead)
+    if db_timer is None:
+        raise NotFoundException("Timer not found")
+
+    db_timer = cast(dict[str, Any], db_timer)
+    if not await crud_room.exists(db=db, id=db_timer["room_id"], created_by_user_id=user_id, is_deleted=False):
+        raise ForbiddenException()
+
+    return db_timer
+
+
+@router.get("/timer/{timer_id}/state", response_model=TimerStateRead)
+async def read_timer_state(
+    request: Request,
+    timer_id: int,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+) -> dict[str, Any]:
+    """Return the state of a timer, with its elapsed and remaining time computed now."""
+    db_timer = await _get_room_timer(db=db, timer_id=timer_id, user_id=current_user["id"])
+    state = await timer_engine.get_state(timer_id) or TimerState.from_timer(db_timer)
+    return state.to_dict()
+
+
+@router.post("/timer/{timer_id}/{action}", response_model=TimerStateRead)
+@cache(
+    "user_{current_user[id]}_timer_{timer_id}",
+    resource_id_name="timer_id",
+    pattern_to_invalidate_extra=["user_{current_user[id]}_timers:*"],
+    tags_to_invalidate=["timer:{timer_id}"],
+)
+async def transition_timer(
+    request: Request,
+    timer_id: int,
+    action: TimerAction,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(async_get_db)],
+    transition: TimerTransition | None = None,
+) -> dict[str, Any]:
+    """Start, pause, resume, stop or adjust a timer.
+
+    The transition is applied atomically on the state of the timer in Redis and persisted, then broadcast to the
+    displays of its room as a single `timer_state` event, numbered in the sequence of the room's changes. Displays
+    compute the time from the anchors of the event, so nothing is written or sent while the timer runs. Returns 409
+    if the action is not allowed in the current status, and 404 if the timer row was deleted or already holds a
+    later transition, in which case nothing is broadcast.
+    """
+    db_timer = await _get_room_timer(db=db, timer_id=timer_id, user_id=current_user["id"])
+    try:
+        state = await timer_engine.transition(
+            TimerState.from_timer(db_timer),
+            action,
+            seconds=transition.seconds if transition is not None else 0,
+            ttl=settings.TIMER_STATE_TTL_SECONDS,
+        )
+    except TimerTransitionError as e:
+        raise ConflictException(e.message)
+
+    try:
+        await crud_timer.update(db=db, object=state.to_columns(), id=timer_id, state_version__lt=state.version)
+    except NoResultFound:
+        raise NotFoundException("Timer not found")
+
+    room_id = str(db_timer["room_id"])
+    await room_state.append(
+        room_id,
+        {"type": "timer_state", "room_id": room_id, "action": action.value, "timer": state.to_dict()},
+        max_length=settings.ROOM_STATE_STREAM_LENGTH,
+    )
+    await invalidate_tags(f"room_snapshot:{room_id}")
+
+    return state.to_dict()
@@ -5,9 +5,10 @@ from fastcrud.paginated import PaginatedListResponse, compute_offset, paginated_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...api.dependencies import get_current_superuser, get_current_user
-from ...core.db.database import async_get_db
+from ...core.db.database import async_get_db, async_get_read_db
 from ...core.exceptions.http_exceptions import DuplicateValueException, ForbiddenException, NotFoundException
-from ...core.security import blacklist_token, get_password_hash, oauth2_scheme
+from ...core.security import blacklist_token, hash_password, oauth2_scheme
+from ...core.utils.user_context import user_context_cache
 from ...crud.crud_rate_limit import crud_rate_limits
 from ...crud.crud_tier import crud_tiers
 from ...crud.crud_users import crud_users
@@ -30,7 +31,7 @@ async def write_user(
         raise DuplicateValueException("Username not available")
 
     user_internal_dict = user.model_dump()
-    user_internal_dict["hashed_password"] = get_password_hash(password=user_internal_dict["password"])
+    user_internal_dict["hashed_password"] = await hash_password(password=user_internal_dict["password"])
     del user_internal_dict["password"]
 
     user_internal = UserCreateInternal(**user_internal_dict)
@@ -45,7 +46,7 @@ async def write_user(
 
 @router.get("/users", response_model=PaginatedListResponse[UserRead])
 async def read_users(
-    request: Request, db: Annotated[AsyncSession, Depends(async_get_db)], page: int = 1, items_per_page: int = 10
+    request: Request, db: Annotated[AsyncSession, Depends(async_get_read_db)], page: int = 1, items_per_page: int = 10
 ) -> dict:
     users_data = await crud_users.get_multi(
         db=db,
@@ -64,7 +65,9 @@ async def read_users_me(request: Request, current_user: Annotated[dict, Depends(
 
 
 @router.get("/user/{username}", response_model=UserRead)
-async def read_user(request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_db)]) -> UserRead:
+async def read_user(
+    request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_read_db)]
+) -> UserRead:
     db_user = await crud_users.get(db=db, username=username, is_deleted=False, schema_to_select=UserRead)
     if db_user is None:
         raise NotFoundException("User not found")
@@ -84,21 +87,22 @@ async def patch_user(
     if db_user is None:
         raise NotFoundException("User not found")
 
-    db_user = cast(UserRead, db_user)
-    if db_user.username != current_user["username"]:
+    db_user = cast(dict[str, Any], db_user)
+    if db_user["username"] != current_user["username"]:
         raise ForbiddenException()
 
-    if values.username != db_user.username:
+    if values.username != db_user["username"]:
         existing_username = await crud_users.exists(db=db, username=values.username)
         if existing_username:
             raise DuplicateValueException("Username not available")
 
-    if values.email != db_user.email:
+    if values.email != db_user["email"]:
         existing_email = await crud_users.exists(db=db, email=values.email)
         if existing_email:
             raise DuplicateValueException("Email is already registered")
 
     await crud_users.update(db=db, object=values, username=username)
+    await user_context_cache.invalidate(db_user["username"], db_user["email"], values.username, values.email)
     return {"message": "User updated"}
 
 
@@ -117,7 +121,9 @@ async def erase_user(
     if username != current_user["username"]:
         raise ForbiddenException()
 
+    db_user = cast(dict[str, Any], db_user)
     await crud_users.delete(db=db, username=username)
+    await user_context_cache.invalidate(db_user["username"], db_user["email"])
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted"}
 
@@ -134,6 +140,7 @@ async def erase_db_user(
         raise NotFoundException("User not found")
 
     await crud_users.db_delete(db=db, username=username)
+    await user_context_cache.invalidate(username)
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted from the database"}
 
@@ -199,10 +206,11 @@ async def patch_user_tier(
     if db_user is None:
         raise NotFoundException("User not found")
 
-    db_user = cast(UserRead, db_user)
+    db_user = cast(dict[str, Any], db_user)
     db_tier = await crud_tiers.get(db=db, id=values.tier_id, schema_to_select=TierRead)
     if db_tier is None:
         raise NotFoundException("Tier not found")
 
     await crud_users.update(db=db, object=values.model_dump(), username=username)
-    return {"message": f"User {db_user.name} Tier updated"}
+    await user_context_cache.invalidate(db_user["username"], db_user["email"])
+    return {"message": f"User {db_user['name']} Tier updated"}
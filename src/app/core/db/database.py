@@ -1,10 +1,15 @@
 from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import DeclarativeBase, MappedAsDataclass
+from sqlalchemy.pool import NullPool
 
 from ..config import settings
+from .pool import InstrumentedAsyncQueuePool, asyncpg_connect_args, pool_stats
+from .replicas import LAST_WRITE_COOKIE, POSTGRES_LAG_QUERY, Replica, ReplicaRouter, parse_last_write
 
 
 class Base(DeclarativeBase, MappedAsDataclass):
@@ -15,11 +20,74 @@ DATABASE_URI = settings.POSTGRES_URI
 DATABASE_PREFIX = settings.POSTGRES_ASYNC_PREFIX
 DATABASE_URL = f"{DATABASE_PREFIX}{DATABASE_URI}"
 
-async_engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+
+def create_engine(url: str) -> AsyncEngine:
+    """Create an engine with the pool set by the `DATABASE_POOL_*` settings, or none with `DATABASE_NULL_POOL`."""
+    connect_args: dict[str, Any] = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args = asyncpg_connect_args(settings.DATABASE_STATEMENT_CACHE_SIZE, settings.DATABASE_POOLER_MODE)
+
+    if settings.DATABASE_NULL_POOL:
+        return create_async_engine(url, echo=False, future=True, poolclass=NullPool, connect_args=connect_args)
+
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        connect_args=connect_args,
+    )
+
+
+def create_replica(url: str) -> Replica:
+    """Create a read replica, measuring its lag with `POSTGRES_LAG_QUERY` if it is a Postgres database."""
+    engine = create_engine(url)
+    return Replica(
+        name=engine.url.render_as_string(hide_password=True),
+        engine=engine,
+        session_maker=async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False),
+        lag_query=POSTGRES_LAG_QUERY if engine.dialect.name == "postgresql" else None,
+    )
+
+
+async_engine = create_engine(DATABASE_URL)
 
 local_session = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
 
+read_router = ReplicaRouter(
+    local_session,
+    replicas=[create_replica(url.strip()) for url in settings.DATABASE_READ_REPLICA_URLS.split(",") if url.strip()],
+    max_lag=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+)
+
 
 async def async_get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Yield a database session for the request.
+
+    No connection is checked out of the pool until the session first executes a statement, so requests that never
+    query the database, such as the ones answered from the cache, do not hold one.
+    """
     async with local_session() as db:
         yield db
+
+
+async def async_get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Yield a database session for a read-only request, bound to a read replica when one is up to date enough.
+
+    Without `DATABASE_READ_REPLICA_URLS` this is the same session as `async_get_db`. Use it for GET routes that do not
+    write: writes through this session may reach a replica, which rejects them. Clients that wrote in the last
+    `DATABASE_READ_YOUR_WRITES_SECONDS` seconds, as recorded by `ReadYourWritesMiddleware`, read from the primary.
+    """
+    last_write = parse_last_write(request.cookies.get(LAST_WRITE_COOKIE), settings.DATABASE_READ_YOUR_WRITES_SECONDS)
+    async with read_router.choose(last_write)() as db:
+        yield db
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Return the occupancy and checkout wait times of the connection pool of `async_engine`."""
+    return pool_stats(async_engine.pool)
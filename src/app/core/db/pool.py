@@ -0,0 +1,104 @@
+import time
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+
+
+def prepared_statement_name() -> str:
+    """Return a unique prepared statement name, which cannot collide on a server connection shared by a pooler."""
+    return f"__asyncpg_{uuid4()}__"
+
+
+def asyncpg_connect_args(statement_cache_size: int = 100, pooler_mode: bool = False) -> dict[str, Any]:
+    """Return the `connect_args` of an asyncpg engine.
+
+    Parameters
+    ----------
+    statement_cache_size: int
+        Prepared statements cached per connection, ignored in pooler mode.
+    pooler_mode: bool
+        Whether the engine connects through a pooler in transaction mode, such as PgBouncer with
+        `pool_mode = transaction`. Consecutive transactions of a client connection can then run on different server
+        connections, where statements it prepared earlier do not exist: both the SQLAlchemy and the asyncpg
+        statement caches are disabled, and statements are prepared under unique names.
+
+    Returns
+    -------
+    dict[str, Any]
+        Arguments for `create_async_engine(..., connect_args=...)`.
+    """
+    if pooler_mode:
+        return {
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": prepared_statement_name,
+        }
+
+    return {"prepared_statement_cache_size": statement_cache_size}
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """`AsyncAdaptedQueuePool` that also records how long checkouts wait for a connection.
+
+    The wait time of a checkout includes opening a new connection when the pool is allowed to, and waiting for another
+    request to return one otherwise. Checkouts still waiting after `pool_timeout` seconds raise a `TimeoutError` and
+    are counted in `timeouts`.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+
+        finally:
+            waited = time.perf_counter() - started_at
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def pool_stats(pool: Pool) -> dict[str, Any]:
+    """Return the occupancy of a connection pool and, for an `InstrumentedAsyncQueuePool`, its checkout wait times.
+
+    Parameters
+    ----------
+    pool: Pool
+        The pool of an engine, `engine.pool`.
+
+    Returns
+    -------
+    dict[str, Any]
+        `size`, `checked_out`, `checked_in` and `overflow` connections, plus the number of `checkouts` and
+        `timeouts` and the average and maximum wait, in milliseconds, when the pool records them.
+    """
+    stats: dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+        )
+
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        stats.update(
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            wait_ms_avg=round(pool.wait_seconds_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            wait_ms_max=round(pool.wait_seconds_max * 1000, 3),
+        )
+
+    return stats
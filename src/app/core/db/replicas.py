@@ -0,0 +1,197 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from ..logger import logging
+
+logger = logging.getLogger(__name__)
+
+# Cookie holding the Unix time of the last write of a client, set by `ReadYourWritesMiddleware`
+LAST_WRITE_COOKIE = "db_last_write"
+
+# Seconds a Postgres standby is behind its primary, 0 when it replayed everything it received. Measuring
+# `now() - pg_last_xact_replay_timestamp()` alone would report an idle primary as lag. WAL the standby has not
+# received yet is not counted, so this is a lower bound: enough to shed lagging replicas, not to prove a write reached
+# one.
+POSTGRES_LAG_QUERY = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+@dataclass
+class Replica:
+    """A read replica, with the lag measured by the last check.
+
+    Attributes
+    ----------
+    name: str
+        Name of the replica in logs and stats, its host and database.
+    engine: AsyncEngine
+        The engine connected to the replica.
+    session_maker: async_sessionmaker[AsyncSession]
+        Sessions bound to `engine`.
+    lag_query: str | None
+        Statement returning the lag of the replica in seconds, `POSTGRES_LAG_QUERY` for Postgres. None for replicas
+        that cannot measure it, such as the SQLite files used as stand-ins in development, which are always
+        considered up to date.
+    healthy: bool
+        False until the first successful check, and after a failed one.
+    lag: float | None
+        Seconds the replica was behind the primary at the last check.
+    errors: int
+        Number of failed checks.
+    """
+
+    name: str
+    engine: AsyncEngine
+    session_maker: async_sessionmaker[AsyncSession]
+    lag_query: str | None = None
+    healthy: bool = False
+    lag: float | None = None
+    errors: int = 0
+
+
+def parse_last_write(value: str | None, window: float) -> float | None:
+    """Return the Unix time stored in a `LAST_WRITE_COOKIE` cookie, None if it is invalid or older than `window`."""
+    if not value:
+        return None
+
+    try:
+        last_write = float(value)
+    except ValueError:
+        return None
+
+    return last_write if time.time() - last_write < window else None
+
+
+class ReplicaRouter:
+    """Route read-only sessions to read replicas that are close enough to the primary.
+
+    The lag of every replica is measured every `check_interval` seconds. Reads go to the replicas that answered the
+    last check with a lag under `max_lag`, in turn, and to the primary when there is none. A request whose user wrote
+    recently, see `ReadYourWritesMiddleware`, goes to the primary, so users read their own writes.
+
+    Parameters
+    ----------
+    primary: async_sessionmaker[AsyncSession]
+        Sessions bound to the primary.
+    replicas: list[Replica], optional
+        The read replicas. Without any, every read goes to the primary.
+    max_lag: float, optional
+        Seconds of lag above which a replica stops serving reads.
+
+    Note
+    ----
+        The lag is measured on the replica and does not count the WAL it has not received yet, so it cannot tell
+        whether a given write reached the replica. Users who wrote are therefore kept on the primary for the whole
+        window of `ReadYourWritesMiddleware` rather than moved to a replica that seems to have caught up.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replicas: list[Replica] | None = None,
+        max_lag: float = 5.0,
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas or []
+        self.max_lag = max_lag
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self._turn = itertools.count()
+        self._task: asyncio.Task | None = None
+
+    def choose(self, last_write: float | None = None) -> async_sessionmaker[AsyncSession]:
+        """Return the session maker a read should use.
+
+        Parameters
+        ----------
+        last_write: float | None
+            Unix time of the last write of the user, if it is recent.
+
+        Returns
+        -------
+        async_sessionmaker[AsyncSession]
+            The session maker of a replica that is healthy and under `max_lag`, or the one of the primary when there
+            is none or `last_write` is given.
+        """
+        candidates = [
+            replica
+            for replica in self.replicas
+            if last_write is None and replica.healthy and replica.lag is not None and replica.lag <= self.max_lag
+        ]
+        if not candidates:
+            self.primary_reads += 1
+            return self.primary
+
+        self.replica_reads += 1
+        return candidates[next(self._turn) % len(candidates)].session_maker
+
+    async def check(self) -> None:
+        """Measure the lag of every replica, marking the ones that fail to answer as unhealthy."""
+        await asyncio.gather(*(self._check_replica(replica) for replica in self.replicas))
+
+    async def _check_replica(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                if replica.lag_query is None:
+                    await conn.execute(text("SELECT 1"))
+                    lag = 0.0
+                else:
+                    lag = float((await conn.execute(text(replica.lag_query))).scalar_one() or 0.0)
+
+        except Exception as e:
+            if replica.healthy:
+                logger.error(f"Read replica {replica.name} failed its check, reading from the primary: {e}")
+            replica.healthy = False
+            replica.errors += 1
+            return
+
+        if lag > self.max_lag and (replica.lag is None or replica.lag <= self.max_lag):
+            logger.warning(f"Read replica {replica.name} is {lag:.1f}s behind, reading from the primary")
+
+        replica.healthy = True
+        replica.lag = lag
+
+    async def _run(self, check_interval: float) -> None:
+        while True:
+            await asyncio.sleep(check_interval)
+            await self.check()
+
+    async def start(self, check_interval: float = 1.0) -> None:
+        """Check the replicas, then keep checking them every `check_interval` seconds in the background."""
+        if not self.replicas:
+            return
+
+        await self.check()
+        self._task = asyncio.create_task(self._run(check_interval))
+
+    async def stop(self) -> None:
+        """Stop checking the replicas and close their connections."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the number of reads routed to the primary and the replicas, and the state of every replica."""
+        return {
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "replicas": [
+                {"name": replica.name, "healthy": replica.healthy, "lag": replica.lag, "errors": replica.errors}
+                for replica in self.replicas
+            ],
+        }
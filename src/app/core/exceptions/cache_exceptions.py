@@ -4,6 +4,12 @@ class CacheIdentificationInferenceError(Exception):
         super().__init__(self.message)
 
 
+class CacheKeyTemplateError(Exception):
+    def __init__(self, message: str = "Invalid cache key template.") -> None:
+        self.message = message
+        super().__init__(self.message)
+
+
 class InvalidRequestError(Exception):
     def __init__(self, message: str = "Type of request not supported.") -> None:
         self.message = message
@@ -9,3 +9,13 @@ from fastcrud.exceptions.http_exceptions import (
     DuplicateValueException,
     RateLimitException,
 )
+
+
+class ServiceUnavailableException(CustomException):
+    def __init__(self, detail: str | None = None):
+        super().__init__(status_code=503, detail=detail)
+
+
+class ConflictException(CustomException):
+    def __init__(self, detail: str | None = None):
+        super().__init__(status_code=409, detail=detail)
@@ -1,22 +1,49 @@
+import math
+import time
+from collections import OrderedDict
 from datetime import UTC, datetime, timedelta
 from enum import Enum
 from typing import Any, Literal, cast
 
-import bcrypt
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from pydantic import SecretStr
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..crud.crud_users import crud_users
 from .config import settings
 from .db.crud_token_blacklist import crud_token_blacklist
+from .logger import logging
 from .schemas import TokenBlacklistCreate, TokenData
+from .utils.jwt_keyring import InvalidTokenError, Keyring
+from .utils.password_hasher import PasswordHasher
+from .utils.token_blacklist import hash_token, token_blacklist
+
+logger = logging.getLogger(__name__)
 
 SECRET_KEY: SecretStr = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
+TOKEN_CLAIMS_CACHE_SIZE = settings.TOKEN_CLAIMS_CACHE_SIZE
+ACCESS_TOKEN_USER_CLAIMS = settings.ACCESS_TOKEN_USER_CLAIMS
+
+token_keyring = Keyring.load(
+    algorithm=ALGORITHM,
+    backend=settings.JWT_BACKEND,
+    secret_key=SECRET_KEY.get_secret_value(),
+    key_id=settings.JWT_KEY_ID,
+    private_key_file=settings.JWT_PRIVATE_KEY_FILE,
+    public_keys_dir=settings.JWT_PUBLIC_KEYS_DIR,
+)
+
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_wait=settings.PASSWORD_HASH_MAX_WAIT_SECONDS,
+)
+
+# Decoded claims of recently verified tokens, by token hash, least recently used first
+_claims_cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
@@ -27,13 +54,19 @@ class TokenType(str, Enum):
 
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    correct_password: bool = bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
-    return correct_password
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
 
 def get_password_hash(password: str) -> str:
-    hashed_password: str = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-    return hashed_password
+    """Hash a password in the calling thread, blocking it for the whole bcrypt computation.
+
+    Only meant for synchronous callers such as scripts and the admin interface, use `hash_password` in coroutines.
+    """
+    return password_hasher.hash_sync(password)
 
 
 async def authenticate_user(username_or_email: str, password: str, db: AsyncSession) -> dict[str, Any] | Literal[False]:
@@ -49,6 +82,13 @@ async def authenticate_user(username_or_email: str, password: str, db: AsyncSess
     if not await verify_password(password, db_user["hashed_password"]):
         return False
 
+    if password_hasher.needs_rehash(db_user["hashed_password"]):
+        try:
+            hashed_password = await password_hasher.hash(password)
+            await crud_users.update(db=db, object={"hashed_password": hashed_password}, id=db_user["id"])
+        except Exception as e:
+            logger.warning(f"Could not upgrade the password hash of user {db_user['id']}: {e}")
+
     return db_user
 
 
@@ -59,7 +99,7 @@ async def create_access_token(data: dict[str, Any], expires_delta: timedelta | N
     else:
         expire = datetime.now(UTC).replace(tzinfo=None) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire, "token_type": TokenType.ACCESS})
-    encoded_jwt: str = jwt.encode(to_encode, SECRET_KEY.get_secret_value(), algorithm=ALGORITHM)
+    encoded_jwt: str = token_keyring.encode(to_encode)
     return encoded_jwt
 
 
@@ -70,10 +110,23 @@ async def create_refresh_token(data: dict[str, Any], expires_delta: timedelta |
     else:
         expire = datetime.now(UTC).replace(tzinfo=None) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "token_type": TokenType.REFRESH})
-    encoded_jwt: str = jwt.encode(to_encode, SECRET_KEY.get_secret_value(), algorithm=ALGORITHM)
+    encoded_jwt: str = token_keyring.encode(to_encode)
     return encoded_jwt
 
 
+def create_user_claims(user: dict[str, Any]) -> dict[str, Any]:
+    """Return the claims identifying a user in its access tokens.
+
+    The `sub` claim is the username of the user. When `ACCESS_TOKEN_USER_CLAIMS` is enabled, the `id`, `tier_id` and
+    `is_superuser` of the user are added, see `decode_user_claims`.
+    """
+    claims: dict[str, Any] = {"sub": user["username"]}
+    if ACCESS_TOKEN_USER_CLAIMS:
+        claims.update(id=user["id"], tier_id=user["tier_id"], is_superuser=user["is_superuser"])
+
+    return claims
+
+
 async def verify_token(token: str, expected_token_type: TokenType, db: AsyncSession) -> TokenData | None:
     """Verify a JWT token and return TokenData if valid.
 
@@ -91,23 +144,124 @@ async def verify_token(token: str, expected_token_type: TokenType, db: AsyncSess
     TokenData | None
         TokenData instance if the token is valid, None otherwise.
     """
-    is_blacklisted = await crud_token_blacklist.exists(db, token=token)
-    if is_blacklisted:
+    token_hash = hash_token(token)
+    username_or_email = decode_token_subject(token, expected_token_type, token_hash)
+    if username_or_email is None:
+        return None
+
+    if await is_token_blacklisted(token, db, token_hash):
+        return None
+
+    return TokenData(username_or_email=username_or_email)
+
+
+def decode_token(token: str, token_hash: str | None = None) -> dict[str, Any] | None:
+    """Verify the signature and expiration of a JWT token and return its claims.
+
+    Claims are kept in a small LRU cache by token hash, so a token sent with every request is only decoded once.
+
+    Parameters
+    ----------
+    token: str
+        The JWT token to be decoded.
+    token_hash: str | None
+        The hash of the token, computed if not given.
+
+    Returns
+    -------
+    dict[str, Any] | None
+        The claims if the token is valid, None otherwise. The dictionary is shared with the cache and must not be
+        modified.
+    """
+    token_hash = token_hash or hash_token(token)
+    payload = _claims_cache.get(token_hash)
+    if payload is not None:
+        if payload.get("exp", math.inf) > time.time():
+            _claims_cache.move_to_end(token_hash)
+            return payload
+
+        del _claims_cache[token_hash]
         return None
 
     try:
-        payload = jwt.decode(token, SECRET_KEY.get_secret_value(), algorithms=[ALGORITHM])
-        username_or_email: str | None = payload.get("sub")
-        token_type: str | None = payload.get("token_type")
+        payload = token_keyring.decode(token)
+    except InvalidTokenError:
+        return None
+
+    _claims_cache[token_hash] = payload
+    if len(_claims_cache) > TOKEN_CLAIMS_CACHE_SIZE:
+        _claims_cache.popitem(last=False)
+
+    return payload
+
 
-        if username_or_email is None or token_type != expected_token_type:
-            return None
+def decode_token_subject(token: str, expected_token_type: TokenType, token_hash: str | None = None) -> str | None:
+    """Verify the signature, expiration and type of a JWT token and return its subject, without the blacklist check.
 
-        return TokenData(username_or_email=username_or_email)
+    Only use it where a revoked token is acceptable, for instance to identify the caller of a request for rate
+    limiting, as it does not check the blacklist.
 
-    except JWTError:
+    Parameters
+    ----------
+    token: str
+        The JWT token to be verified.
+    expected_token_type: TokenType
+        The expected type of token (access or refresh)
+    token_hash: str | None
+        The hash of the token, computed if not given.
+
+    Returns
+    -------
+    str | None
+        The `sub` claim, the username or email of the user, if the token is valid, None otherwise.
+    """
+    payload = decode_token(token, token_hash)
+    if payload is None:
+        return None
+
+    username_or_email: str | None = payload.get("sub")
+    token_type: str | None = payload.get("token_type")
+    if username_or_email is None or token_type != expected_token_type:
+        return None
+
+    return username_or_email
+
+
+def decode_user_claims(token: str, token_hash: str | None = None) -> dict[str, Any] | None:
+    """Return the user embedded in the claims of an access token, see `create_user_claims`.
+
+    Like `decode_token_subject`, it does not check the blacklist, call `verify_token` first. The claims reflect the
+    user when the token was issued: a change of tier or privileges only shows in the tokens issued afterwards.
+
+    Returns
+    -------
+    dict[str, Any] | None
+        The `id`, `username`, `tier_id` and `is_superuser` of the user, or None if the token is invalid or was issued
+        without user claims.
+    """
+    payload = decode_token(token, token_hash)
+    if payload is None or "id" not in payload or payload.get("token_type") != TokenType.ACCESS:
         return None
 
+    return {
+        "id": payload["id"],
+        "username": payload["sub"],
+        "tier_id": payload.get("tier_id"),
+        "is_superuser": payload.get("is_superuser", False),
+    }
+
+
+async def is_token_blacklisted(token: str, db: AsyncSession, token_hash: str | None = None) -> bool:
+    """Return whether a token was revoked.
+
+    Checks the Redis blacklist, fronted by its Bloom filter, or the `token_blacklist` table if the Redis blacklist is
+    not initialized.
+    """
+    if token_blacklist.client is not None:
+        return await token_blacklist.contains(token_hash or hash_token(token))
+
+    return await crud_token_blacklist.exists(db, token=token)
+
 
 async def blacklist_tokens(access_token: str, refresh_token: str, db: AsyncSession) -> None:
     """Blacklist both access and refresh tokens.
@@ -122,16 +276,22 @@ async def blacklist_tokens(access_token: str, refresh_token: str, db: AsyncSessi
         Database session for performing database operations.
     """
     for token in [access_token, refresh_token]:
-        payload = jwt.decode(token, SECRET_KEY.get_secret_value(), algorithms=[ALGORITHM])
-        exp_timestamp = payload.get("exp")
-        if exp_timestamp is not None:
-            expires_at = datetime.fromtimestamp(exp_timestamp)
-            await crud_token_blacklist.create(db, object=TokenBlacklistCreate(token=token, expires_at=expires_at))
+        await blacklist_token(token, db)
 
 
 async def blacklist_token(token: str, db: AsyncSession) -> None:
-    payload = jwt.decode(token, SECRET_KEY.get_secret_value(), algorithms=[ALGORITHM])
+    """Blacklist a token until it expires.
+
+    The token is written to the `token_blacklist` table, which keeps a durable copy, and to the Redis blacklist checked
+    by `verify_token`.
+    """
+    payload = token_keyring.decode(token)
     exp_timestamp = payload.get("exp")
     if exp_timestamp is not None:
         expires_at = datetime.fromtimestamp(exp_timestamp)
         await crud_token_blacklist.create(db, object=TokenBlacklistCreate(token=token, expires_at=expires_at))
+
+        if token_blacklist.client is not None:
+            token_hash = hash_token(token)
+            await token_blacklist.add(token_hash, exp_timestamp)
+            _claims_cache.pop(token_hash, None)
@@ -13,7 +13,10 @@ from fastapi.openapi.utils import get_openapi
 
 from ..api.dependencies import get_current_superuser
 from ..core.utils.rate_limit import rate_limiter
+from ..core.utils.rate_limit_policies import rate_limit_policies
 from ..middleware.client_cache_middleware import ClientCacheMiddleware
+from ..middleware.rate_limit_middleware import RateLimitMiddleware
+from ..middleware.read_your_writes_middleware import ReadYourWritesMiddleware
 from ..models import *  # noqa: F403
 from .config import (
     AppSettings,
@@ -24,11 +27,18 @@ from .config import (
     RedisCacheSettings,
     RedisQueueSettings,
     RedisRateLimiterSettings,
+    RedisTokenBlacklistSettings,
+    RedisUserContextSettings,
+    RoomEventSettings,
     settings,
 )
-from .db.database import Base
+from .db.database import Base, read_router
 from .db.database import async_engine as engine
 from .utils import cache, queue
+from .utils.clock_sync import clock_sync
+from .utils.room_events import room_event_hub
+from .utils.token_blacklist import token_blacklist
+from .utils.user_context import user_context_cache
 
 
 # -------------- database --------------
@@ -37,6 +47,21 @@ async def create_tables() -> None:
         await conn.run_sync(Base.metadata.create_all)
 
 
+async def start_read_replicas() -> None:
+    await read_router.start(check_interval=settings.DATABASE_REPLICA_CHECK_INTERVAL_SECONDS)
+
+
+async def stop_read_replicas() -> None:
+    await read_router.stop()
+
+
+# -------------- redis --------------
+def create_redis_client(url: str) -> redis.Redis:
+    """Return a Redis client with a connection pool of its own, closed with the client."""
+    pool: redis.ConnectionPool = redis.ConnectionPool.from_url(url)
+    return redis.Redis.from_pool(pool)  # type: ignore
+
+
 # -------------- cache --------------
 async def create_redis_cache_pool() -> None:
     cache.pool = redis.ConnectionPool.from_url(settings.REDIS_CACHE_URL)
@@ -45,8 +70,17 @@ async def create_redis_cache_pool() -> None:
     # Initialize the custom RedisClient
     await cache.redis_client.connect(settings.REDIS_CACHE_URL)
 
+    if settings.REDIS_CACHE_LOCAL_ENABLED:
+        await cache.start_local_cache(
+            max_entries=settings.REDIS_CACHE_LOCAL_MAX_ENTRIES,
+            max_bytes=settings.REDIS_CACHE_LOCAL_MAX_BYTES,
+            ttl=settings.REDIS_CACHE_LOCAL_TTL,
+            channel=settings.REDIS_CACHE_INVALIDATION_CHANNEL,
+        )
+
 
 async def close_redis_cache_pool() -> None:
+    await cache.stop_local_cache()
     if cache.client is not None:
         await cache.client.aclose()  # type: ignore
 
@@ -63,14 +97,84 @@ async def close_redis_queue_pool() -> None:
 
 # -------------- rate limit --------------
 async def create_redis_rate_limit_pool() -> None:
-    rate_limiter.initialize(settings.REDIS_RATE_LIMIT_URL)  # type: ignore
+    rate_limiter.initialize(settings.REDIS_RATE_LIMIT_URL, settings.RATE_LIMIT_ALGORITHM)  # type: ignore
+    await rate_limit_policies.start(rate_limiter.get_client(), channel=settings.RATE_LIMIT_POLICY_CHANNEL)  # type: ignore
+    if settings.RATE_LIMIT_APPROXIMATE:  # type: ignore
+        rate_limiter.use_local_counters(
+            sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL_MS / 1000,  # type: ignore
+            sync_hits=settings.RATE_LIMIT_SYNC_HITS,  # type: ignore
+            max_error=settings.RATE_LIMIT_MAX_ERROR,  # type: ignore
+        )
 
 
 async def close_redis_rate_limit_pool() -> None:
+    await rate_limit_policies.stop()
+    if rate_limiter.local_counters is not None:
+        await rate_limiter.local_counters.stop()
     if rate_limiter.client is not None:
         await rate_limiter.client.aclose()  # type: ignore
 
 
+# -------------- token blacklist --------------
+async def create_redis_token_blacklist_pool() -> None:
+    await token_blacklist.start(
+        create_redis_client(settings.REDIS_TOKEN_BLACKLIST_URL),
+        channel=settings.TOKEN_BLACKLIST_CHANNEL,
+        capacity=settings.TOKEN_BLACKLIST_BLOOM_CAPACITY,
+        error_rate=settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE,
+        rebuild_interval=settings.TOKEN_BLACKLIST_BLOOM_REBUILD_SECONDS,
+    )
+
+
+async def close_redis_token_blacklist_pool() -> None:
+    client = token_blacklist.client
+    await token_blacklist.stop()
+    if client is not None:
+        await client.aclose()  # type: ignore
+
+
+# -------------- user context --------------
+async def create_redis_user_context_pool() -> None:
+    await user_context_cache.start(
+        create_redis_client(settings.REDIS_USER_CONTEXT_URL),
+        channel=settings.USER_CONTEXT_CHANNEL,
+        ttl=settings.USER_CONTEXT_TTL,
+        local_ttl=settings.USER_CONTEXT_LOCAL_TTL,
+        max_entries=settings.USER_CONTEXT_LOCAL_MAX_ENTRIES,
+    )
+
+
+async def close_redis_user_context_pool() -> None:
+    client = user_context_cache.client
+    await user_context_cache.stop()
+    if client is not None:
+        await client.aclose()  # type: ignore
+
+
+# -------------- room events --------------
+async def start_room_events() -> None:
+    await room_event_hub.start(
+        create_redis_client(settings.REDIS_CACHE_URL),
+        pattern=settings.ROOM_EVENTS_CHANNEL_PATTERN,
+        buffer_size=settings.ROOM_EVENTS_BUFFER_SIZE,
+        heartbeat_interval=settings.ROOM_EVENTS_HEARTBEAT_SECONDS,
+        slow_consumer_timeout=settings.ROOM_EVENTS_SLOW_CONSUMER_SECONDS,
+    )
+    await clock_sync.start(
+        room_event_hub.client,
+        calibration_interval=settings.CLOCK_SYNC_CALIBRATION_SECONDS,
+        max_clients=settings.CLOCK_SYNC_MAX_CLIENTS,
+    )
+
+
+async def stop_room_events() -> None:
+    client = room_event_hub.client
+    await clock_sync.stop()
+    await room_event_hub.stop()
+    if client is not None:
+        await client.aclose()  # type: ignore
+
+
 # -------------- application --------------
 async def set_threadpool_tokens(number_of_tokens: int = 100) -> None:
     limiter = anyio.to_thread.current_default_thread_limiter()
@@ -85,6 +189,9 @@ def lifespan_factory(
         | ClientSideCacheSettings
         | RedisQueueSettings
         | RedisRateLimiterSettings
+        | RedisTokenBlacklistSettings
+        | RedisUserContextSettings
+        | RoomEventSettings
         | EnvironmentSettings
     ),
     create_tables_on_start: bool = True,
@@ -110,9 +217,21 @@ def lifespan_factory(
             if isinstance(settings, RedisRateLimiterSettings):
                 await create_redis_rate_limit_pool()
 
+            if isinstance(settings, RedisTokenBlacklistSettings):
+                await create_redis_token_blacklist_pool()
+
+            if isinstance(settings, RedisUserContextSettings):
+                await create_redis_user_context_pool()
+
+            if isinstance(settings, RoomEventSettings):
+                await start_room_events()
+
             if create_tables_on_start:
                 await create_tables()
 
+            if isinstance(settings, DatabaseSettings):
+                await start_read_replicas()
+
             initialization_complete.set()
 
             yield
@@ -127,6 +246,18 @@ def lifespan_factory(
             if isinstance(settings, RedisRateLimiterSettings):
                 await close_redis_rate_limit_pool()
 
+            if isinstance(settings, RedisTokenBlacklistSettings):
+                await close_redis_token_blacklist_pool()
+
+            if isinstance(settings, RedisUserContextSettings):
+                await close_redis_user_context_pool()
+
+            if isinstance(settings, RoomEventSettings):
+                await stop_room_events()
+
+            if isinstance(settings, DatabaseSettings):
+                await stop_read_replicas()
+
     return lifespan
 
 
@@ -140,6 +271,9 @@ def create_application(
         | ClientSideCacheSettings
         | RedisQueueSettings
         | RedisRateLimiterSettings
+        | RedisTokenBlacklistSettings
+        | RedisUserContextSettings
+        | RoomEventSettings
         | EnvironmentSettings
     ),
     create_tables_on_start: bool = True,
@@ -161,11 +295,17 @@ def create_application(
         It determines the configuration applied:
 
         - AppSettings: Configures basic app metadata like name, description, contact, and license info.
-        - DatabaseSettings: Adds event handlers for initializing database tables during startup.
+        - DatabaseSettings: Adds event handlers for initializing database tables during startup, and for checking the
+          read replicas, with the read-your-writes middleware, when `DATABASE_READ_REPLICA_URLS` is set.
         - RedisCacheSettings: Sets up event handlers for creating and closing a Redis cache pool.
         - ClientSideCacheSettings: Integrates middleware for client-side caching.
         - RedisQueueSettings: Sets up event handlers for creating and closing a Redis queue pool.
-        - RedisRateLimiterSettings: Sets up event handlers for creating and closing a Redis rate limiter pool.
+        - RedisRateLimiterSettings: Sets up event handlers for creating and closing a Redis rate limiter pool, and the
+          rate limit middleware if enabled.
+        - RedisTokenBlacklistSettings: Sets up event handlers for starting and stopping the Redis token blacklist.
+        - RedisUserContextSettings: Sets up event handlers for starting and stopping the user context cache.
+        - RoomEventSettings: Sets up event handlers for starting and stopping the room event fan-out and the
+          measurement of the Redis clock offset for clock synchronization.
         - EnvironmentSettings: Conditionally sets documentation URLs and integrates custom routes for API documentation
           based on the environment type.
 
@@ -209,6 +349,20 @@ def create_application(
     if isinstance(settings, ClientSideCacheSettings):
         application.add_middleware(ClientCacheMiddleware, max_age=settings.CLIENT_CACHE_MAX_AGE)
 
+    if isinstance(settings, DatabaseSettings) and settings.DATABASE_READ_REPLICA_URLS:
+        application.add_middleware(ReadYourWritesMiddleware, window=settings.DATABASE_READ_YOUR_WRITES_SECONDS)
+
+    # Added last so it is the outermost middleware and rejects requests before anything else runs
+    if isinstance(settings, RedisRateLimiterSettings) and settings.RATE_LIMIT_MIDDLEWARE_ENABLED:
+        application.add_middleware(
+            RateLimitMiddleware,
+            limit=settings.RATE_LIMIT_MIDDLEWARE_LIMIT,
+            period=settings.RATE_LIMIT_MIDDLEWARE_PERIOD,
+            exclude_paths=tuple(
+                path.strip() for path in settings.RATE_LIMIT_MIDDLEWARE_EXCLUDE_PATHS.split(",") if path.strip()
+            ),
+        )
+
     if isinstance(settings, EnvironmentSettings):
         if settings.ENVIRONMENT != EnvironmentOption.PRODUCTION:
             docs_router = APIRouter()
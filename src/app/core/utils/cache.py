@@ -1,18 +1,118 @@
+import asyncio
 import functools
+import hashlib
+import inspect
 import json
+import math
+import os
+import random
 import re
-from collections.abc import Callable
-from typing import Any
+import string
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Collection
+from typing import Any, cast
 
-from fastapi import Request
-from fastapi.encoders import jsonable_encoder
+from fastapi import Request, Response
 from redis.asyncio import ConnectionPool, Redis
-
-from ..exceptions.cache_exceptions import CacheIdentificationInferenceError, InvalidRequestError, MissingClientError
+from redis.exceptions import NoScriptError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.database import local_session
+from ..exceptions.cache_exceptions import (
+    CacheIdentificationInferenceError,
+    CacheKeyTemplateError,
+    InvalidRequestError,
+    MissingClientError,
+)
+from ..logger import logging
+from .local_cache import LocalCache
+from .lua import LuaScript
+from .serializers import CacheSerializer, get_default_serializer
+
+logger = logging.getLogger(__name__)
 
 pool: ConnectionPool | None = None
 client: Redis | None = None
 
+local_cache: LocalCache | None = None
+invalidation_channel: str = "cache:invalidate"
+
+_instance_id: str = uuid.uuid4().hex
+_invalidation_listener: asyncio.Task | None = None
+_inflight: dict[str, asyncio.Future] = {}
+_background_tasks: set[asyncio.Task] = set()
+_scripts: dict[str, LuaScript] = {}
+_pattern_namespaces: list[re.Pattern[str]] = []
+
+TAG_PRUNE_SAMPLE_SIZE = 16
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+STORE_ENTRY_SCRIPT = """
+redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2])
+for i = 2, #KEYS do
+    local dead = {}
+    for _, member in ipairs(redis.call("SRANDMEMBER", KEYS[i], ARGV[3])) do
+        if redis.call("EXISTS", member) == 0 then
+            table.insert(dead, member)
+        end
+    end
+    if #dead > 0 then
+        redis.call("SREM", KEYS[i], unpack(dead))
+    end
+    redis.call("SADD", KEYS[i], KEYS[1])
+    if redis.call("TTL", KEYS[i]) < tonumber(ARGV[2]) then
+        redis.call("EXPIRE", KEYS[i], ARGV[2])
+    end
+end
+return 1
+"""
+
+INVALIDATE_TAGS_SCRIPT = """
+local removed = {}
+for i, tag in ipairs(KEYS) do
+    local prefix = ARGV[i]
+    for _, member in ipairs(redis.call("SMEMBERS", tag)) do
+        if string.sub(member, 1, #prefix) == prefix then
+            table.insert(removed, member)
+            if prefix ~= "" then
+                redis.call("SREM", tag, member)
+            end
+        end
+    end
+    if prefix == "" then
+        redis.call("UNLINK", tag)
+    end
+end
+for i = 1, #removed, 500 do
+    redis.call("UNLINK", unpack(removed, i, math.min(i + 499, #removed)))
+end
+return removed
+"""
+
+NOT_MODIFIED_SCRIPT = """
+local value = redis.call("GET", KEYS[1])
+if not value then
+    return false
+end
+if string.byte(value, 1) == 0 then
+    local header_end = string.find(value, "\\n", 1, true)
+    local etag = cjson.decode(string.sub(value, 2, header_end - 1))["etag"]
+    for _, candidate in ipairs(ARGV) do
+        if candidate == etag or candidate == "*" then
+            return {1, string.sub(value, 1, header_end)}
+        end
+    end
+end
+return {0, value}
+"""
+
 
 class RedisClient:
     """Custom Redis client with pub/sub and playback status functionality."""
@@ -220,133 +320,713 @@ def _infer_resource_id(kwargs: dict[str, Any], resource_id_type: type | tuple[ty
     return resource_id
 
 
-def _extract_data_inside_brackets(input_string: str) -> list[str]:
-    """Extract data inside curly brackets from a given string using regular expressions.
+class CacheKeyTemplate:
+    """A cache key template, parsed once when an endpoint is decorated.
+
+    Templates use the `str.format` syntax, with fields naming arguments of the decorated endpoint. Fields can also
+    access items and attributes of an argument, e.g. `"user_{current_user[id]}_items"`.
 
     Parameters
     ----------
-    input_string: str
-        The input string in which to find data enclosed within curly brackets.
+    template: str
+        The template, e.g. `"user_{user_id}_items:page_{page}"`.
 
-    Returns
-    -------
-    List[str]
-        A list of strings containing the data found inside the curly brackets within the input string.
+    Raises
+    ------
+    CacheKeyTemplateError
+        If the template is malformed.
+    """
 
-    Example
-    -------
-    >>> _extract_data_inside_brackets("The {quick} brown {fox} jumps over the {lazy} dog.")
-    ['quick', 'fox', 'lazy']
+    __slots__ = ("template", "fields", "_format_map")
+
+    def __init__(self, template: str) -> None:
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise CacheKeyTemplateError(f"Invalid cache key template {template!r}: {e}") from e
+
+        self.template = template
+        self.fields = tuple(field for _, field, _, _ in parsed if field is not None)
+        self._format_map = template.format_map
+
+    @property
+    def arguments(self) -> set[str]:
+        """The names of the endpoint arguments the template refers to."""
+        return {re.split(r"[.\[]", field, maxsplit=1)[0] for field in self.fields}
+
+    def validate(self, parameters: Collection[str]) -> None:
+        """Check that every field of the template refers to one of `parameters`.
+
+        Raises
+        ------
+        CacheKeyTemplateError
+            If a field refers to an unknown argument.
+        """
+        unknown = sorted(self.arguments - set(parameters))
+        if unknown:
+            raise CacheKeyTemplateError(
+                f"Cache key template {self.template!r} refers to unknown arguments {unknown}, "
+                f"expected some of {sorted(parameters)}."
+            )
+
+    def format(self, kwargs: dict[str, Any]) -> str:
+        """Format the template with the arguments of a call to the endpoint."""
+        return self._format_map(kwargs)
+
+    def namespace_pattern(self) -> re.Pattern[str] | None:
+        """Return a regex matching the namespaces of the keys the template, used as a glob-style pattern, matches.
+
+        Returns
+        -------
+        re.Pattern[str] | None
+            The regex, with fields matching any value, or None if the pattern has a wildcard before its first colon
+            or no colon at all, in which case its keys are found with `SCAN` rather than through a namespace tag.
+        """
+        parts = []
+        for literal, field, _, _ in string.Formatter().parse(self.template):
+            namespace, colon, _ = literal.partition(":")
+            if re.search(r"[*?\[\\]", namespace):
+                return None
+
+            parts.append(re.escape(namespace))
+            if colon:
+                return re.compile("".join(parts))
+
+            if field is not None:
+                parts.append("[^:]*")
+
+        return None
+
+
+def _compile_extra_id(id_template: str) -> CacheKeyTemplate:
+    """Compile the value of a `to_invalidate_extra` entry, of which only the first field is used as the resource id."""
+    template = CacheKeyTemplate(id_template)
+    if not template.fields:
+        return template
+
+    return CacheKeyTemplate(f"{{{template.fields[0]}}}")
+
+
+def _validate_templates(func: Callable, templates: list[CacheKeyTemplate]) -> None:
+    """Check at decoration time that the templates only refer to arguments of the decorated endpoint.
+
+    The first parameter of the endpoint, the request, is passed positionally and cannot be used in templates.
+    Endpoints accepting arbitrary keyword arguments are not checked.
     """
-    data_inside_brackets = re.findall(r"{(.*?)}", input_string)
-    return data_inside_brackets
+    parameters = list(inspect.signature(func).parameters.values())[1:]
+    if any(parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters):
+        return
+
+    names = [parameter.name for parameter in parameters]
+    for template in templates:
+        template.validate(names)
+
 
+async def _scan_keys_by_pattern(pattern: str) -> list[bytes]:
+    """Collect the keys from Redis that match a given pattern using the SCAN command.
 
-def _construct_data_dict(data_inside_brackets: list[str], kwargs: dict[str, Any]) -> dict[str, Any]:
-    """Construct a dictionary based on data inside brackets and keyword arguments.
+    This function iteratively scans the Redis key space for keys that match a specific pattern. It uses the SCAN
+    command, which is more performance-friendly compared to the KEYS command, especially for large datasets, but
+    still walks the whole keyspace. Patterns are only resolved this way when they cannot go through the tag index.
 
     Parameters
     ----------
-    data_inside_brackets: List[str]
-        A list of keys inside brackets.
-    kwargs: Dict[str, Any]
-        A dictionary of keyword arguments.
+    pattern: str
+        The pattern to match keys against. The pattern can include wildcards,
+        such as '*' for matching any character sequence. Example: 'user:*'
 
     Returns
     -------
-    Dict[str, Any]: A dictionary with keys from data_inside_brackets and corresponding values from kwargs.
+    List[bytes]
+        The matching keys.
+
+    Notes
+    -----
+    - The SCAN command is used with a count of 100 to retrieve keys in batches.
+      This count can be adjusted based on the size of your dataset and Redis performance.
     """
-    data_dict = {}
-    for key in data_inside_brackets:
-        data_dict[key] = kwargs[key]
-    return data_dict
+    if client is None:
+        raise MissingClientError
+
+    return [key async for key in client.scan_iter(match=pattern, count=100)]
+
+
+def _tag_key(tag: str) -> str:
+    """Return the Redis key of the set indexing the cache entries registered under `tag`."""
+    return f"tag:{tag}"
+
 
+def _namespace_tag(cache_key: str) -> str:
+    """Return the tag of the namespace of a cache entry: the part of its key before the first colon."""
+    return _tag_key(cache_key.split(":", 1)[0])
 
-def _format_prefix(prefix: str, kwargs: dict[str, Any]) -> str:
-    """Format a prefix using keyword arguments.
+
+def _is_invalidated_by_pattern(cache_key: str) -> bool:
+    """Return whether a `pattern_to_invalidate_extra` goes through the namespace tag of a cache entry."""
+    namespace = cache_key.split(":", 1)[0]
+    return any(pattern.fullmatch(namespace) for pattern in _pattern_namespaces)
+
+
+def _pattern_to_tag(pattern: str) -> tuple[str, str] | None:
+    """Map a glob-style pattern to the tag indexing the keys it matches.
 
     Parameters
     ----------
-    prefix: str
-        The prefix template to be formatted.
-    kwargs: Dict[str, Any]
-        A dictionary of keyword arguments.
+    pattern: str
+        The pattern, using the same syntax as Redis `SCAN MATCH`.
 
     Returns
     -------
-    str: The formatted prefix.
+    tuple[str, str] | None
+        The namespace tag and the literal prefix the matching keys start with, or None if the pattern has a wildcard
+        before its first colon, in which case the matching keys can be in any namespace.
     """
-    data_inside_brackets = _extract_data_inside_brackets(prefix)
-    data_dict = _construct_data_dict(data_inside_brackets, kwargs)
-    formatted_prefix = prefix.format(**data_dict)
-    return formatted_prefix
+    literal_prefix = re.split(r"[*?\[\\]", pattern, maxsplit=1)[0]
+    if ":" not in literal_prefix:
+        return None
 
+    return _namespace_tag(literal_prefix), literal_prefix
 
-def _format_extra_data(to_invalidate_extra: dict[str, str], kwargs: dict[str, Any]) -> dict[str, Any]:
-    """Format extra data based on provided templates and keyword arguments.
 
-    This function takes a dictionary of templates and their associated values and a dictionary of keyword arguments.
-    It formats the templates with the corresponding values from the keyword arguments and returns a dictionary
-    where keys are the formatted templates and values are the associated keyword argument values.
+def _add_tag(tags: dict[str, str], tag_key: str, prefix: str = "") -> None:
+    """Add a tag to invalidate, restricted to the members starting with `prefix`, merging it with any previous one."""
+    if tag_key in tags:
+        prefix = os.path.commonprefix([tags[tag_key], prefix])
+
+    tags[tag_key] = prefix
+
+
+async def _store_entry(cache_key: str, value: bytes, ttl: int, tags: list[str]) -> None:
+    """Store a cache entry with its TTL and register it in its tag sets, in a single atomic script call.
 
     Parameters
     ----------
-    to_invalidate_extra: Dict[str, str]
-        A dictionary where keys are templates and values are the associated values.
-    kwargs: Dict[str, Any]
-        A dictionary of keyword arguments.
+    cache_key: str
+        The cache key.
+    value: bytes
+        The encoded entry.
+    ttl: int
+        Time to live of the entry in seconds. Tag sets are kept at least as long as their longest lived entry.
+    tags: List[str]
+        Tags the entry is registered under. Its namespace is added when a pattern to invalidate goes through it.
+
+    Note
+    ----
+    Entries are not removed from their tags when they expire. Each write checks `TAG_PRUNE_SAMPLE_SIZE` random
+    members of the tags it adds to and removes those whose entry expired, which keeps the expired members of a
+    tag a small fraction of it, at a bounded cost per write.
+    """
+    namespace_tag = [_namespace_tag(cache_key)] if _is_invalidated_by_pattern(cache_key) else []
+    tag_keys = dict.fromkeys([*namespace_tag, *(_tag_key(tag) for tag in tags)])
+    await _get_script(STORE_ENTRY_SCRIPT)(keys=[cache_key, *tag_keys], args=[value, ttl, TAG_PRUNE_SAMPLE_SIZE])
+
+
+def _decode_keys(keys: list[bytes | str]) -> list[str]:
+    """Decode and deduplicate keys returned by Redis, preserving their order."""
+    return list(dict.fromkeys(key.decode() if isinstance(key, bytes) else key for key in keys))
+
+
+async def _invalidate(keys: list[str], tags: list[str], patterns: list[str]) -> None:
+    """Invalidate cache keys, tags and patterns in Redis and in the local caches of every process.
+
+    Keys are deleted with `UNLINK`, so their memory is reclaimed by Redis in the background, and tags with a single
+    script call whose cost is proportional to the number of entries in the tags. Both are sent in one pipeline, so
+    the whole invalidation costs a single round-trip, plus one to notify the other processes when the local cache
+    is enabled.
+
+    Parameters
+    ----------
+    keys: List[str]
+        Exact cache keys to delete.
+    tags: List[str]
+        Tags whose entries are all deleted.
+    patterns: List[str]
+        Glob-style patterns of cache keys to delete. They are resolved through the tag index when they have no
+        wildcard before their first colon, and with `SCAN` otherwise.
+    """
+    if client is None:
+        raise MissingClientError
+
+    tags_to_delete: dict[str, str] = {}
+    for tag in tags:
+        _add_tag(tags_to_delete, _tag_key(tag))
+
+    keys_to_delete: list[str | bytes] = list(keys)
+    for pattern in patterns:
+        pattern_tag = _pattern_to_tag(pattern)
+        if pattern_tag is None:
+            keys_to_delete.extend(await _scan_keys_by_pattern(pattern))
+        else:
+            _add_tag(tags_to_delete, *pattern_tag)
+
+    script = _get_script(INVALIDATE_TAGS_SCRIPT)
+    async with client.pipeline(transaction=False) as pipe:
+        if keys_to_delete:
+            pipe.unlink(*keys_to_delete)
+        if tags_to_delete:
+            pipe.evalsha(script.sha, len(tags_to_delete), *tags_to_delete, *tags_to_delete.values())
+        results = await pipe.execute(raise_on_error=False)
+
+    removed_keys: list[bytes | str] = []
+    if tags_to_delete:
+        if isinstance(results[-1], NoScriptError):
+            results[-1] = await script(keys=list(tags_to_delete), args=list(tags_to_delete.values()))
+        removed_keys = results[-1]
+
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+    await _publish_invalidation(_decode_keys([*keys_to_delete, *removed_keys]), patterns)
+
+
+async def _invalidate_in_background(keys: list[str], tags: list[str], patterns: list[str]) -> None:
+    """Run an invalidation scheduled after the response, logging failures instead of raising them."""
+    try:
+        await _invalidate(keys, tags, patterns)
+    except Exception as e:
+        logger.warning(f"Deferred invalidation of cache keys {keys} failed: {e}")
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Invalidate the cache entries registered under tags, for writes whose affected entries are only known once
+    the endpoint has run, such as the room of an edited timer.
+
+    Parameters
+    ----------
+    *tags: str
+        Tags whose entries are all deleted, in Redis and in the local caches of every process.
+    """
+    await _invalidate([], list(tags), [])
+
+
+def _apply_invalidation(message: bytes | str) -> None:
+    """Apply an invalidation message published by another process to the local cache.
+
+    Parameters
+    ----------
+    message: bytes | str
+        The JSON encoded message, with the `origin` process id and the `keys` and `patterns` to invalidate.
+    """
+    if local_cache is None:
+        return
+
+    data = json.loads(message)
+    if data.get("origin") == _instance_id:
+        return
+
+    for key in data.get("keys", []):
+        local_cache.delete(key)
+
+    for pattern in data.get("patterns", []):
+        local_cache.delete_pattern(pattern)
+
+
+async def _publish_invalidation(keys: list[str], patterns: list[str]) -> None:
+    """Invalidate keys in the local cache and broadcast the invalidation to the other processes.
+
+    Parameters
+    ----------
+    keys: List[str]
+        Exact cache keys that were invalidated.
+    patterns: List[str]
+        Glob-style patterns of cache keys that were invalidated.
+    """
+    if local_cache is None:
+        return
+
+    if client is None:
+        raise MissingClientError
+
+    for key in keys:
+        local_cache.delete(key)
+
+    for pattern in patterns:
+        local_cache.delete_pattern(pattern)
+
+    message = json.dumps({"origin": _instance_id, "keys": keys, "patterns": patterns})
+    await client.publish(invalidation_channel, message)
+
+
+async def _listen_for_invalidations() -> None:
+    """Keep the local cache coherent by applying invalidations published on `invalidation_channel`.
+
+    Messages published while the subscription is down are lost, so the local cache is cleared every time the
+    subscription is (re)established.
+    """
+    if client is None or local_cache is None:
+        raise MissingClientError
+
+    while True:
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(invalidation_channel)
+            local_cache.clear()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _apply_invalidation(message["data"])
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.error(f"Cache invalidation subscription lost, retrying: {e}")
+            local_cache.clear()
+            await asyncio.sleep(1)
+
+        finally:
+            await pubsub.aclose()  # type: ignore
+
+
+async def start_local_cache(max_entries: int, max_bytes: int, ttl: float, channel: str = "cache:invalidate") -> None:
+    """Create the in-process L1 cache and start listening for invalidations from other processes.
+
+    Parameters
+    ----------
+    max_entries: int
+        Maximum number of entries kept in memory.
+    max_bytes: int
+        Maximum total size, in bytes, of the entries kept in memory.
+    ttl: float
+        Maximum time, in seconds, an entry is served from memory.
+    channel: str
+        Redis pub/sub channel used to broadcast invalidations.
+    """
+    global local_cache, invalidation_channel, _invalidation_listener
+
+    local_cache = LocalCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    invalidation_channel = channel
+    _invalidation_listener = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_local_cache() -> None:
+    """Stop the invalidation listener and drop the in-process L1 cache."""
+    global local_cache, _invalidation_listener
+
+    if _invalidation_listener is not None:
+        _invalidation_listener.cancel()
+        try:
+            await _invalidation_listener
+        except asyncio.CancelledError:
+            pass
+        _invalidation_listener = None
+
+    local_cache = None
+
+
+def get_local_cache_stats() -> dict[str, dict[str, int]]:
+    """Return the local cache hit, miss, eviction and invalidation counters per key prefix."""
+    if local_cache is None:
+        return {}
+
+    return local_cache.stats()
+
+
+def _get_script(source: str) -> LuaScript:
+    """Return a Lua script registered on the current client, so it is sent once and then run with EVALSHA."""
+    if client is None:
+        raise MissingClientError
+
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = LuaScript(source)
+
+    return script.register(client)
+
+
+class CacheEntry:
+    """A cached payload together with the metadata needed to serve and refresh it.
+
+    Entries are stored in Redis as a single value: a header line starting with a null byte and holding the
+    metadata as JSON, followed by the payload. Values without the header, written before entries had metadata,
+    are decoded as JSON entries that never go stale.
+
+    Parameters
+    ----------
+    body: bytes
+        The serialized payload.
+    expires_at: float
+        Unix timestamp after which the entry is stale and should be recomputed.
+    delta: float
+        Time, in seconds, it took to compute the payload. Used for probabilistic early recomputation.
+    content_type: str
+        Media type of the payload.
+    etag: str | None
+        Strong entity tag of the payload. Computed from the payload if not provided.
+    """
+
+    __slots__ = ("body", "expires_at", "delta", "content_type", "etag")
+
+    def __init__(
+        self,
+        body: bytes,
+        expires_at: float = math.inf,
+        delta: float = 0.0,
+        content_type: str = "application/json",
+        etag: str | None = None,
+    ) -> None:
+        self.body = body
+        self.expires_at = expires_at
+        self.delta = delta
+        self.content_type = content_type
+        self.etag = etag if etag is not None else f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+    def encode(self) -> bytes:
+        header = json.dumps(
+            {"exp": self.expires_at, "delta": self.delta, "ct": self.content_type, "etag": self.etag}
+        ).encode()
+        return b"\x00" + header + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CacheEntry":
+        if not data.startswith(b"\x00"):
+            return cls(bytes(data))
+
+        header_end = data.index(b"\n")
+        header = json.loads(data[1:header_end])
+        return cls(
+            bytes(data[header_end + 1 :]),
+            expires_at=header["exp"],
+            delta=header["delta"],
+            content_type=header.get("ct", "application/json"),
+            etag=header.get("etag"),
+        )
+
+    def to_response(self, cache_control: str | None = None) -> Response:
+        """Build a response serving the payload as is, without validation or re-serialization."""
+        return Response(content=self.body, media_type=self.content_type, headers=self._headers(cache_control))
+
+    def to_not_modified_response(self, cache_control: str | None = None) -> Response:
+        """Build a `304 Not Modified` response telling the client its copy of the payload is current."""
+        return Response(status_code=304, headers=self._headers(cache_control))
+
+    def matches(self, etags: list[str]) -> bool:
+        """Return whether the entry matches one of the entity tags of an `If-None-Match` header."""
+        return "*" in etags or self.etag in etags
+
+    def _headers(self, cache_control: str | None) -> dict[str, str]:
+        headers = {"ETag": self.etag}
+        if cache_control is not None:
+            headers["Cache-Control"] = cache_control
+
+        return headers
+
+    def is_stale(self, now: float) -> bool:
+        return now >= self.expires_at
+
+    def should_refresh_early(self, now: float, beta: float = 1.0) -> bool:
+        """Decide whether to recompute the entry before it goes stale, following the XFetch algorithm.
+
+        The closer the entry is to its expiration and the longer it takes to compute, the more likely an early
+        recomputation is, which spreads recomputations of hot keys over time instead of having them all expire at once.
+        """
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.expires_at
+
+
+def _parse_if_none_match(header: str | None) -> list[str]:
+    """Return the entity tags of an `If-None-Match` header, compared weakly as required for this header."""
+    if not header:
+        return []
+
+    return [etag.strip().removeprefix("W/") for etag in header.split(",") if etag.strip()]
+
+
+async def _lookup(cache_key: str, etags: list[str], use_local_cache: bool, ttl: int, group: str) -> bytes | None:
+    """Look a cache entry up in the local cache, then in Redis, keeping entries found in Redis in the local cache.
+
+    Parameters
+    ----------
+    cache_key: str
+        The cache key.
+    etags: List[str]
+        Entity tags from the `If-None-Match` header of the request. When the entry matches one of them, only its
+        header is transferred from Redis.
+    use_local_cache: bool
+        Whether the local cache, when enabled, is used.
+    ttl: int
+        Time to live of the entry, used when it is kept in the local cache.
+    group: str
+        The group the lookup is accounted to in the local cache statistics.
 
     Returns
     -------
-        Dict[str, Any]: A dictionary where keys are formatted templates and values
-        are associated keyword argument values.
+    bytes | None
+        The stored value, or None on a miss.
     """
-    formatted_extra = {}
-    for prefix, id_template in to_invalidate_extra.items():
-        formatted_prefix = _format_prefix(prefix, kwargs)
-        id = _extract_data_inside_brackets(id_template)[0]
-        formatted_extra[formatted_prefix] = kwargs[id]
+    if client is None:
+        raise MissingClientError
+
+    use_local_cache = use_local_cache and local_cache is not None
+    if use_local_cache:
+        cached_data = cast(LocalCache, local_cache).get(cache_key, group=group)
+        if cached_data is not None:
+            return cached_data
 
-    return formatted_extra
+    matched = False
+    if etags:
+        cached_data, matched = await _get_unless_matching(cache_key, etags)
+    else:
+        cached_data = await client.get(cache_key)
 
+    if cached_data and not matched and use_local_cache:
+        cast(LocalCache, local_cache).set(cache_key, cached_data, ttl=ttl, group=group)
 
-async def _delete_keys_by_pattern(pattern: str) -> None:
-    """Delete keys from Redis that match a given pattern using the SCAN command.
+    return cached_data
 
-    This function iteratively scans the Redis key space for keys that match a specific pattern
-    and deletes them. It uses the SCAN command to efficiently find keys, which is more
-    performance-friendly compared to the KEYS command, especially for large datasets.
 
-    The function scans the key space in an iterative manner using a cursor-based approach.
-    It retrieves a batch of keys matching the pattern on each iteration and deletes them
-    until no matching keys are left.
+async def _get_unless_matching(cache_key: str, etags: list[str]) -> tuple[bytes | None, bool]:
+    """Get a cache entry, without transferring its payload if it matches one of the entity tags.
 
     Parameters
     ----------
-    pattern: str
-        The pattern to match keys against. The pattern can include wildcards,
-        such as '*' for matching any character sequence. Example: 'user:*'
+    cache_key: str
+        The cache key.
+    etags: List[str]
+        Entity tags from the `If-None-Match` header of the request.
 
-    Notes
-    -----
-    - The SCAN command is used with a count of 100 to retrieve keys in batches.
-      This count can be adjusted based on the size of your dataset and Redis performance.
+    Returns
+    -------
+    tuple[bytes | None, bool]
+        The stored value, or None on a miss, and whether it was matched. Matched values only hold the entry header,
+        which is enough to answer `304 Not Modified`.
+    """
+    result = await _get_script(NOT_MODIFIED_SCRIPT)(keys=[cache_key], args=etags)
+    if not result:
+        return None, False
+
+    matched, value = result
+    return value, bool(matched)
 
-    - The function uses the delete command to remove keys in bulk. If the dataset
-      is extremely large, consider implementing additional logic to handle bulk deletion
-      more efficiently.
 
-    - Be cautious with patterns that could match a large number of keys, as deleting
-      many keys simultaneously may impact the performance of the Redis server.
+async def _compute_with_lock(
+    cache_key: str, compute: Callable[[], Awaitable[bytes]], lock_timeout: float, wait: bool = True
+) -> bytes | None:
+    """Run `compute` in only one process at a time for a given cache key.
+
+    The process that acquires a short-lived Redis lock recomputes the value, the others poll Redis until the value
+    shows up. If the lock holder dies or the lock expires before the value is stored, the waiting process computes
+    the value itself, so a lost lock never blocks a request for longer than `lock_timeout`.
+
+    Parameters
+    ----------
+    cache_key: str
+        The cache key being computed.
+    compute: Callable[[], Awaitable[bytes]]
+        Coroutine function computing and storing the serialized value.
+    lock_timeout: float
+        Lifetime of the lock, and maximum time spent waiting for another process, in seconds.
+    wait: bool, default True
+        Whether to wait for the process holding the lock. If False, None is returned when the lock is held elsewhere.
+
+    Returns
+    -------
+    bytes | None
+        The serialized value, or None if the lock is held by another process and `wait` is False.
     """
     if client is None:
         raise MissingClientError
 
-    cursor = -1
-    while cursor != 0:
-        cursor, keys = await client.scan(cursor, match=pattern, count=100)
-        if keys:
-            await client.delete(*keys)
+    lock_key = f"lock:{cache_key}"
+    token = uuid.uuid4().hex
+    if await client.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)):
+        try:
+            return await compute()
+        finally:
+            await _get_script(RELEASE_LOCK_SCRIPT)(keys=[lock_key], args=[token])
+
+    if not wait:
+        return None
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + lock_timeout
+    delay = 0.01
+    while loop.time() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.2)
+
+        cached_data = await client.get(cache_key)
+        if cached_data:
+            return bytes(cached_data)
+
+        if not await client.exists(lock_key):
+            break
+
+    return await compute()
+
+
+async def _coalesce(
+    cache_key: str, compute: Callable[[], Awaitable[bytes]], lock_timeout: float, wait: bool = True
+) -> bytes | None:
+    """Coalesce concurrent cache misses for the same key into a single computation.
+
+    Inside a process, concurrent callers share one future. Across processes, `_compute_with_lock` makes sure only
+    one process recomputes the value.
+
+    Parameters
+    ----------
+    cache_key: str
+        The cache key being computed.
+    compute: Callable[[], Awaitable[bytes]]
+        Coroutine function computing and storing the serialized value.
+    lock_timeout: float
+        Lifetime of the cross-process lock in seconds.
+    wait: bool, default True
+        Whether to wait for another process already computing the value, see `_compute_with_lock`.
+
+    Returns
+    -------
+    bytes | None
+        The serialized value, or None if another process is computing it and `wait` is False.
+    """
+    while (inflight := _inflight.get(cache_key)) is not None:
+        try:
+            return cast(bytes, await asyncio.shield(inflight))
+        except asyncio.CancelledError:
+            if not inflight.cancelled():
+                raise
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = future
+    try:
+        data = await _compute_with_lock(cache_key, compute, lock_timeout, wait=wait)
+
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()
+        raise
+
+    else:
+        if data is None:
+            future.cancel()
+        else:
+            future.set_result(data)
+        return data
+
+    finally:
+        if _inflight.get(cache_key) is future:
+            del _inflight[cache_key]
+
+
+async def _refresh(cache_key: str, compute: Callable[[], Awaitable[bytes]], lock_timeout: float) -> None:
+    """Recompute a cache entry in the background, unless another process is already doing it."""
+    try:
+        await _coalesce(cache_key, compute, lock_timeout, wait=False)
+    except Exception as e:
+        logger.warning(f"Background refresh of cache key {cache_key} failed: {e}")
+
+
+def _schedule_refresh(cache_key: str, compute: Callable[[], Awaitable[bytes]], lock_timeout: float) -> None:
+    """Schedule a background refresh of a cache entry if none is running in this process."""
+    if cache_key in _inflight:
+        return
+
+    task = asyncio.create_task(_refresh(cache_key, compute, lock_timeout))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
 def cache(
@@ -356,6 +1036,17 @@ def cache(
     resource_id_type: type | tuple[type, ...] = int,
     to_invalidate_extra: dict[str, Any] | None = None,
     pattern_to_invalidate_extra: list[str] | None = None,
+    use_local_cache: bool = True,
+    single_flight: bool = True,
+    lock_timeout: float = 5.0,
+    stale_ttl: int = 0,
+    refresh_ahead: bool = False,
+    raw_response: bool = False,
+    serializer: CacheSerializer | None = None,
+    tags: list[str] | None = None,
+    tags_to_invalidate: list[str] | None = None,
+    defer_invalidation: bool = False,
+    cache_control: str | None = None,
 ) -> Callable:
     """Cache decorator for FastAPI endpoints.
 
@@ -380,7 +1071,41 @@ def cache(
         These keys are invalidated when the decorated function is called with a method other than GET.
     pattern_to_invalidate_extra: List[str] | None, optional
         A list of string patterns for cache keys that should be invalidated when the decorated function is called.
-        This allows for bulk invalidation of cache keys based on a matching pattern.
+        This allows for bulk invalidation of cache keys based on a matching pattern. Patterns are resolved through
+        the tag index when possible, see the notes below.
+    use_local_cache: bool, default True
+        Whether GET responses may also be served from the in-process L1 cache, when it is enabled.
+    single_flight: bool, default True
+        Whether concurrent cache misses for the same key are coalesced, so only one request runs the endpoint.
+    lock_timeout: float, default 5.0
+        When `single_flight` is enabled, the lifetime in seconds of the Redis lock held while recomputing a value,
+        which is also the longest time other processes wait for it before computing the value themselves.
+    stale_ttl: int, default 0
+        Number of seconds an entry is kept after `expiration`. During that window the stale entry is served
+        immediately while it is refreshed in the background.
+    refresh_ahead: bool, default False
+        Whether fresh entries may be refreshed in the background before they expire, with a probability that grows
+        as the expiration approaches (XFetch). Combined with `stale_ttl`, hot keys never hard-expire under load.
+    raw_response: bool, default False
+        Whether GET requests return a `Response` holding the serialized payload, with its `Content-Type` and `ETag`,
+        instead of Python objects. This skips the validation and re-serialization against the endpoint
+        `response_model`, which must then only return data already shaped like the response model.
+    serializer: CacheSerializer | None, optional
+        Serializer used to store payloads. Defaults to `OrjsonSerializer` when orjson is installed, `JsonSerializer`
+        otherwise.
+    tags: List[str] | None, optional
+        Tag templates, formatted like `key_prefix`, the entries written on GET requests are registered under,
+        e.g. `"user:{user_id}:items"`.
+    tags_to_invalidate: List[str] | None, optional
+        Tag templates whose entries are all invalidated when the decorated function is called with a method other
+        than GET.
+    defer_invalidation: bool, default False
+        Whether invalidations run in the background instead of before the response is returned. This removes the
+        Redis round-trip from the write latency, at the cost of a short window where the client can read its
+        previous version from the cache.
+    cache_control: str | None, optional
+        `Cache-Control` header of the responses built by the decorator, raw responses and `304 Not Modified`
+        answers, e.g. `"private, no-cache"` for user data that clients must revalidate on every use.
 
     Returns
     -------
@@ -447,54 +1172,158 @@ def cache(
     ----
     - resource_id_type is used only if resource_id is not passed.
     - `to_invalidate_extra` and `pattern_to_invalidate_extra` are used for cache invalidation on methods other than GET.
-    - Using `pattern_to_invalidate_extra` can be resource-intensive on large datasets. Use it judiciously and
-      consider the potential impact on Redis performance.
+    - Every entry is registered in the sets of its `tags` (`tag:{tag}` in Redis), and in the tag set of its
+      namespace, the part of the key before the first colon, when a `pattern_to_invalidate_extra` of any endpoint
+      goes through that namespace. Invalidating a tag costs O(entries in the tag), whatever the size of the
+      keyspace. Each write also drops a few expired entries from the tags it adds to.
+    - Patterns in `pattern_to_invalidate_extra` with no wildcard before their first colon, like `"user_{id}_items:*"`,
+      go through the tag of their namespace and delete its entries starting with the literal part of the pattern.
+      Other patterns, like `"user_*_items:*"`, still walk the keyspace with `SCAN`, which can be resource-intensive
+      on large datasets.
+    - All the invalidations of a request are sent to Redis in a single pipeline, deleting keys with `UNLINK`.
+    - GET requests with an `If-None-Match` header matching the `ETag` of the cached entry are answered with
+      `304 Not Modified`, without running the endpoint and without transferring the payload from Redis.
+    - When the local cache is enabled (see `start_local_cache`), hits are first looked up in process memory.
+      Invalidations are broadcast over Redis pub/sub so every process drops its copy, and entries are never
+      served from memory for longer than the local cache `ttl`.
+    - With `single_flight`, when a hot key expires only one request per key recomputes it: concurrent requests in the
+      same process await the same result, and other processes wait on a short Redis lock (`lock:{cache_key}`).
+      Exceptions raised by the endpoint are propagated to every coalesced request.
+    - Background refreshes run outside of the request, so any `AsyncSession` argument is replaced by a new session
+      for the duration of the refresh.
     """
 
     def wrapper(func: Callable) -> Callable:
+        entry_serializer = serializer if serializer is not None else get_default_serializer()
+
+        key_template = CacheKeyTemplate(key_prefix)
+        resource_id_template = CacheKeyTemplate(f"{{{resource_id_name}}}") if resource_id_name else None
+        extra_templates = [
+            (CacheKeyTemplate(prefix), _compile_extra_id(id_template))
+            for prefix, id_template in (to_invalidate_extra or {}).items()
+        ]
+        pattern_templates = [CacheKeyTemplate(pattern + "*") for pattern in pattern_to_invalidate_extra or []]
+        for template in pattern_templates:
+            namespace_pattern = template.namespace_pattern()
+            if namespace_pattern is not None and namespace_pattern not in _pattern_namespaces:
+                _pattern_namespaces.append(namespace_pattern)
+        tag_templates = [CacheKeyTemplate(tag) for tag in tags or []]
+        tags_to_invalidate_templates = [CacheKeyTemplate(tag) for tag in tags_to_invalidate or []]
+        _validate_templates(
+            func,
+            [
+                key_template,
+                *([resource_id_template] if resource_id_template else []),
+                *(template for pair in extra_templates for template in pair),
+                *pattern_templates,
+                *tag_templates,
+                *tags_to_invalidate_templates,
+            ],
+        )
+
         @functools.wraps(func)
         async def inner(request: Request, *args: Any, **kwargs: Any) -> Any:
             if client is None:
                 raise MissingClientError
 
-            if resource_id_name:
-                resource_id = kwargs[resource_id_name]
+            if resource_id_template is not None:
+                resource_id: Any = resource_id_template.format(kwargs)
             else:
                 resource_id = _infer_resource_id(kwargs=kwargs, resource_id_type=resource_id_type)
 
-            formatted_key_prefix = _format_prefix(key_prefix, kwargs)
-            cache_key = f"{formatted_key_prefix}:{resource_id}"
+            cache_key = f"{key_template.format(kwargs)}:{resource_id}"
             if request.method == "GET":
-                if to_invalidate_extra is not None or pattern_to_invalidate_extra is not None:
+                if (
+                    to_invalidate_extra is not None
+                    or pattern_to_invalidate_extra is not None
+                    or tags_to_invalidate is not None
+                ):
                     raise InvalidRequestError
 
-                cached_data = await client.get(cache_key)
+                etags = _parse_if_none_match(request.headers.get("if-none-match"))
+                cached_data = await _lookup(
+                    cache_key, etags, use_local_cache=use_local_cache, ttl=expiration + stale_ttl, group=key_prefix
+                )
+
+                computed: dict[str, Any] = {}
+                formatted_tags = [template.format(kwargs) for template in tag_templates]
+
+                async def compute(call_kwargs: dict[str, Any] = kwargs) -> bytes:
+                    if client is None:
+                        raise MissingClientError
+
+                    started_at = time.perf_counter()
+                    result = await func(request, *args, **call_kwargs)
+                    entry = CacheEntry(
+                        entry_serializer.dumps(result),
+                        expires_at=time.time() + expiration,
+                        delta=time.perf_counter() - started_at,
+                        content_type=entry_serializer.content_type,
+                    )
+                    encoded_entry = entry.encode()
+                    computed["data"] = result
+                    computed["entry"] = entry
+
+                    await _store_entry(cache_key, encoded_entry, expiration + stale_ttl, formatted_tags)
+                    if use_local_cache and local_cache is not None:
+                        local_cache.set(cache_key, encoded_entry, ttl=expiration + stale_ttl, group=key_prefix)
+
+                    return encoded_entry
+
+                async def compute_in_background() -> bytes:
+                    async with local_session() as db:
+                        refresh_kwargs = {
+                            name: db if isinstance(value, AsyncSession) else value for name, value in kwargs.items()
+                        }
+                        return await compute(refresh_kwargs)
+
                 if cached_data:
-                    return json.loads(cached_data.decode())
+                    entry = CacheEntry.decode(cached_data)
+                    if entry.content_type == entry_serializer.content_type:
+                        now = time.time()
+                        if entry.is_stale(now) or (refresh_ahead and entry.should_refresh_early(now)):
+                            _schedule_refresh(cache_key, compute_in_background, lock_timeout)
 
-            result = await func(request, *args, **kwargs)
+                        if etags and entry.matches(etags):
+                            return entry.to_not_modified_response(cache_control)
 
-            if request.method == "GET":
-                serializable_data = jsonable_encoder(result)
-                serialized_data = json.dumps(serializable_data)
+                        return entry.to_response(cache_control) if raw_response else entry_serializer.loads(entry.body)
+
+                if single_flight:
+                    cached_data = await _coalesce(cache_key, compute, lock_timeout)
+                else:
+                    cached_data = await compute()
+
+                if raw_response or etags:
+                    entry = computed.get("entry") or CacheEntry.decode(cast(bytes, cached_data))
+                    if etags and entry.matches(etags):
+                        return entry.to_not_modified_response(cache_control)
+
+                if raw_response:
+                    return entry.to_response(cache_control)
 
-                await client.set(cache_key, serialized_data)
-                await client.expire(cache_key, expiration)
+                if "data" in computed:
+                    return computed["data"]
 
-                return json.loads(serialized_data)
+                return entry_serializer.loads(CacheEntry.decode(cast(bytes, cached_data)).body)
 
             else:
-                await client.delete(cache_key)
-                if to_invalidate_extra is not None:
-                    formatted_extra = _format_extra_data(to_invalidate_extra, kwargs)
-                    for prefix, id in formatted_extra.items():
-                        extra_cache_key = f"{prefix}:{id}"
-                        await client.delete(extra_cache_key)
-
-                if pattern_to_invalidate_extra is not None:
-                    for pattern in pattern_to_invalidate_extra:
-                        formatted_pattern = _format_prefix(pattern, kwargs)
-                        await _delete_keys_by_pattern(formatted_pattern + "*")
+                result = await func(request, *args, **kwargs)
+
+                invalidation = {
+                    "keys": [
+                        cache_key,
+                        *(f"{prefix.format(kwargs)}:{id.format(kwargs)}" for prefix, id in extra_templates),
+                    ],
+                    "tags": [template.format(kwargs) for template in tags_to_invalidate_templates],
+                    "patterns": [template.format(kwargs) for template in pattern_templates],
+                }
+                if defer_invalidation:
+                    task = asyncio.create_task(_invalidate_in_background(**invalidation))
+                    _background_tasks.add(task)
+                    task.add_done_callback(_background_tasks.discard)
+                else:
+                    await _invalidate(**invalidation)
 
             return result
 
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from redis.asyncio import Redis
+
+from ..logger import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ClientClockStats:
+    """The last clock estimate reported by a display.
+
+    Attributes
+    ----------
+    samples: int
+        Number of estimates reported.
+    offset_ms: float
+        Server time minus client time, in milliseconds.
+    rtt_ms: float
+        Round-trip time of the exchange the estimate comes from.
+    min_rtt_ms: float
+        Lowest round-trip time reported, the best accuracy the client can reach.
+    updated_at: float
+        Server time in milliseconds of the last report.
+    """
+
+    samples: int
+    offset_ms: float
+    rtt_ms: float
+    min_rtt_ms: float
+    updated_at: float
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+
+    values = sorted(values)
+    return {f"p{round(q * 100)}": values[int((len(values) - 1) * q)] for q in (0.5, 0.99, 1.0)}
+
+
+class ClockSync:
+    """Server time for NTP-style clock synchronization of displays, on the clock timer anchors are stamped with.
+
+    Timer anchors are read from the Redis clock, which may differ from the clock of this process. The offset between
+    the two is measured in the background, keeping the sample with the lowest round-trip time, and applied to the
+    monotonic clock, so answering a client costs no I/O and is not affected by steps of the system clock.
+
+    A client sends its time `t0`, the server answers with `t0`, the time `t1` it received the request and the time
+    `t2` it answered, and the client notes the time `t3` it got the answer:
+
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        rtt = (t3 - t0) - (t2 - t1)
+
+    Keeping the offset of the exchange with the lowest `rtt` out of a few bounds the error by `rtt / 2`.
+
+    Note
+    ----
+        Clients may report their estimate with their next request. The last estimate of up to `max_clients` clients
+        is kept in memory, for monitoring only.
+    """
+
+    def __init__(self) -> None:
+        self.client: Redis | None = None
+        self.max_clients = 10_000
+        self.calibration_interval = 30.0
+        self.calibration_rtt_ms: float | None = None
+        self._base_ms = time.time() * 1000 - time.monotonic() * 1000
+        self._clients: OrderedDict[str, ClientClockStats] = OrderedDict()
+        self._task: asyncio.Task | None = None
+
+    def now_ms(self) -> float:
+        """Return the server time in milliseconds since the epoch."""
+        return self._base_ms + time.monotonic() * 1000
+
+    def reply(self, t0: float | None, received_at: float) -> dict[str, Any]:
+        """Return the answer to a synchronization request of a client.
+
+        Parameters
+        ----------
+        t0: float | None
+            Client time the request was sent, echoed back.
+        received_at: float
+            Server time the request was received, from `now_ms`.
+        """
+        return {"type": "time_sync", "t0": t0, "t1": round(received_at, 1), "t2": round(self.now_ms(), 1)}
+
+    def record(self, client_id: str, offset_ms: float, rtt_ms: float) -> None:
+        """Keep the clock estimate reported by a client, forgetting the least recently seen client beyond the limit."""
+        stats = self._clients.pop(client_id, None)
+        if stats is None:
+            stats = ClientClockStats(samples=0, offset_ms=0.0, rtt_ms=0.0, min_rtt_ms=rtt_ms, updated_at=0.0)
+
+        stats.samples += 1
+        stats.offset_ms = offset_ms
+        stats.rtt_ms = rtt_ms
+        stats.min_rtt_ms = min(stats.min_rtt_ms, rtt_ms)
+        stats.updated_at = self.now_ms()
+        self._clients[client_id] = stats
+        while len(self._clients) > self.max_clients:
+            self._clients.popitem(last=False)
+
+    async def calibrate(self, samples: int = 5) -> None:
+        """Measure the offset of the Redis clock, keeping the sample with the lowest round-trip time."""
+        if self.client is None:
+            return
+
+        best: tuple[float, float] | None = None
+        for _ in range(samples):
+            sent_at = time.monotonic() * 1000
+            seconds, microseconds = await self.client.time()
+            received_at = time.monotonic() * 1000
+            rtt = received_at - sent_at
+            if best is None or rtt < best[0]:
+                best = (rtt, seconds * 1000 + microseconds / 1000 - (sent_at + received_at) / 2)
+
+        if best is not None:
+            self.calibration_rtt_ms, self._base_ms = best
+
+    async def _calibrate_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.calibration_interval)
+            try:
+                await self.calibrate()
+            except Exception as e:
+                logger.error(f"Error measuring the Redis clock offset: {e}")
+
+    async def start(self, client: Redis | None, calibration_interval: float = 30.0, max_clients: int = 10_000) -> None:
+        """Align on the Redis clock and keep measuring its offset in the background.
+
+        Parameters
+        ----------
+        client: Redis | None
+            Redis client whose clock timer anchors are stamped with. None to use the clock of this process.
+        calibration_interval: float
+            Seconds between two measurements of the offset.
+        max_clients: int
+            Maximum number of clients whose estimates are kept.
+        """
+        self.client = client
+        self.calibration_interval = calibration_interval
+        self.max_clients = max_clients
+        if client is not None:
+            try:
+                await self.calibrate()
+            except Exception as e:
+                logger.error(f"Error measuring the Redis clock offset: {e}")
+
+            self._task = asyncio.create_task(self._calibrate_periodically())
+
+    async def stop(self) -> None:
+        """Stop measuring the offset."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self.client = None
+
+    def client_stats(self, client_id: str) -> dict[str, Any] | None:
+        """Return the last estimate reported by a client, None if it is not known."""
+        stats = self._clients.get(client_id)
+        return None if stats is None else asdict(stats)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the calibration round-trip time and the distribution of the offsets and round-trip times reported."""
+        clients = list(self._clients.values())
+        return {
+            "calibration_rtt_ms": self.calibration_rtt_ms,
+            "clients": len(clients),
+            "offset_ms": _percentiles([abs(stats.offset_ms) for stats in clients]),
+            "rtt_ms": _percentiles([stats.rtt_ms for stats in clients]),
+        }
+
+
+clock_sync = ClockSync()
@@ -0,0 +1,258 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, cast
+
+from jose import JWTError
+from jose import jwk as jose_jwk
+from jose import jwt as jose_jwt
+
+try:
+    import jwt as pyjwt
+
+    HAS_PYJWT = True
+except ImportError:  # pragma: no cover
+    HAS_PYJWT = False
+
+SYMMETRIC_ALGORITHMS = frozenset({"HS256", "HS384", "HS512"})
+
+
+class InvalidTokenError(Exception):
+    """Raised when a token is malformed, expired, or not signed by a key of the keyring."""
+
+
+class JWTBackend(ABC):
+    """Base class of the libraries a `Keyring` signs and verifies tokens with.
+
+    Keys are prepared once with `prepare_key`, and the prepared objects are passed to `encode` and `decode`, so PEM
+    parsing and key construction do not happen on every call.
+    """
+
+    name: str
+
+    @abstractmethod
+    def prepare_key(self, key: str, algorithm: str) -> Any:
+        """Parse a secret or a PEM key for `algorithm`."""
+
+    @abstractmethod
+    def encode(self, claims: dict[str, Any], key: Any, algorithm: str, headers: dict[str, Any] | None) -> str:
+        """Sign `claims` with a prepared key."""
+
+    @abstractmethod
+    def decode(self, token: str, key: Any, algorithm: str) -> dict[str, Any]:
+        """Verify a token with a prepared key and return its claims, raising `InvalidTokenError` if it is invalid."""
+
+    @abstractmethod
+    def get_unverified_header(self, token: str) -> dict[str, Any]:
+        """Return the header of a token without verifying it, raising `InvalidTokenError` if it is malformed."""
+
+
+class JoseBackend(JWTBackend):
+    """Backend based on `python-jose`, supporting the HS*, RS*, ES* and PS* algorithms."""
+
+    name = "jose"
+
+    def prepare_key(self, key: str, algorithm: str) -> Any:
+        if jose_jwk.get_key(algorithm) is None:
+            raise ValueError(f"The jose JWT backend does not support {algorithm}, use JWT_BACKEND=pyjwt.")
+
+        return jose_jwk.construct(key, algorithm)
+
+    def encode(self, claims: dict[str, Any], key: Any, algorithm: str, headers: dict[str, Any] | None) -> str:
+        return cast(str, jose_jwt.encode(claims, key, algorithm=algorithm, headers=headers))
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict[str, Any]:
+        try:
+            return cast(dict[str, Any], jose_jwt.decode(token, key, algorithms=[algorithm]))
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+    def get_unverified_header(self, token: str) -> dict[str, Any]:
+        try:
+            return cast(dict[str, Any], jose_jwt.get_unverified_header(token))
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class PyJWTBackend(JWTBackend):
+    """Backend based on `PyJWT` and `cryptography`, supporting EdDSA on top of the algorithms of `python-jose`."""
+
+    name = "pyjwt"
+
+    def __init__(self) -> None:
+        if not HAS_PYJWT:
+            raise ImportError("PyJWT is not installed, install it with `pip install PyJWT[crypto]`.")
+
+    def prepare_key(self, key: str, algorithm: str) -> Any:
+        return pyjwt.get_algorithm_by_name(algorithm).prepare_key(key)
+
+    def encode(self, claims: dict[str, Any], key: Any, algorithm: str, headers: dict[str, Any] | None) -> str:
+        return pyjwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict[str, Any]:
+        try:
+            return pyjwt.decode(token, key, algorithms=[algorithm])
+        except pyjwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+    def get_unverified_header(self, token: str) -> dict[str, Any]:
+        try:
+            return pyjwt.get_unverified_header(token)
+        except pyjwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+def get_backend(name: str) -> JWTBackend:
+    """Return the JWT backend called `name`, "jose" or "pyjwt"."""
+    backends: dict[str, type[JWTBackend]] = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown JWT backend {name!r}, expected one of {sorted(backends)}.")
+
+    return backends[name]()
+
+
+def _public_key_pem(private_key_pem: str) -> str:
+    from cryptography.hazmat.primitives import serialization
+
+    private_key = serialization.load_pem_private_key(private_key_pem.encode(), password=None)
+    return (
+        private_key.public_key()
+        .public_bytes(encoding=serialization.Encoding.PEM, format=serialization.PublicFormat.SubjectPublicKeyInfo)
+        .decode()
+    )
+
+
+class Keyring:
+    """Signs tokens with one key and verifies them with any key of a set, identified by the `kid` header.
+
+    Every key is parsed once, when the keyring is created. With a symmetric algorithm (HS256, HS384, HS512) the secret
+    both signs and verifies. With an asymmetric one (ES256, EdDSA, RS256...) tokens are signed with the private key,
+    and verified with the public keys, so services that only verify tokens never hold the signing key.
+
+    Parameters
+    ----------
+    algorithm: str
+        The JWS algorithm of every key.
+    backend: JWTBackend
+        The library tokens are signed and verified with.
+    signing_key: str | None
+        The secret, or the PEM private key, tokens are signed with. None for a keyring that only verifies tokens.
+    signing_kid: str | None
+        The `kid` header of the tokens signed by this keyring, also the id of the verification key matching
+        `signing_key`.
+    verification_keys: dict[str, str] | None
+        Other keys accepted to verify tokens, secrets or PEM public keys, by key id.
+
+    Note
+    ----
+        - Tokens without a `kid` header, such as the ones issued before key ids were configured, are verified with
+        the signing key.
+        - To rotate keys, make every verifier accept the new public key, then switch the signers to the new private
+        key and key id, and drop the old public key once the tokens it signed have expired.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        backend: JWTBackend,
+        signing_key: str | None = None,
+        signing_kid: str | None = None,
+        verification_keys: dict[str, str] | None = None,
+    ) -> None:
+        self.algorithm = algorithm
+        self.backend = backend
+        self.signing_kid = signing_kid or None
+        self._headers = {"kid": self.signing_kid} if self.signing_kid else None
+        self._signing_key = backend.prepare_key(signing_key, algorithm) if signing_key else None
+
+        keys = dict(verification_keys or {})
+        if signing_key:
+            own_key = signing_key if algorithm in SYMMETRIC_ALGORITHMS else _public_key_pem(signing_key)
+            keys[self.signing_kid or ""] = own_key
+
+        self._keys = {kid: backend.prepare_key(key, algorithm) for kid, key in keys.items()}
+        self._default_key = self._keys.get(self.signing_kid or "")
+        if self._default_key is None and len(self._keys) == 1:
+            self._default_key = next(iter(self._keys.values()))
+
+    @property
+    def kids(self) -> list[str]:
+        """The ids of the keys tokens are verified with."""
+        return sorted(self._keys)
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        """Sign claims with the signing key, adding its `kid` header."""
+        if self._signing_key is None:
+            raise Exception("This keyring has no signing key, it can only verify tokens.")
+
+        return self.backend.encode(claims, self._signing_key, self.algorithm, self._headers)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """Verify the signature and expiration of a token with the key named by its `kid` header and return its claims.
+
+        Raises
+        ------
+        InvalidTokenError
+            If the token is malformed, expired, or signed by an unknown key.
+        """
+        if len(self._keys) == 1 and self._default_key is not None:
+            key = self._default_key
+        else:
+            kid = self.backend.get_unverified_header(token).get("kid")
+            key = self._keys.get(kid) if kid else self._default_key
+            if key is None:
+                raise InvalidTokenError(f"Unknown key id {kid!r}.")
+
+        return self.backend.decode(token, key, self.algorithm)
+
+    @classmethod
+    def load(
+        cls,
+        algorithm: str,
+        backend: str = "jose",
+        secret_key: str | None = None,
+        key_id: str | None = None,
+        private_key_file: str | None = None,
+        public_keys_dir: str | None = None,
+    ) -> "Keyring":
+        """Create a keyring from a secret or PEM files.
+
+        Parameters
+        ----------
+        algorithm: str
+            The JWS algorithm of every key.
+        backend: str
+            "jose" or "pyjwt", see `get_backend`.
+        secret_key: str | None
+            The secret of symmetric algorithms.
+        key_id: str | None
+            The `kid` of the signing key.
+        private_key_file: str | None
+            Path to the PEM private key tokens are signed with, for asymmetric algorithms. Leave it empty on services
+            that only verify tokens.
+        public_keys_dir: str | None
+            Directory of PEM public keys accepted to verify tokens, named `{kid}.pem`, for asymmetric algorithms.
+
+        Returns
+        -------
+        Keyring
+            The keyring.
+        """
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            return cls(algorithm, get_backend(backend), signing_key=secret_key, signing_kid=key_id)
+
+        signing_key = Path(private_key_file).read_text() if private_key_file else None
+        verification_keys = (
+            {path.stem: path.read_text() for path in sorted(Path(public_keys_dir).glob("*.pem"))}
+            if public_keys_dir
+            else {}
+        )
+        if signing_key is None and not verification_keys:
+            raise ValueError(f"{algorithm} needs JWT_PRIVATE_KEY_FILE, JWT_PUBLIC_KEYS_DIR or both.")
+
+        return cls(
+            algorithm,
+            get_backend(backend),
+            signing_key=signing_key,
+            signing_kid=key_id,
+            verification_keys=verification_keys,
+        )
@@ -0,0 +1,132 @@
+import fnmatch
+import time
+from collections import OrderedDict, defaultdict
+
+
+class _LocalEntry:
+    __slots__ = ("value", "expires_at", "size", "group")
+
+    def __init__(self, value: bytes, expires_at: float, size: int, group: str) -> None:
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.group = group
+
+
+class LocalCache:
+    """Bounded in-process LRU cache used as an L1 in front of Redis.
+
+    Entries are evicted when they expire, when the number of entries exceeds `max_entries` or when the total
+    size of the stored values exceeds `max_bytes`, least recently used first. Hits, misses, evictions and
+    invalidations are counted per group, where a group is usually the unformatted `key_prefix` of a cached endpoint.
+
+    Parameters
+    ----------
+    max_entries: int
+        Maximum number of entries kept in memory.
+    max_bytes: int
+        Maximum total size, in bytes, of the keys and values kept in memory.
+    ttl: float
+        Maximum time, in seconds, an entry is served from memory before Redis is asked again.
+
+    Note
+    ----
+        - This class is not thread safe, it is meant to be used from a single event loop per process.
+        - Coherence between processes is handled by the caller, see `core.utils.cache`.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 5.0) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._entries: OrderedDict[str, _LocalEntry] = OrderedDict()
+        self._stats: defaultdict[str, dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, group: str = "default") -> bytes | None:
+        """Return the value stored under `key`, or None if it is missing or expired.
+
+        Parameters
+        ----------
+        key: str
+            The cache key.
+        group: str
+            The group the lookup is accounted to.
+
+        Returns
+        -------
+        bytes | None
+            The stored value if present and fresh, None otherwise.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats[group]["misses"] += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key, "evictions")
+            self._stats[group]["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats[group]["hits"] += 1
+        return entry.value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None, group: str = "default") -> None:
+        """Store `value` under `key`, evicting least recently used entries if a bound is exceeded.
+
+        Parameters
+        ----------
+        key: str
+            The cache key.
+        value: bytes
+            The value to store.
+        ttl: float | None
+            Time to live in seconds. It is capped by the cache-wide `ttl`.
+        group: str
+            The group the entry belongs to.
+        """
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        effective_ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = _LocalEntry(value, time.monotonic() + effective_ttl, size, group)
+        self.current_bytes += size
+
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key, "evictions")
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache if present."""
+        if key in self._entries:
+            self._remove(key, "invalidations")
+
+    def delete_pattern(self, pattern: str) -> None:
+        """Remove all keys matching a glob-style `pattern`, using the same syntax as Redis `SCAN MATCH`."""
+        for key in [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]:
+            self._remove(key, "invalidations")
+
+    def clear(self) -> None:
+        """Remove every entry, keeping the counters."""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return hit, miss, eviction and invalidation counters per group."""
+        return {group: dict(counters) for group, counters in self._stats.items()}
+
+    def _remove(self, key: str, counter: str | None = None) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+        if counter is not None:
+            self._stats[entry.group][counter] += 1
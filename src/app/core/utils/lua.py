@@ -0,0 +1,41 @@
+import hashlib
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+
+class LuaScript:
+    """A Lua script registered once per Redis client, then run with EVALSHA.
+
+    Parameters
+    ----------
+    source: str
+        The Lua source of the script.
+
+    Attributes
+    ----------
+    sha: str
+        SHA1 digest of the source, the name Redis caches the script under, for pipelines calling `evalsha`.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+        self._client: Redis | None = None
+        self._script: AsyncScript | None = None
+
+    def register(self, client: Redis) -> "LuaScript":
+        """Register the script on a client, again only when the client changed, and return it."""
+        if self._script is None or self._client is not client:
+            self._script = client.register_script(self.source)
+            self._client = client
+
+        return self
+
+    async def __call__(self, keys: list[Any] | None = None, args: list[Any] | None = None) -> Any:
+        """Run the script on the client it was registered on, loading it again if Redis lost it."""
+        if self._script is None:
+            raise RuntimeError("The script is not registered on a Redis client.")
+
+        return await self._script(keys=keys, args=args)
@@ -0,0 +1,97 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+import bcrypt
+
+from ..exceptions.http_exceptions import ServiceUnavailableException
+from ..logger import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """Hash and verify passwords with bcrypt in a dedicated, size-limited thread pool.
+
+    bcrypt is deliberately slow, around 250 ms per call at cost 12, and releases the GIL while it runs. Calling it from
+    a coroutine would block the event loop, and every request of the worker with it, for that long; running it in
+    `max_workers` threads keeps the event loop free.
+
+    Parameters
+    ----------
+    rounds: int
+        The bcrypt cost factor of new hashes, each increment doubles the hashing time.
+    max_workers: int
+        Number of passwords hashed or verified at the same time. Keep it below the number of CPU cores so the event
+        loop still gets one.
+    max_wait: float
+        Maximum time, in seconds, a call waits for a free worker before a 503 response is returned.
+
+    Note
+    ----
+        Calls beyond `max_workers` are queued. Under a login storm the queue would otherwise grow without bound, every
+        caller waiting longer than its client timeout: calls that cannot start within `max_wait` fail fast with a
+        `ServiceUnavailableException` and a `Retry-After` header instead.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_wait: float = 5.0) -> None:
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_wait = max_wait
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._loop = loop
+
+        return self._slots
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.max_wait)
+        except TimeoutError:
+            logger.warning(f"No password hashing worker freed up within {self.max_wait}s, rejecting the request.")
+            exception = ServiceUnavailableException("Too many concurrent authentication requests, retry later.")
+            exception.headers = {"Retry-After": str(max(1, round(self.max_wait)))}
+            raise exception
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            slots.release()
+
+    def hash_sync(self, password: str) -> str:
+        """Hash a password in the calling thread, for synchronous callers such as scripts and the admin interface."""
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=self.rounds)).decode()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the worker pool."""
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a password against its hash in the worker pool."""
+        return await self._run(bcrypt.checkpw, password.encode(), hashed_password.encode())
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Return whether a hash was made with a cost factor other than `rounds`."""
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once the running calls are done."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
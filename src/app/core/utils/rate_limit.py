@@ -1,7 +1,13 @@
-from datetime import UTC, datetime
+import asyncio
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from enum import Enum
 from typing import Optional
 
 from redis.asyncio import ConnectionPool, Redis
+from redis.commands.core import AsyncScript
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.logger import logging
@@ -10,10 +16,317 @@ from ...schemas.rate_limit import sanitize_path
 logger = logging.getLogger(__name__)
 
 
+class RateLimitAlgorithm(str, Enum):
+    FIXED_WINDOW = "fixed_window"
+    SLIDING_WINDOW_LOG = "sliding_window_log"
+    SLIDING_WINDOW_COUNTER = "sliding_window_counter"
+    TOKEN_BUCKET = "token_bucket"
+
+
+# Every script takes the key in KEYS[1] and the limit and period (in seconds) in ARGV[1] and ARGV[2], reads the
+# time from the Redis server so all the workers share the same clock, and returns
+# {limited, remaining, reset_after_ms, retry_after_ms}.
+
+FIXED_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local count = redis.call("INCR", KEYS[1])
+local ttl = redis.call("PTTL", KEYS[1])
+if ttl < 0 then
+    redis.call("EXPIRE", KEYS[1], period)
+    ttl = period * 1000
+end
+if count > limit then
+    return {1, 0, ttl, ttl}
+end
+return {0, limit - count, ttl, 0}
+"""
+
+SLIDING_WINDOW_LOG_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2]) * 1000
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - window)
+local count = redis.call("ZCARD", KEYS[1])
+local limited = 1
+if count < limit then
+    redis.call("ZADD", KEYS[1], now, ARGV[3])
+    redis.call("PEXPIRE", KEYS[1], window)
+    count = count + 1
+    limited = 0
+end
+local oldest = redis.call("ZRANGE", KEYS[1], 0, 0, "WITHSCORES")
+local reset_after = window
+if oldest[2] then
+    reset_after = tonumber(oldest[2]) + window - now
+end
+if limited == 1 then
+    return {1, 0, reset_after, reset_after}
+end
+return {0, limit - count, reset_after, 0}
+"""
+
+SLIDING_WINDOW_COUNTER_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2]) * 1000
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local index = math.floor(now / window)
+local stored = redis.call("HMGET", KEYS[1], "index", "current", "previous")
+local stored_index = tonumber(stored[1])
+local current = tonumber(stored[2]) or 0
+local previous = tonumber(stored[3]) or 0
+if stored_index == index - 1 then
+    previous = current
+    current = 0
+elseif stored_index ~= index then
+    previous = 0
+    current = 0
+end
+local elapsed = now - index * window
+local weight = (window - elapsed) / window
+local reset_after = window - elapsed
+if previous * weight + current + 1 > limit then
+    local retry_after = reset_after
+    if current + 1 <= limit and previous > 0 then
+        retry_after = math.ceil(window * (1 - (limit - 1 - current) / previous) - elapsed)
+    end
+    return {1, 0, reset_after, retry_after}
+end
+current = current + 1
+redis.call("HSET", KEYS[1], "index", index, "current", current, "previous", previous)
+redis.call("PEXPIRE", KEYS[1], 2 * window)
+return {0, math.floor(limit - previous * weight - current), reset_after, 0}
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2]) * 1000
+local interval = period / limit
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = math.max(tonumber(redis.call("GET", KEYS[1])) or now, now)
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {1, 0, math.ceil(tat - now), math.ceil(allow_at - now)}
+end
+redis.call("SET", KEYS[1], tostring(new_tat), "PX", math.ceil(new_tat - now))
+return {0, math.floor((now - allow_at) / interval), math.ceil(new_tat - now), 0}
+"""
+
+SCRIPTS = {
+    RateLimitAlgorithm.FIXED_WINDOW: FIXED_WINDOW_SCRIPT,
+    RateLimitAlgorithm.SLIDING_WINDOW_LOG: SLIDING_WINDOW_LOG_SCRIPT,
+    RateLimitAlgorithm.SLIDING_WINDOW_COUNTER: SLIDING_WINDOW_COUNTER_SCRIPT,
+    RateLimitAlgorithm.TOKEN_BUCKET: TOKEN_BUCKET_SCRIPT,
+}
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of a rate limit check.
+
+    Attributes
+    ----------
+    limited: bool
+        Whether the request exceeds the limit.
+    limit: int
+        Number of requests allowed per period.
+    remaining: int
+        Number of requests still allowed right now.
+    reset_after: float
+        Seconds until the quota is fully available again, or until the current window ends for window algorithms.
+    retry_after: float
+        Seconds until a rejected request may be retried, 0 if the request is allowed.
+    """
+
+    limited: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+    def headers(self) -> dict[str, str]:
+        """Return the `X-RateLimit-*` headers, and `Retry-After` when the request is limited."""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if self.limited:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+
+        return headers
+
+
+class _LocalCounter:
+    __slots__ = ("key", "window_end", "pending", "in_flight", "known", "touched")
+
+    def __init__(self, key: str, window_end: float) -> None:
+        self.key = key
+        self.window_end = window_end
+        self.pending = 0
+        self.in_flight = 0
+        self.known = 0
+        self.touched = False
+
+
+class LocalCounters:
+    """Approximate rate limiting with per-process counters synchronized with Redis in batches.
+
+    Requests are counted in memory per `(user_id, path, window)`, in fixed windows aligned on the period, and checked
+    against the global count returned by the last synchronization plus the requests not reported yet. A counter is
+    reported with `INCRBY` once `sync_hits` requests are pending, and every counter used since the last
+    synchronization is reported every `sync_interval` seconds, in a single pipeline.
+
+    Parameters
+    ----------
+    client: Redis
+        The rate limiter Redis client.
+    sync_interval: float
+        Maximum time, in seconds, between two synchronizations of a counter in use.
+    sync_hits: int
+        Maximum number of requests counted in memory before a counter is reported.
+    max_error: float
+        Maximum fraction of the limit counted in memory before a counter is reported, so low limits are reported more
+        often and stay close to exact.
+
+    Note
+    ----
+        The count a process enforces lags the global count by the requests other processes have not reported yet,
+        at most `min(sync_hits, max_error * limit)` per process, and by those reported since its own last
+        synchronization, at most `sync_interval` old. With `workers` processes, the limit can therefore be exceeded by
+        up to `workers * min(sync_hits, max_error * limit)` requests per window under bursts. Rejected requests are
+        not counted.
+    """
+
+    def __init__(self, client: Redis, sync_interval: float = 0.1, sync_hits: int = 50, max_error: float = 0.1) -> None:
+        self.client = client
+        self.sync_interval = sync_interval
+        self.sync_hits = sync_hits
+        self.max_error = max_error
+        self._counters: dict[str, _LocalCounter] = {}
+        self._task: asyncio.Task | None = None
+
+    async def hit(self, user_id: int | str, path: str, limit: int, period: int) -> RateLimitResult:
+        """Count a request against the limit of a user on a path, only calling Redis when the counter is reported.
+
+        Parameters
+        ----------
+        user_id: int | str
+            The user id, or the client address for anonymous requests.
+        path: str
+            The request path.
+        limit: int
+            Number of requests allowed per period.
+        period: int
+            Length of the period in seconds.
+
+        Returns
+        -------
+        RateLimitResult
+            Whether the request is limited, with the remaining quota and reset times.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sync_periodically())
+
+        now = time.time()
+        window = int(now // period)
+        key = f"ratelimit:approximate:{user_id}:{sanitize_path(path)}:{window}"
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = _LocalCounter(key, window_end=(window + 1) * period)
+
+        counter.touched = True
+        reset_after = counter.window_end - now
+        count = counter.known + counter.in_flight + counter.pending
+        if count >= limit:
+            return RateLimitResult(
+                limited=True, limit=limit, remaining=0, reset_after=reset_after, retry_after=reset_after
+            )
+
+        counter.pending += 1
+        if counter.pending >= max(1, min(self.sync_hits, int(limit * self.max_error))):
+            await self.sync([counter])
+
+        remaining = limit - counter.known - counter.in_flight - counter.pending
+        return RateLimitResult(
+            limited=False, limit=limit, remaining=max(remaining, 0), reset_after=reset_after, retry_after=0
+        )
+
+    async def sync(self, counters: list[_LocalCounter] | None = None) -> None:
+        """Report pending requests to Redis and refresh the global counts, in a single round-trip.
+
+        Parameters
+        ----------
+        counters: list[_LocalCounter] | None
+            The counters to synchronize, defaults to every counter used since the last synchronization.
+        """
+        if counters is None:
+            now = time.time()
+            counters = [counter for counter in self._counters.values() if counter.touched]
+            for key in [key for key, counter in self._counters.items() if counter.window_end <= now]:
+                del self._counters[key]
+
+        if not counters:
+            return
+
+        deltas = []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for counter in counters:
+                delta = counter.pending
+                counter.pending = 0
+                counter.in_flight += delta
+                counter.touched = False
+                deltas.append(delta)
+                pipe.incrby(counter.key, delta)
+                pipe.expireat(counter.key, math.ceil(counter.window_end) + 1)
+            try:
+                results = await pipe.execute()
+
+            except Exception as e:
+                logger.error(f"Error synchronizing rate limit counters: {e}")
+                for counter, delta in zip(counters, deltas, strict=True):
+                    counter.in_flight -= delta
+                    counter.pending += delta
+                return
+
+        for counter, delta, total in zip(counters, deltas, results[::2], strict=True):
+            counter.in_flight -= delta
+            counter.known = max(counter.known, int(total) - counter.in_flight)
+
+    async def _sync_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Error synchronizing rate limit counters: {e}")
+
+    async def stop(self) -> None:
+        """Stop the periodic synchronization and report the pending requests."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        pending = [counter for counter in self._counters.values() if counter.pending]
+        await self.sync(pending)
+        self._counters.clear()
+
+
 class RateLimiter:
     _instance: Optional["RateLimiter"] = None
     pool: Optional[ConnectionPool] = None
     client: Optional[Redis] = None
+    algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW_COUNTER
+    local_counters: LocalCounters | None = None
+    _scripts: dict[RateLimitAlgorithm, AsyncScript] = {}
 
     def __new__(cls) -> "RateLimiter":
         if cls._instance is None:
@@ -21,11 +334,15 @@ class RateLimiter:
         return cls._instance
 
     @classmethod
-    def initialize(cls, redis_url: str) -> None:
+    def initialize(cls, redis_url: str, algorithm: RateLimitAlgorithm | str | None = None) -> None:
         instance = cls()
+        if algorithm is not None:
+            instance.algorithm = RateLimitAlgorithm(algorithm)
+
         if instance.pool is None:
             instance.pool = ConnectionPool.from_url(redis_url)
             instance.client = Redis(connection_pool=instance.pool)
+            instance._scripts = {}
 
     @classmethod
     def get_client(cls) -> Redis:
@@ -35,27 +352,94 @@ class RateLimiter:
             raise Exception("Redis client is not initialized.")
         return instance.client
 
-    async def is_rate_limited(self, db: AsyncSession, user_id: int, path: str, limit: int, period: int) -> bool:
-        client = self.get_client()
-        current_timestamp = int(datetime.now(UTC).timestamp())
-        window_start = current_timestamp - (current_timestamp % period)
+    def use_local_counters(self, sync_interval: float = 0.1, sync_hits: int = 50, max_error: float = 0.1) -> None:
+        """Switch to approximate mode, where requests are counted in memory and synchronized with Redis in batches.
 
-        sanitized_path = sanitize_path(path)
-        key = f"ratelimit:{user_id}:{sanitized_path}:{window_start}"
+        See `LocalCounters` for the parameters and the error bound.
+        """
+        self.local_counters = LocalCounters(
+            self.get_client(), sync_interval=sync_interval, sync_hits=sync_hits, max_error=max_error
+        )
 
-        try:
-            current_count = await client.incr(key)
-            if current_count == 1:
-                await client.expire(key, period)
+    def _get_script(self, algorithm: RateLimitAlgorithm) -> AsyncScript:
+        """Return the script of an algorithm, registered once so it then runs with EVALSHA."""
+        script = self._scripts.get(algorithm)
+        if script is None:
+            script = self.get_client().register_script(SCRIPTS[algorithm])
+            self._scripts[algorithm] = script
+
+        return script
+
+    async def check(
+        self,
+        user_id: int | str,
+        path: str,
+        limit: int,
+        period: int,
+        algorithm: RateLimitAlgorithm | None = None,
+        approximate: bool | None = None,
+    ) -> RateLimitResult:
+        """Count a request against the limit of a user on a path, in a single atomic round-trip to Redis or in memory.
+
+        Parameters
+        ----------
+        user_id: int | str
+            The user id, or the client address for anonymous requests.
+        path: str
+            The request path.
+        limit: int
+            Number of requests allowed per period.
+        period: int
+            Length of the period in seconds.
+        algorithm: RateLimitAlgorithm | None
+            The algorithm to use, defaults to the one the limiter was initialized with:
+
+            - `fixed_window`: counts requests in windows starting with the first request. Cheapest, but allows
+              bursts of up to twice the limit around window boundaries.
+            - `sliding_window_log`: stores the timestamp of every allowed request. Exact, memory grows with the limit.
+            - `sliding_window_counter`: weights the count of the previous window by its overlap with the sliding
+              window. Constant memory, close to exact.
+            - `token_bucket`: GCRA, equivalent to a bucket of `limit` tokens refilled at `limit / period` per
+              second. Allows bursts of `limit` requests, then smooths requests over the period.
 
-            if current_count > limit:
-                return True
+        approximate: bool | None
+            Whether to count the request with the local counters, in fixed windows aligned on the period, instead of
+            running the algorithm script. Defaults to True once `use_local_counters` was called.
+
+        Returns
+        -------
+        RateLimitResult
+            Whether the request is limited, with the remaining quota and reset times.
+        """
+        if self.local_counters is not None and approximate is not False:
+            return await self.local_counters.hit(user_id=user_id, path=path, limit=limit, period=period)
+
+        algorithm = algorithm or self.algorithm
+        key = f"ratelimit:{algorithm.value}:{user_id}:{sanitize_path(path)}"
+        args: list[int | str] = [limit, period]
+        if algorithm is RateLimitAlgorithm.SLIDING_WINDOW_LOG:
+            args.append(uuid.uuid4().hex)
+
+        try:
+            limited, remaining, reset_after_ms, retry_after_ms = await self._get_script(algorithm)(
+                keys=[key], args=args
+            )
 
         except Exception as e:
             logger.exception(f"Error checking rate limit for user {user_id} on path {path}: {e}")
             raise e
 
-        return False
+        return RateLimitResult(
+            limited=bool(limited),
+            limit=limit,
+            remaining=max(int(remaining), 0),
+            reset_after=max(int(reset_after_ms), 0) / 1000,
+            retry_after=max(int(retry_after_ms), 0) / 1000,
+        )
+
+    async def is_rate_limited(self, db: AsyncSession, user_id: int, path: str, limit: int, period: int) -> bool:
+        result = await self.check(user_id=user_id, path=path, limit=limit, period=period)
+        return result.limited
 
 
 rate_limiter = RateLimiter()
@@ -0,0 +1,220 @@
+import asyncio
+import fnmatch
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...models.rate_limit import RateLimit
+from ...models.tier import Tier
+from ..db.database import local_session
+from ..logger import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    limit: int
+    period: int
+
+
+class RateLimitPolicies:
+    """In-process copy of the tier and rate limit tables, so rate limit checks never query the database.
+
+    Rate limits are looked up by `(tier_id, sanitized_path)`. The `path` of a rate limit is matched exactly, or as a
+    glob pattern when it contains `*`, so `api_v1_rooms_*` applies to every room path and `api_v1_*` to the whole
+    API. Exact paths win over patterns, and longer patterns over shorter ones.
+
+    Every write to the `tier` or `rate_limit` tables must call `publish_change`, which increments a version stored in
+    Redis and publishes it, so every process reloads its table once.
+
+    Parameters
+    ----------
+    max_cached_paths: int
+        Maximum number of pattern lookups memoized between two reloads.
+
+    Note
+    ----
+        - The table is loaded lazily by the first request if no listener is running or the last reload failed.
+        - Messages published while the subscription is down are lost, so the table is reloaded every time the
+        subscription is (re)established.
+    """
+
+    def __init__(self, max_cached_paths: int = 10_000) -> None:
+        self.max_cached_paths = max_cached_paths
+        self.version: int | None = None
+        self.loaded = False
+        self.tiers: dict[int, str] = {}
+        self._exact: dict[tuple[int, str], RateLimitPolicy] = {}
+        self._patterns: dict[int, list[tuple[str, RateLimitPolicy]]] = {}
+        self._matches: dict[tuple[int, str], RateLimitPolicy | None] = {}
+        self._lock = asyncio.Lock()
+        self._client: Redis | None = None
+        self._channel = "ratelimit:policies"
+        self._listener: asyncio.Task | None = None
+
+    @property
+    def version_key(self) -> str:
+        return f"{self._channel}:version"
+
+    def build(self, tiers: dict[int, str], rate_limits: list[tuple[int, str, int, int]], version: int | None) -> None:
+        """Replace the table with the given rows.
+
+        Parameters
+        ----------
+        tiers: dict[int, str]
+            Tier names by id.
+        rate_limits: list[tuple[int, str, int, int]]
+            `(tier_id, path, limit, period)` rows, with sanitized paths.
+        version: int | None
+            Version of the tables the rows were read at.
+        """
+        exact: dict[tuple[int, str], RateLimitPolicy] = {}
+        patterns: dict[int, list[tuple[str, RateLimitPolicy]]] = {}
+        for tier_id, path, limit, period in rate_limits:
+            policy = RateLimitPolicy(limit=limit, period=period)
+            if "*" in path:
+                patterns.setdefault(tier_id, []).append((path, policy))
+            else:
+                exact[(tier_id, path)] = policy
+
+        for tier_patterns in patterns.values():
+            tier_patterns.sort(key=lambda item: len(item[0]), reverse=True)
+
+        self.tiers, self._exact, self._patterns, self._matches = tiers, exact, patterns, {}
+        self.version = version
+        self.loaded = True
+
+    def lookup(self, tier_id: int, path: str) -> RateLimitPolicy | None:
+        """Return the rate limit of a tier for a sanitized path, or None if the tier has no matching rate limit."""
+        key = (tier_id, path)
+        policy = self._exact.get(key)
+        if policy is not None or tier_id not in self._patterns:
+            return policy
+
+        if key in self._matches:
+            return self._matches[key]
+
+        policy = next(
+            (policy for pattern, policy in self._patterns[tier_id] if fnmatch.fnmatchcase(path, pattern)), None
+        )
+        if len(self._matches) >= self.max_cached_paths:
+            self._matches.clear()
+        self._matches[key] = policy
+        return policy
+
+    async def load(self, db: AsyncSession, version: int | None = None) -> None:
+        """Read the tier and rate limit tables into memory.
+
+        Parameters
+        ----------
+        db: AsyncSession
+            The database session to read the tables with.
+        version: int | None
+            Version of the tables, read from Redis if not given. It is read before the tables so a concurrent change
+            is never missed.
+        """
+        async with self._lock:
+            if version is None and self._client is not None:
+                stored = await self._client.get(self.version_key)
+                version = int(stored) if stored is not None else 0
+
+            tiers = await db.execute(select(Tier.id, Tier.name))
+            rate_limits = await db.execute(select(RateLimit.tier_id, RateLimit.path, RateLimit.limit, RateLimit.period))
+            self.build(
+                tiers=dict(tiers.all()),  # type: ignore[arg-type]
+                rate_limits=[tuple(row) for row in rate_limits.all()],  # type: ignore[misc]
+                version=version,
+            )
+
+    async def get(self, db: AsyncSession, tier_id: int, path: str) -> RateLimitPolicy | None:
+        """Return the rate limit of a tier for a sanitized path, loading the table with `db` if it is not loaded."""
+        if not self.loaded:
+            await self.load(db)
+
+        return self.lookup(tier_id, path)
+
+    async def publish_change(self, db: AsyncSession) -> None:
+        """Reload the table after a committed write to the tier or rate limit tables, and notify the other processes.
+
+        Parameters
+        ----------
+        db: AsyncSession
+            The session the change was made with, used to reload the table of this process right away.
+        """
+        if self._client is None:
+            await self.load(db)
+            return
+
+        try:
+            version = await self._client.incr(self.version_key)
+            await self.load(db, version=version)
+            await self._client.publish(self._channel, str(version))
+
+        except Exception as e:
+            logger.error(f"Could not publish rate limit policy change, loading on next request: {e}")
+            self.loaded = False
+
+    async def _reload(self) -> None:
+        try:
+            async with local_session() as db:
+                await self.load(db)
+
+        except Exception as e:
+            logger.error(f"Could not reload rate limit policies, loading on next request: {e}")
+            self.loaded = False
+
+    async def _listen(self) -> None:
+        if self._client is None:
+            raise Exception("Redis client is not initialized.")
+
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(self._channel)
+                await self._reload()
+                async for message in pubsub.listen():
+                    if message["type"] == "message" and int(message["data"]) != self.version:
+                        await self._reload()
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                logger.error(f"Rate limit policy subscription lost, retrying: {e}")
+                self.loaded = False
+                await asyncio.sleep(1)
+
+            finally:
+                await pubsub.aclose()  # type: ignore
+
+    async def start(self, client: Redis, channel: str = "ratelimit:policies") -> None:
+        """Start reloading the table whenever another process publishes a change.
+
+        Parameters
+        ----------
+        client: Redis
+            Redis client holding the version and used to subscribe to changes.
+        channel: str
+            Redis pub/sub channel changes are published on. The version is stored under `{channel}:version`.
+        """
+        self._client = client
+        self._channel = channel
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening for changes."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+        self._client = None
+
+
+rate_limit_policies = RateLimitPolicies()
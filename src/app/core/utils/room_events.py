@@ -0,0 +1,299 @@
+import asyncio
+import json
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from redis.asyncio import Redis
+
+from ..logger import logging
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_MESSAGE = json.dumps({"type": "heartbeat"})
+RESYNC_MESSAGE = json.dumps({"type": "resync"})
+
+
+class Subscription:
+    """The messages of a room waiting to be sent to one WebSocket or Server-Sent Events connection.
+
+    Messages are buffered in a bounded queue: when the connection does not keep up, the oldest messages are dropped,
+    so a slow display skips intermediate events instead of holding an ever growing backlog.
+
+    Parameters
+    ----------
+    room_id: str
+        The room the connection listens to.
+    buffer_size: int
+        Maximum number of messages waiting to be sent.
+
+    Attributes
+    ----------
+    dropped: int
+        Number of messages dropped because the buffer was full.
+    closed: bool
+        Whether the subscription was closed, by the hub or because the connection went away.
+    slow: bool
+        Whether the subscription was closed because the connection stopped reading.
+    sending_since: float | None
+        Monotonic time the connection started sending its current batch, None when it is not sending.
+    task: asyncio.Task | None
+        The task sending the messages, cancelled if the connection stays blocked on a send.
+    """
+
+    __slots__ = ("room_id", "dropped", "closed", "slow", "last_drained", "sending_since", "task", "_messages", "_ready")
+
+    def __init__(self, room_id: str, buffer_size: int = 64) -> None:
+        self.room_id = room_id
+        self.dropped = 0
+        self.closed = False
+        self.slow = False
+        self.last_drained = time.monotonic()
+        self.sending_since: float | None = None
+        self.task: asyncio.Task | None = None
+        self._messages: deque[str] = deque(maxlen=buffer_size)
+        self._ready = asyncio.Event()
+
+    def put(self, message: str) -> None:
+        """Queue a message, dropping the oldest one if the buffer is full."""
+        if len(self._messages) == self._messages.maxlen:
+            self.dropped += 1
+
+        self._messages.append(message)
+        self._ready.set()
+
+    async def next_batch(self) -> list[str]:
+        """Wait for messages and return all the queued ones, an empty list once the subscription is closed."""
+        if not self._messages and not self.closed:
+            await self._ready.wait()
+
+        self._ready.clear()
+        self.last_drained = time.monotonic()
+        batch = list(self._messages)
+        self._messages.clear()
+        return batch
+
+    def close(self, slow: bool = False) -> None:
+        """Close the subscription, waking up the connection waiting for messages."""
+        self.closed = True
+        self.slow = self.slow or slow
+        self._ready.set()
+
+
+class RoomEventHub:
+    """Fan out the events published on the `room:{room_id}` Redis channels to the connections of this process.
+
+    Every process holds a single pattern subscription, whatever the number of rooms and connections, and copies each
+    message to the `Subscription` of every local connection of its room.
+
+    A single timer per process, instead of one per connection, queues a heartbeat for the connections that were idle
+    for `heartbeat_interval` seconds and closes the slow consumers: connections blocked on a send, or leaving a full
+    buffer untouched, for `slow_consumer_timeout` seconds.
+
+    Note
+    ----
+        - Slow consumers are closed so a stuck display cannot slow down the others or pin memory forever; their
+        sending task is cancelled, which ends the connection.
+        - Messages published while the Redis subscription is lost are missed: once it is restored, every connection
+        receives a `{"type": "resync"}` message and should reload the state of its room.
+    """
+
+    def __init__(self) -> None:
+        self.client: Redis | None = None
+        self.pattern = "room:*"
+        self.buffer_size = 64
+        self.heartbeat_interval = 15.0
+        self.slow_consumer_timeout = 5.0
+        self.ready = False
+        self._prefix = "room:"
+        self._rooms: dict[str, set[Subscription]] = {}
+        self._listener: asyncio.Task | None = None
+        self._ticker: asyncio.Task | None = None
+        self._stats = {"received": 0, "delivered": 0, "dropped": 0, "slow_consumers": 0}
+
+    def subscribe(self, room_id: str) -> Subscription:
+        """Register a connection to the events of a room."""
+        subscription = Subscription(room_id, self.buffer_size)
+        self._rooms.setdefault(room_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Unregister a connection, closing its subscription."""
+        subscription.close()
+        self._stats["dropped"] += subscription.dropped
+        subscription.dropped = 0
+        subscriptions = self._rooms.get(subscription.room_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._rooms[subscription.room_id]
+
+    @contextmanager
+    def subscription(self, room_id: str) -> Iterator[Subscription]:
+        """Subscribe to a room for the duration of a connection."""
+        subscription = self.subscribe(room_id)
+        try:
+            yield subscription
+        finally:
+            self.unsubscribe(subscription)
+
+    def dispatch(self, channel: bytes | str, message: bytes | str) -> int:
+        """Copy a message published on a room channel to the connections of the room.
+
+        Returns
+        -------
+        int
+            The number of connections the message was queued for.
+        """
+        room_id = (channel.decode() if isinstance(channel, bytes) else channel).removeprefix(self._prefix)
+        self._stats["received"] += 1
+        subscriptions = self._rooms.get(room_id)
+        if not subscriptions:
+            return 0
+
+        data = message.decode() if isinstance(message, bytes) else message
+        now = time.monotonic()
+        delivered = len(subscriptions)
+        slow = []
+        for subscription in subscriptions:
+            subscription.put(data)
+            if subscription.dropped and now - subscription.last_drained > self.slow_consumer_timeout:
+                slow.append(subscription)
+
+        for subscription in slow:
+            self._close_slow(subscription)
+
+        self._stats["delivered"] += delivered
+        return delivered
+
+    def _close_slow(self, subscription: Subscription) -> None:
+        if subscription.closed:
+            return
+
+        self._stats["slow_consumers"] += 1
+        subscription.close(slow=True)
+        # Cancelled streaming responses only clean up when their generator is finalized
+        self.unsubscribe(subscription)
+        if subscription.task is not None:
+            subscription.task.cancel()
+
+    def check_connections(self) -> None:
+        """Queue heartbeats for idle connections and close the slow consumers."""
+        now = time.monotonic()
+        for subscriptions in list(self._rooms.values()):
+            for subscription in list(subscriptions):
+                if subscription.sending_since is not None:
+                    if now - subscription.sending_since > self.slow_consumer_timeout:
+                        self._close_slow(subscription)
+
+                elif not subscription._messages and now - subscription.last_drained >= self.heartbeat_interval:
+                    subscription.put(HEARTBEAT_MESSAGE)
+
+    async def _tick(self) -> None:
+        interval = min(1.0, self.heartbeat_interval / 2, self.slow_consumer_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            self.check_connections()
+
+    def broadcast(self, message: str) -> None:
+        """Queue a message for every connection of this process."""
+        for subscriptions in self._rooms.values():
+            for subscription in subscriptions:
+                subscription.put(message)
+
+    async def _listen(self) -> None:
+        if self.client is None:
+            raise Exception("Redis client is not initialized.")
+
+        lost = False
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.psubscribe(self.pattern)
+                self.ready = True
+                if lost:
+                    self.broadcast(RESYNC_MESSAGE)
+                    lost = False
+
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.dispatch(message["channel"], message["data"])
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                logger.error(f"Room event subscription lost, retrying: {e}")
+                lost = True
+                await asyncio.sleep(1)
+
+            finally:
+                self.ready = False
+                await pubsub.aclose()  # type: ignore
+
+    async def start(
+        self,
+        client: Redis | None,
+        pattern: str = "room:*",
+        buffer_size: int = 64,
+        heartbeat_interval: float = 15.0,
+        slow_consumer_timeout: float = 5.0,
+    ) -> None:
+        """Start listening for room events.
+
+        Parameters
+        ----------
+        client: Redis | None
+            Redis client the events are published on. None to only fan out the events dispatched in this process,
+            as benchmarks do.
+        pattern: str
+            Pattern of the room channels, ending with `*` where the room id goes.
+        buffer_size: int
+            Maximum number of messages waiting to be sent to a connection.
+        heartbeat_interval: float
+            Seconds of silence after which a heartbeat is sent to a connection.
+        slow_consumer_timeout: float
+            Seconds a connection with a full buffer may go without taking messages before it is closed.
+        """
+        self.client = client
+        self.pattern = pattern
+        self._prefix = pattern.rstrip("*")
+        self.buffer_size = buffer_size
+        self.heartbeat_interval = heartbeat_interval
+        self.slow_consumer_timeout = slow_consumer_timeout
+        self._ticker = asyncio.create_task(self._tick())
+        if client is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening for room events and close every subscription."""
+        for task in (self._listener, self._ticker):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = self._ticker = None
+
+        for subscriptions in list(self._rooms.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
+
+        self.ready = False
+        self.client = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return the number of connections and rooms of this process, and the message counters."""
+        return {
+            "connections": sum(len(subscriptions) for subscriptions in self._rooms.values()),
+            "rooms": len(self._rooms),
+            **self._stats,
+            "dropped": self._stats["dropped"]
+            + sum(subscription.dropped for subscriptions in self._rooms.values() for subscription in subscriptions),
+        }
+
+
+room_event_hub = RoomEventHub()
@@ -0,0 +1,151 @@
+import json
+from typing import Any
+
+from redis.asyncio import Redis
+
+from ..exceptions.cache_exceptions import MissingClientError
+from . import cache
+from .lua import LuaScript
+
+# Every change of a room gets the next sequence number of the room, and is kept in a capped stream under the id
+# `{seq}-0` so displays can resume from the last one they applied, then published on the room channel. Doing the
+# three in one script publishes the changes of a room in sequence order, whichever worker made them.
+#
+# KEYS[1] is the sequence counter and KEYS[2] the stream, ARGV holds the event as a JSON object, the approximate
+# maximum length of the stream and the channel. The sequence number is spliced in as the first field of the event.
+# Returns the sequence number.
+APPEND_SCRIPT = """
+local seq = redis.call("INCR", KEYS[1])
+local message = '{"seq": ' .. seq .. ', ' .. string.sub(ARGV[1], 2)
+redis.call("XADD", KEYS[2], "MAXLEN", "~", ARGV[2], seq .. "-0", "event", message)
+redis.call("PUBLISH", ARGV[3], message)
+return seq
+"""
+
+_SEQ_PREFIX = '{"seq": '
+
+_script = LuaScript(APPEND_SCRIPT)
+
+
+def _get_client() -> Redis:
+    if cache.client is None:
+        raise MissingClientError
+
+    return cache.client
+
+
+def _get_script() -> LuaScript:
+    return _script.register(_get_client())
+
+
+def _seq_key(room_id: str) -> str:
+    return f"room_state:{room_id}:seq"
+
+
+def _stream_key(room_id: str) -> str:
+    return f"room_state:{room_id}:changes"
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def event_seq(message: str) -> int | None:
+    """Return the sequence number of an event message, None for the events outside the sequence."""
+    if not message.startswith(_SEQ_PREFIX):
+        return None
+
+    return int(message[len(_SEQ_PREFIX) : message.index(",")])
+
+
+def diff(before: dict[str, Any], after: dict[str, Any]) -> dict[str, Any]:
+    """Return the fields of `after` whose value differs from `before`."""
+    return {name: value for name, value in after.items() if before.get(name) != value}
+
+
+async def append(room_id: str, event: dict[str, Any], max_length: int = 1000) -> int:
+    """Give an event the next sequence number of its room, keep it in the stream of the room and publish it.
+
+    Parameters
+    ----------
+    room_id: str
+        The room the event changes.
+    event: dict[str, Any]
+        A JSON-serializable event with a `type`. It is published with its sequence number as `seq`.
+    max_length: int
+        Approximate number of events kept for displays to resume from.
+
+    Returns
+    -------
+    int
+        The sequence number of the event.
+    """
+    return int(
+        await _get_script()(
+            keys=[_seq_key(room_id), _stream_key(room_id)],
+            args=[json.dumps(event), max_length, f"room:{room_id}"],
+        )
+    )
+
+
+async def publish_changes(room_id: str, changes: list[dict[str, Any]], max_length: int = 1000) -> int | None:
+    """Publish changes of a room, or of its timers and displays, as one `room_patch` event.
+
+    Each change is `{"op": "update", "entity": ..., "id": ..., "fields": {...}}` with the changed fields only,
+    `{"op": "create", ..., "fields": {...}}` with all of them, or `{"op": "delete", ...}`. Applying a change twice
+    leaves the same state, so displays may apply changes already in their snapshot.
+
+    Returns
+    -------
+    int | None
+        The sequence number of the event, None if there was nothing to publish.
+    """
+    if not changes:
+        return None
+
+    return await append(room_id, {"type": "room_patch", "room_id": room_id, "changes": changes}, max_length)
+
+
+async def get_seq(room_id: str) -> int:
+    """Return the sequence number of the last change of a room, 0 if it has none."""
+    seq = await _get_client().get(_seq_key(room_id))
+    return int(seq) if seq else 0
+
+
+async def events_since(room_id: str, since: int, max_events: int = 1000) -> list[str] | None:
+    """Return the events of a room after a sequence number, in order, to resume a display from its last event.
+
+    Parameters
+    ----------
+    room_id: str
+        The room.
+    since: int
+        Sequence number of the last event the display applied, from an event or its snapshot.
+    max_events: int
+        Maximum number of events to replay. Displays further behind reload the snapshot instead.
+
+    Returns
+    -------
+    list[str] | None
+        The event messages, None if the display must reload the snapshot: it is too far behind, the events it
+        missed were trimmed from the stream, or it is ahead of a sequence Redis lost.
+    """
+    async with _get_client().pipeline(transaction=False) as pipe:
+        pipe.get(_seq_key(room_id))
+        pipe.xrange(_stream_key(room_id), min=f"{since + 1}-0", count=max_events)
+        seq, entries = await pipe.execute()
+
+    last_seq = int(seq) if seq else 0
+    if since > last_seq or last_seq - since > max_events:
+        return None
+
+    messages = [_decode(value) for _, fields in entries for value in fields.values()]
+    if since < last_seq and (not messages or event_seq(messages[0]) != since + 1):
+        return None
+
+    return messages
+
+
+async def forget(room_id: str) -> None:
+    """Drop the sequence and the stream of a room, once it is deleted."""
+    await _get_client().delete(_seq_key(room_id), _stream_key(room_id))
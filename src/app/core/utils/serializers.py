@@ -0,0 +1,89 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+
+try:
+    import msgpack
+
+    HAS_MSGPACK = True
+except ImportError:  # pragma: no cover
+    HAS_MSGPACK = False
+
+
+class CacheSerializer(ABC):
+    """Base class for the serializers used by the cache decorator.
+
+    A serializer turns the value returned by an endpoint into bytes, encoding it the same way as `jsonable_encoder`,
+    and turns bytes back into JSON compatible data. Its `content_type` is stored with every cache entry and sent as
+    the `Content-Type` of responses served from the cache.
+    """
+
+    content_type: str = "application/json"
+
+    @abstractmethod
+    def dumps(self, data: Any) -> bytes:
+        """Encode the value returned by an endpoint."""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """Decode a cached value into JSON compatible data."""
+
+
+class JsonSerializer(CacheSerializer):
+    """Serializer based on the standard library `json` module."""
+
+    def dumps(self, data: Any) -> bytes:
+        return json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(CacheSerializer):
+    """Serializer based on `orjson`, several times faster than `json` on large payloads.
+
+    orjson natively encodes datetimes, UUIDs and enums, `jsonable_encoder` is only called for the other types.
+    """
+
+    def __init__(self) -> None:
+        if not HAS_ORJSON:
+            raise ImportError("orjson is not installed, install it with `pip install orjson`.")
+
+    def dumps(self, data: Any) -> bytes:
+        return bytes(orjson.dumps(data, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS))
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackSerializer(CacheSerializer):
+    """Serializer based on `msgpack`, for clients that accept `application/msgpack` responses."""
+
+    content_type = "application/msgpack"
+
+    def __init__(self) -> None:
+        if not HAS_MSGPACK:
+            raise ImportError("msgpack is not installed, install it with `pip install msgpack`.")
+
+    def dumps(self, data: Any) -> bytes:
+        return bytes(msgpack.packb(jsonable_encoder(data)))
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data)
+
+
+def get_default_serializer() -> CacheSerializer:
+    """Return an `OrjsonSerializer` when orjson is installed, a `JsonSerializer` otherwise."""
+    if HAS_ORJSON:
+        return OrjsonSerializer()
+
+    return JsonSerializer()
@@ -0,0 +1,330 @@
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from enum import Enum
+from typing import Any
+
+from redis.asyncio import Redis
+
+from ..exceptions.cache_exceptions import MissingClientError
+from . import cache
+from .lua import LuaScript
+
+
+class TimerAction(str, Enum):
+    START = "start"
+    PAUSE = "pause"
+    RESUME = "resume"
+    STOP = "stop"
+    ADJUST = "adjust"
+
+
+class TimerStatus(str, Enum):
+    IDLE = "idle"
+    RUNNING = "running"
+    PAUSED = "paused"
+    STOPPED = "stopped"
+
+
+# The state of a timer is a hash of anchors, never a ticking counter: the elapsed time is
+# `(paused_at or now) - started_at - pause_ms`, computed whenever the timer is read.
+#
+# KEYS[1] is the hash, ARGV holds the action, the adjustment in milliseconds, the TTL in seconds and the fields
+# to seed the hash with when it is missing: type, duration_ms, status, started_at, paused_at, pause_ms, version.
+# The time is read from the Redis server so all the workers share the same clock. Returns
+# {applied, now_ms, {field, value, ...}}, applied being 0 when the action is not allowed in the current status.
+TRANSITION_SCRIPT = """
+local key = KEYS[1]
+local action = ARGV[1]
+if redis.call("EXISTS", key) == 0 then
+    redis.call("HSET", key, "type", ARGV[4], "duration_ms", ARGV[5], "status", ARGV[6], "started_at", ARGV[7],
+        "paused_at", ARGV[8], "pause_ms", ARGV[9], "version", ARGV[10])
+end
+local state = redis.call("HMGET", key, "type", "duration_ms", "status", "started_at", "paused_at", "pause_ms")
+local status = state[3]
+local started_at = tonumber(state[4])
+local paused_at = tonumber(state[5])
+local pause_ms = tonumber(state[6]) or 0
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local function finished()
+    local duration = tonumber(state[2])
+    return state[1] ~= "stopwatch" and duration ~= nil and status == "running"
+        and now - started_at - pause_ms >= duration
+end
+
+local applied = 1
+if action == "start" and (status == "idle" or status == "stopped" or finished()) then
+    redis.call("HSET", key, "status", "running", "started_at", now, "paused_at", "", "pause_ms", 0)
+elseif action == "pause" and status == "running" then
+    redis.call("HSET", key, "status", "paused", "paused_at", now)
+elseif action == "resume" and status == "paused" then
+    redis.call("HSET", key, "status", "running", "paused_at", "", "pause_ms", pause_ms + now - paused_at)
+elseif action == "stop" and (status == "running" or status == "paused") then
+    redis.call("HSET", key, "status", "stopped", "paused_at", paused_at or now)
+elseif action == "adjust" and status ~= "idle" then
+    local adjustment = tonumber(ARGV[2])
+    local duration = tonumber(state[2])
+    if state[1] == "countdown" and duration ~= nil then
+        redis.call("HSET", key, "duration_ms", math.max(0, duration + adjustment))
+    else
+        redis.call("HSET", key, "pause_ms", math.min(pause_ms - adjustment, (paused_at or now) - started_at))
+    end
+else
+    applied = 0
+end
+
+if applied == 1 then
+    redis.call("HINCRBY", key, "version", 1)
+end
+redis.call("EXPIRE", key, ARGV[3])
+return {applied, now, redis.call("HGETALL", key)}
+"""
+
+_script = LuaScript(TRANSITION_SCRIPT)
+
+
+def _to_ms(value: datetime | None) -> int | None:
+    return None if value is None else round(value.timestamp() * 1000)
+
+
+def _to_datetime(value: int | None) -> datetime | None:
+    return None if value is None else datetime.fromtimestamp(value / 1000, tz=UTC)
+
+
+@dataclass(frozen=True)
+class TimerState:
+    """The anchors a timer's displayed time is computed from, as of `server_time`.
+
+    Attributes
+    ----------
+    timer_id: int
+        The timer.
+    timer_type: str
+        `countdown`, `countup` or `stopwatch`.
+    duration_ms: int | None
+        Duration of countdowns and countups, ignored for stopwatches. Adjustments of countdowns change it.
+    status: TimerStatus
+        Where the timer is in its lifecycle.
+    started_at: int | None
+        Unix time in milliseconds the timer was started.
+    paused_at: int | None
+        Unix time in milliseconds the timer was paused or stopped, None while it runs.
+    pause_ms: int
+        Time spent paused since the start, in milliseconds, less the time added by adjustments of countups and
+        stopwatches.
+    version: int
+        Number of transitions applied, increasing with every one of them.
+    server_time: int
+        Unix time in milliseconds, from the Redis clock, the state was read or changed at.
+    """
+
+    timer_id: int
+    timer_type: str
+    duration_ms: int | None
+    status: TimerStatus
+    started_at: int | None
+    paused_at: int | None
+    pause_ms: int
+    version: int
+    server_time: int
+
+    @classmethod
+    def from_hash(cls, timer_id: int, fields: dict[str, str], server_time: int) -> "TimerState":
+        """Build the state from the fields of its Redis hash."""
+
+        def optional_int(name: str) -> int | None:
+            value = fields.get(name)
+            return int(value) if value else None
+
+        return cls(
+            timer_id=timer_id,
+            timer_type=fields["type"],
+            duration_ms=optional_int("duration_ms"),
+            status=TimerStatus(fields["status"]),
+            started_at=optional_int("started_at"),
+            paused_at=optional_int("paused_at"),
+            pause_ms=int(fields.get("pause_ms") or 0),
+            version=int(fields.get("version") or 0),
+            server_time=server_time,
+        )
+
+    @classmethod
+    def from_timer(cls, timer: dict[str, Any], server_time: int | None = None) -> "TimerState":
+        """Build the state from a timer row, as persisted on its last transition."""
+        if timer["is_active"]:
+            status = TimerStatus.PAUSED if timer["is_paused"] else TimerStatus.RUNNING
+        else:
+            status = TimerStatus.STOPPED if timer["is_stopped"] else TimerStatus.IDLE
+
+        duration = timer["duration_seconds"]
+        return cls(
+            timer_id=timer["id"],
+            timer_type=getattr(timer["timer_type"], "value", timer["timer_type"]),
+            duration_ms=None if duration is None else duration * 1000,
+            status=status,
+            started_at=_to_ms(timer["started_at"]),
+            paused_at=_to_ms(timer["paused_at"]),
+            pause_ms=round(timer["accumulated_pause_seconds"] * 1000),
+            version=timer["state_version"],
+            server_time=round(datetime.now(UTC).timestamp() * 1000) if server_time is None else server_time,
+        )
+
+    @property
+    def elapsed_ms(self) -> int:
+        """Time the timer has run for, in milliseconds, at `server_time`."""
+        if self.started_at is None:
+            return 0
+
+        return max(0, (self.paused_at or self.server_time) - self.started_at - self.pause_ms)
+
+    @property
+    def remaining_ms(self) -> int | None:
+        """Time left before the duration is reached, negative once it is exceeded, None for stopwatches."""
+        if self.duration_ms is None or self.timer_type == "stopwatch":
+            return None
+
+        return self.duration_ms - self.elapsed_ms
+
+    @property
+    def finished(self) -> bool:
+        """Whether the duration of a countdown or countup was reached."""
+        remaining = self.remaining_ms
+        return self.status is not TimerStatus.IDLE and remaining is not None and remaining <= 0
+
+    @property
+    def ends_at(self) -> int | None:
+        """Unix time in milliseconds a running countdown or countup reaches its duration, None otherwise."""
+        if self.status is not TimerStatus.RUNNING or self.started_at is None or self.remaining_ms is None:
+            return None
+
+        return self.started_at + self.pause_ms + (self.duration_ms or 0)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the anchors with the times derived from them, as sent to displays."""
+        return {
+            **asdict(self),
+            "status": self.status.value,
+            "elapsed_ms": self.elapsed_ms,
+            "remaining_ms": self.remaining_ms,
+            "finished": self.finished,
+            "ends_at": self.ends_at,
+        }
+
+    def to_columns(self) -> dict[str, Any]:
+        """Return the timer columns persisting this state."""
+        stopped = self.status is TimerStatus.STOPPED
+        return {
+            "is_active": self.status in (TimerStatus.RUNNING, TimerStatus.PAUSED),
+            "is_paused": self.status is TimerStatus.PAUSED,
+            "is_stopped": stopped,
+            "is_finished": self.finished,
+            "duration_seconds": None if self.duration_ms is None else self.duration_ms // 1000,
+            "current_time_seconds": self.elapsed_ms // 1000,
+            "started_at": _to_datetime(self.started_at),
+            "paused_at": _to_datetime(self.paused_at),
+            "completed_at": _to_datetime(self.paused_at) if stopped else None,
+            "accumulated_pause_seconds": self.pause_ms / 1000,
+            "state_version": self.version,
+        }
+
+
+class TimerTransitionError(Exception):
+    def __init__(self, message: str = "Transition not allowed.", state: TimerState | None = None) -> None:
+        self.message = message
+        self.state = state
+        super().__init__(self.message)
+
+
+def _get_client() -> Redis:
+    if cache.client is None:
+        raise MissingClientError
+
+    return cache.client
+
+
+def _get_script() -> LuaScript:
+    return _script.register(_get_client())
+
+
+def _state_key(timer_id: int) -> str:
+    return f"timer:{timer_id}:state"
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def transition(seed: TimerState, action: TimerAction, seconds: float = 0.0, ttl: int = 86400) -> TimerState:
+    """Apply an action to a timer atomically, on its state in Redis.
+
+    Concurrent actions on the same timer are serialized by Redis: each one sees the state left by the previous one,
+    so two operators pressing pause at once pause the timer once.
+
+    Parameters
+    ----------
+    seed: TimerState
+        The state persisted in the database, used only when Redis does not hold the state of the timer, after it
+        expired or was lost.
+    action: TimerAction
+        The transition to apply. `start` is allowed on idle, stopped and finished timers, `pause` on running ones,
+        `resume` on paused ones, `stop` on running and paused ones and `adjust` on any started timer.
+    seconds: int
+        For `adjust`, seconds added to the displayed time: to the duration of countdowns, to the elapsed time
+        otherwise. Negative to remove time.
+    ttl: int
+        Seconds the state is kept in Redis after the last transition.
+
+    Returns
+    -------
+    TimerState
+        The state after the transition.
+
+    Raises
+    ------
+    TimerTransitionError
+        If the action is not allowed in the current status of the timer, with that state.
+    """
+    applied, now, fields = await _get_script()(
+        keys=[_state_key(seed.timer_id)],
+        args=[
+            action.value,
+            seconds * 1000,
+            ttl,
+            seed.timer_type,
+            "" if seed.duration_ms is None else seed.duration_ms,
+            seed.status.value,
+            "" if seed.started_at is None else seed.started_at,
+            "" if seed.paused_at is None else seed.paused_at,
+            seed.pause_ms,
+            seed.version,
+        ],
+    )
+    values = [_decode(value) for value in fields]
+    state = TimerState.from_hash(seed.timer_id, dict(zip(values[::2], values[1::2])), server_time=int(now))
+    if not applied:
+        raise TimerTransitionError(f"Cannot {action.value} a timer that is {state.status.value}.", state=state)
+
+    return state
+
+
+async def get_state(timer_id: int) -> TimerState | None:
+    """Return the current state of a timer from Redis, None if Redis does not hold it."""
+    async with _get_client().pipeline(transaction=False) as pipe:
+        pipe.hgetall(_state_key(timer_id))
+        pipe.time()
+        fields, (seconds, microseconds) = await pipe.execute()
+
+    if not fields:
+        return None
+
+    return TimerState.from_hash(
+        timer_id,
+        {_decode(name): _decode(value) for name, value in fields.items()},
+        server_time=seconds * 1000 + microseconds // 1000,
+    )
+
+
+async def forget(timer_id: int) -> None:
+    """Drop the state of a timer from Redis, so it is reloaded from the database with its new configuration."""
+    await _get_client().delete(_state_key(timer_id))
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import math
+import time
+from datetime import datetime
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.token_blacklist import TokenBlacklist as TokenBlacklistRow
+from ..logger import logging
+
+logger = logging.getLogger(__name__)
+
+
+def hash_token(token: str) -> str:
+    """Return the SHA-256 hex digest a token is blacklisted and cached under."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of token hashes.
+
+    Parameters
+    ----------
+    capacity: int
+        Number of items the filter is sized for.
+    error_rate: float
+        False positive rate once `capacity` items were added.
+
+    Note
+    ----
+        Items must be SHA-256 hex digests: the bit positions are derived from the digest itself by double hashing,
+        so adding and testing an item costs no extra hashing.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001) -> None:
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, token_hash: str) -> list[int]:
+        first, second = int(token_hash[:16], 16), int(token_hash[16:32], 16) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, token_hash: str) -> None:
+        for position in self._positions(token_hash):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, token_hash: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(token_hash))
+
+
+class TokenBlacklist:
+    """Blacklist of revoked tokens stored in Redis, fronted by a per-process Bloom filter.
+
+    Revoked tokens are stored under `blacklist:{sha256(token)}` until they expire. Every process keeps a Bloom filter
+    of the blacklisted hashes, filled from Redis when it subscribes to `channel` and kept up to date by the hashes
+    published there, so checking a token that was never revoked, the common case, needs no network call. Tokens
+    present in the filter, revoked or false positives, are confirmed with Redis.
+
+    Note
+    ----
+        - Until the filter is filled, and whenever the subscription is lost, every check goes to Redis. Otherwise a
+        token revoked by another process is rejected once the pub/sub message is delivered, usually within a
+        millisecond.
+        - A Bloom filter cannot forget items: it is rebuilt from Redis every `rebuild_interval` seconds to drop expired
+        tokens.
+        - The Redis instance must not evict keys (`maxmemory-policy noeviction`), as an evicted key is a revoked token
+        accepted again.
+    """
+
+    def __init__(self) -> None:
+        self.client: Redis | None = None
+        self.channel = "blacklist:revoked"
+        self.capacity = 100_000
+        self.error_rate = 0.001
+        self.rebuild_interval = 3600.0
+        self.ready = False
+        self._bloom = BloomFilter(capacity=1, error_rate=0.5)
+        self._built_at = 0.0
+        self._listener: asyncio.Task | None = None
+
+    @staticmethod
+    def _key(token_hash: str) -> str:
+        return f"blacklist:{token_hash}"
+
+    async def add(self, token_hash: str, expires_at: int) -> None:
+        """Blacklist a token until it expires.
+
+        Parameters
+        ----------
+        token_hash: str
+            The SHA-256 hex digest of the token, see `hash_token`.
+        expires_at: int
+            Expiration of the token, as a Unix timestamp.
+        """
+        if self.client is None:
+            raise Exception("Redis client is not initialized.")
+
+        if expires_at <= time.time():
+            return
+
+        await self.client.set(self._key(token_hash), 1, exat=expires_at)
+        self._bloom.add(token_hash)
+        await self.client.publish(self.channel, token_hash)
+
+    async def restore(self, db: AsyncSession) -> int:
+        """Copy the unexpired rows of the `token_blacklist` table into Redis.
+
+        Used to migrate from the table-only blacklist, and to restore Redis from the table, which keeps a durable copy
+        of every revoked token.
+
+        Parameters
+        ----------
+        db: AsyncSession
+            The database session to read the table with.
+
+        Returns
+        -------
+        int
+            The number of tokens copied.
+        """
+        if self.client is None:
+            raise Exception("Redis client is not initialized.")
+
+        rows = await db.stream(
+            select(TokenBlacklistRow.token, TokenBlacklistRow.expires_at).where(
+                TokenBlacklistRow.expires_at > datetime.now()
+            )
+        )
+        copied = 0
+        async with self.client.pipeline(transaction=False) as pipe:
+            async for token, expires_at in rows:
+                token_hash = hash_token(token)
+                pipe.set(self._key(token_hash), 1, exat=int(expires_at.timestamp()))
+                pipe.publish(self.channel, token_hash)
+                copied += 1
+                if copied % 1000 == 0:
+                    await pipe.execute()
+            await pipe.execute()
+
+        return copied
+
+    async def contains(self, token_hash: str) -> bool:
+        """Return whether a token is blacklisted, without calling Redis when the Bloom filter rules it out."""
+        if self.ready and token_hash not in self._bloom:
+            return False
+
+        if self.client is None:
+            raise Exception("Redis client is not initialized.")
+
+        return bool(await self.client.exists(self._key(token_hash)))
+
+    async def _rebuild(self) -> None:
+        if self.client is None:
+            raise Exception("Redis client is not initialized.")
+
+        bloom = BloomFilter(capacity=self.capacity, error_rate=self.error_rate)
+        async for key in self.client.scan_iter(match=self._key("*"), count=1000):
+            bloom.add(key.decode().removeprefix("blacklist:"))
+
+        if bloom.count > self.capacity:
+            logger.warning(
+                f"{bloom.count} blacklisted tokens exceed the Bloom filter capacity of {self.capacity}, "
+                "raise TOKEN_BLACKLIST_BLOOM_CAPACITY to keep the false positive rate low."
+            )
+
+        self._bloom = bloom
+        self._built_at = time.monotonic()
+
+    async def _listen(self) -> None:
+        if self.client is None:
+            raise Exception("Redis client is not initialized.")
+
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                await self._rebuild()
+                self.ready = True
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._bloom.add(message["data"].decode())
+
+                    if time.monotonic() - self._built_at > self.rebuild_interval:
+                        await self._rebuild()
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                logger.error(f"Token blacklist subscription lost, checking every token with Redis: {e}")
+                self.ready = False
+                await asyncio.sleep(1)
+
+            finally:
+                self.ready = False
+                await pubsub.aclose()  # type: ignore
+
+    async def start(
+        self,
+        client: Redis,
+        channel: str = "blacklist:revoked",
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        rebuild_interval: float = 3600.0,
+    ) -> None:
+        """Start filling the Bloom filter from Redis and listening for tokens revoked by other processes.
+
+        Parameters
+        ----------
+        client: Redis
+            Redis client holding the blacklist.
+        channel: str
+            Redis pub/sub channel revoked token hashes are published on.
+        capacity: int
+            Number of blacklisted tokens the Bloom filter is sized for.
+        error_rate: float
+            False positive rate of the Bloom filter at capacity, the fraction of valid tokens checked with Redis.
+        rebuild_interval: float
+            Time, in seconds, between two rebuilds of the Bloom filter.
+        """
+        self.client = client
+        self.channel = channel
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening for revoked tokens and forget the client."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+        self.ready = False
+        self.client = None
+
+
+async def purge_expired_tokens(db: AsyncSession) -> int:
+    """Delete the expired rows of the `token_blacklist` table and return how many were deleted.
+
+    Expired tokens are rejected by their signature check, so their rows are no longer needed. Redis entries expire on
+    their own.
+    """
+    result = await db.execute(delete(TokenBlacklistRow).where(TokenBlacklistRow.expires_at <= datetime.now()))
+    await db.commit()
+    return int(result.rowcount)  # type: ignore[attr-defined]
+
+
+token_blacklist = TokenBlacklist()
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, cast
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...crud.crud_users import crud_users
+from ...schemas.user import UserContext
+from ..logger import logging
+from .serializers import get_default_serializer
+
+logger = logging.getLogger(__name__)
+
+
+class UserContextCache:
+    """Short-lived cache of the users authenticated by access tokens, in Redis and in process.
+
+    The context of a user, see `UserContext`, is stored under `user_context:{subject}` for `ttl` seconds, where the
+    subject is the `sub` claim of the token, the username or email of the user. Every process also keeps the contexts
+    it used in the last `local_ttl` seconds in memory, so a user sending several requests in a row is only looked up
+    once per process.
+
+    Invalidated subjects are deleted from Redis and published on `channel`, and every process drops them from memory.
+
+    Note
+    ----
+        - Contexts are only cached once `start` was called. Until the subscription to `channel` is established, and
+        whenever it is lost, the in-process layer is skipped so no process serves a context invalidated elsewhere.
+        - A request reading a user from the database while the user is being updated may cache the old context until
+        `ttl` expires. Keep `ttl` short.
+        - Password hashes are never cached.
+    """
+
+    def __init__(self) -> None:
+        self.client: Redis | None = None
+        self.channel = "user_context:invalidate"
+        self.ttl = 60
+        self.local_ttl = 5.0
+        self.max_entries = 10_000
+        self.ready = False
+        self._serializer = get_default_serializer()
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._listener: asyncio.Task | None = None
+
+    @staticmethod
+    def _key(subject: str) -> str:
+        return f"user_context:{subject}"
+
+    def _remember(self, subject: str, context: dict[str, Any]) -> None:
+        self._entries[subject] = (time.monotonic() + self.local_ttl, context)
+        self._entries.move_to_end(subject)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, subject: str) -> dict[str, Any] | None:
+        """Return the cached context of a user, or None if it is not cached.
+
+        Parameters
+        ----------
+        subject: str
+            The username or email of the user, as found in the `sub` claim of its tokens.
+
+        Returns
+        -------
+        dict[str, Any] | None
+            The context of the user, shared with the cache, which must not be modified.
+        """
+        if self.client is None:
+            return None
+
+        if self.ready:
+            entry = self._entries.get(subject)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(subject)
+                    return entry[1]
+
+                del self._entries[subject]
+
+        data = await self.client.get(self._key(subject))
+        if data is None:
+            return None
+
+        context = cast(dict[str, Any], self._serializer.loads(data))
+        if self.ready:
+            self._remember(subject, context)
+
+        return context
+
+    async def set(self, subject: str, context: dict[str, Any]) -> None:
+        """Cache the context of a user under the subject of its token.
+
+        Parameters
+        ----------
+        subject: str
+            The username or email of the user, as found in the `sub` claim of its tokens.
+        context: dict[str, Any]
+            The context of the user, see `UserContext`.
+        """
+        if self.client is None:
+            return
+
+        await self.client.set(self._key(subject), self._serializer.dumps(context), ex=self.ttl)
+        if self.ready:
+            self._remember(subject, context)
+
+    async def invalidate(self, *subjects: str | None) -> None:
+        """Drop the cached context of a user, in Redis and in every process.
+
+        Pass every subject the user may be cached under, usually its username and email, before and after an update.
+        `None` values are ignored.
+        """
+        subjects_to_drop = {subject for subject in subjects if subject}
+        for subject in subjects_to_drop:
+            self._entries.pop(subject, None)
+
+        if self.client is None or not subjects_to_drop:
+            return
+
+        await self.client.delete(*(self._key(subject) for subject in subjects_to_drop))
+        await self.client.publish(self.channel, json.dumps(sorted(subjects_to_drop)))
+
+    async def clear(self) -> None:
+        """Drop every cached context, in Redis and in every process."""
+        self._entries.clear()
+        if self.client is None:
+            return
+
+        keys = [key async for key in self.client.scan_iter(match=self._key("*"), count=1000)]
+        if keys:
+            await self.client.delete(*keys)
+
+        await self.client.publish(self.channel, "*")
+
+    def _apply_invalidation(self, message: bytes | str) -> None:
+        data = message.decode() if isinstance(message, bytes) else message
+        if data == "*":
+            self._entries.clear()
+            return
+
+        for subject in json.loads(data):
+            self._entries.pop(subject, None)
+
+    async def _listen(self) -> None:
+        if self.client is None:
+            raise Exception("Redis client is not initialized.")
+
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._entries.clear()
+                self.ready = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._apply_invalidation(message["data"])
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                logger.error(f"User context subscription lost, skipping the in-process cache: {e}")
+                self.ready = False
+                await asyncio.sleep(1)
+
+            finally:
+                self.ready = False
+                await pubsub.aclose()  # type: ignore
+
+    async def start(
+        self,
+        client: Redis,
+        channel: str = "user_context:invalidate",
+        ttl: int = 60,
+        local_ttl: float = 5.0,
+        max_entries: int = 10_000,
+    ) -> None:
+        """Start caching user contexts and listening for the invalidations of other processes.
+
+        Parameters
+        ----------
+        client: Redis
+            Redis client holding the cached contexts.
+        channel: str
+            Redis pub/sub channel invalidated subjects are published on.
+        ttl: int
+            Time, in seconds, a context is cached in Redis.
+        local_ttl: float
+            Time, in seconds, a context is kept in process memory.
+        max_entries: int
+            Maximum number of contexts kept in process memory.
+        """
+        self.client = client
+        self.channel = channel
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_entries = max_entries
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening for invalidations, forget the cached contexts and the client."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+        self.ready = False
+        self._entries.clear()
+        self.client = None
+
+
+user_context_cache = UserContextCache()
+
+
+async def get_user_context(db: AsyncSession, username_or_email: str) -> dict[str, Any] | None:
+    """Return the context of an active user, from the cache when possible.
+
+    Parameters
+    ----------
+    db: AsyncSession
+        The database session used on a cache miss.
+    username_or_email: str
+        The subject of the token, the username or email of the user.
+
+    Returns
+    -------
+    dict[str, Any] | None
+        The context of the user, see `UserContext`, or None if there is no active user with this username or email.
+    """
+    context = await user_context_cache.get(username_or_email)
+    if context is not None:
+        return context
+
+    if "@" in username_or_email:
+        user = await crud_users.get(db=db, email=username_or_email, is_deleted=False, schema_to_select=UserContext)
+    else:
+        user = await crud_users.get(db=db, username=username_or_email, is_deleted=False, schema_to_select=UserContext)
+
+    if user is None:
+        return None
+
+    context = cast(dict[str, Any], user)
+    await user_context_cache.set(username_or_email, context)
+    return context
@@ -1,9 +1,13 @@
 import asyncio
 import logging
+from typing import Any
 
 import uvloop
 from arq.worker import Worker
 
+from ..db.database import local_session
+from ..utils.token_blacklist import purge_expired_tokens
+
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -15,6 +19,13 @@ async def sample_background_task(ctx: Worker, name: str) -> str:
     return f"Task {name} is complete!"
 
 
+async def purge_expired_blacklisted_tokens(ctx: dict[str, Any]) -> int:
+    async with local_session() as db:
+        purged = await purge_expired_tokens(db)
+    logging.info(f"Purged {purged} expired blacklisted tokens")
+    return purged
+
+
 # -------- base functions --------
 async def startup(ctx: Worker) -> None:
     logging.info("Worker Started")
@@ -1,7 +1,58 @@
+from typing import Any
+
 from fastcrud import FastCRUD
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..models.display import Display
 from ..models.room import Room
+from ..models.timer import Timer
+from ..schemas.display import DisplayRead
 from ..schemas.room import RoomCreateInternal, RoomDelete, RoomRead, RoomUpdate, RoomUpdateInternal
+from ..schemas.timer import TimerRead
 
 CRUDRoom = FastCRUD[Room, RoomCreateInternal, RoomUpdate, RoomUpdateInternal, RoomDelete, RoomRead]
 crud_room = CRUDRoom(Room)
+
+
+async def get_room_snapshot(db: AsyncSession, room_id: int, created_by_user_id: int) -> dict[str, Any] | None:
+    """Load a room with its timers and the displays they are linked to, in two statements.
+
+    The room and its non-deleted timers, ordered by schedule, come from a single outer join. The displays are loaded
+    by id in a second statement, the way `selectinload` would, so their embedded images are read once per display
+    instead of once per timer.
+
+    Returns
+    -------
+    dict[str, Any] | None
+        The room, its timers and displays, shaped like `RoomSnapshot`, or None if the user has no such room.
+    """
+    result = await db.execute(
+        select(Room, Timer)
+        .outerjoin(Timer, and_(Timer.room_id == Room.id, Timer.is_deleted.is_(False)))
+        .where(Room.id == room_id, Room.created_by_user_id == created_by_user_id, Room.is_deleted.is_(False))
+        .order_by(
+            Timer.scheduled_start_date.asc().nulls_last(),
+            Timer.scheduled_start_time.asc().nulls_last(),
+            Timer.id,
+        )
+    )
+    rows = result.all()
+    if not rows:
+        return None
+
+    timers = [timer for _, timer in rows if timer is not None]
+    display_ids = {timer.display_id for timer in timers if timer.display_id is not None}
+    displays: list[Display] = []
+    if display_ids:
+        displays = list(
+            await db.scalars(
+                select(Display).where(Display.id.in_(display_ids), Display.is_deleted.is_(False)).order_by(Display.id)
+            )
+        )
+
+    return {
+        "room": RoomRead.model_validate(rows[0][0], from_attributes=True).model_dump(),
+        "timers": [TimerRead.model_validate(timer, from_attributes=True).model_dump() for timer in timers],
+        "displays": [DisplayRead.model_validate(display, from_attributes=True).model_dump() for display in displays],
+    }
@@ -1,56 +1,64 @@
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+SAFE_METHODS = frozenset({"GET", "HEAD"})
 
-class ClientCacheMiddleware(BaseHTTPMiddleware):
-    """Middleware to set the `Cache-Control` header for client-side caching on all responses.
+
+class ClientCacheMiddleware:
+    """Middleware to set a default `Cache-Control` header on responses that do not define their own.
+
+    Routes choose their caching policy by setting `Cache-Control` themselves, for instance with the `cache_control`
+    argument of the `cache` decorator. Responses without one get a default policy: responses to GET and HEAD requests
+    may only be cached by the client for `max_age` seconds, as they can hold user data, and responses to other
+    methods must not be stored.
 
     Parameters
     ----------
-    app: FastAPI
-        The FastAPI application instance.
+    app: ASGIApp
+        The ASGI application to wrap.
     max_age: int, optional
-        Duration (in seconds) for which the response should be cached. Defaults to 60 seconds.
+        Duration (in seconds) for which responses to GET and HEAD requests may be cached. Defaults to 60 seconds.
 
     Attributes
     ----------
     max_age: int
-        Duration (in seconds) for which the response should be cached.
-
-    Methods
-    -------
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        Process the request and set the `Cache-Control` header in the response.
+        Duration (in seconds) for which responses to GET and HEAD requests may be cached.
 
     Note
     ----
         - The `Cache-Control` header instructs clients (e.g., browsers)
         to cache the response for the specified duration.
+        - The default policy is `private`, so shared caches such as CDNs never store authenticated data.
+        - This is a pure ASGI middleware: it only edits the headers of the `http.response.start` message, so the
+        response body is streamed through untouched and no extra task is created per request.
     """
 
-    def __init__(self, app: FastAPI, max_age: int = 60) -> None:
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, max_age: int = 60) -> None:
+        self.app = app
         self.max_age = max_age
+        self._safe_policy = self.policy_for("GET").encode("latin-1")
+        self._unsafe_policy = self.policy_for("POST").encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self._safe_policy if scope["method"] in SAFE_METHODS else self._unsafe_policy
+
+        async def send_with_policy(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if not any(name.lower() == b"cache-control" for name, _ in headers):
+                    headers.append((b"cache-control", policy))
+                    message["headers"] = headers
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_policy)
+
+    def policy_for(self, method: str) -> str:
+        """Return the default `Cache-Control` policy for a request method."""
+        if method in SAFE_METHODS:
+            return f"private, max-age={self.max_age}"
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        """Process the request and set the `Cache-Control` header in the response.
-
-        Parameters
-        ----------
-        request: Request
-            The incoming request.
-        call_next: RequestResponseEndpoint
-            The next middleware or route handler in the processing chain.
-
-        Returns
-        -------
-        Response
-            The response object with the `Cache-Control` header set.
-
-        Note
-        ----
-            - This method is automatically called by Starlette for processing the request-response cycle.
-        """
-        response: Response = await call_next(request)
-        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
-        return response
+        return "no-store"
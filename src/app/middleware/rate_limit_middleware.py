@@ -0,0 +1,89 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.logger import logging
+from ..core.security import TokenType, decode_token_subject
+from ..core.utils.rate_limit import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitMiddleware:
+    """Middleware to rate limit every caller before routing, dependency resolution or database session checkout.
+
+    Callers presenting a valid access token are identified by its `sub` claim, verified from the token signature only,
+    and other callers by their IP address. Each caller gets a single quota of `limit` requests per `period` seconds
+    across all paths; requests over the limit are answered with a 429 response without reaching the application.
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The ASGI application to wrap.
+    limit: int
+        Number of requests a caller may send per period.
+    period: int
+        Length of the period in seconds.
+    exclude_paths: tuple[str, ...], optional
+        Path prefixes that are not rate limited, such as health checks.
+
+    Note
+    ----
+        - The `X-RateLimit-*` headers are added to every rate limited response, and `Retry-After` to 429 responses.
+        - If Redis is unavailable, requests are let through and the error is logged, so the rate limiter cannot take
+        the API down.
+        - Behind a reverse proxy, run uvicorn with `--proxy-headers` and `--forwarded-allow-ips` so the client
+        address is the one of the caller and not the one of the proxy.
+        - This is a per-caller flood guard. Tier and per-path limits are still enforced by `rate_limiter_dependency`
+        on the routes that use it; the two are counted separately.
+    """
+
+    def __init__(self, app: ASGIApp, limit: int, period: int, exclude_paths: tuple[str, ...] = ()) -> None:
+        self.app = app
+        self.limit = limit
+        self.period = period
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        caller = self.identify(scope)
+        try:
+            result = await rate_limiter.check(user_id=caller, path="middleware", limit=self.limit, period=self.period)
+
+        except Exception as e:
+            logger.error(f"Rate limit middleware could not check {caller}, letting the request through: {e}")
+            await self.app(scope, receive, send)
+            return
+
+        if result.limited:
+            response = JSONResponse({"detail": "Rate limit exceeded."}, status_code=429, headers=result.headers())
+            await response(scope, receive, send)
+            return
+
+        headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in result.headers().items()
+        ]
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def identify(self, scope: Scope) -> str:
+        """Return `user:{sub}` for a caller with a valid access token, `ip:{address}` otherwise."""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    subject = decode_token_subject(token, TokenType.ACCESS)
+                    if subject is not None:
+                        return f"user:{subject}"
+                break
+
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else "ip:unknown"
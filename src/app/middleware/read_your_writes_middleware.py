@@ -0,0 +1,47 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.db.replicas import LAST_WRITE_COOKIE
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReadYourWritesMiddleware:
+    """Middleware to record when a client last wrote, so its next reads do not go to a replica missing the write.
+
+    Successful responses to requests with a method that may write (POST, PUT, PATCH, DELETE...) set the
+    `db_last_write` cookie to the current time, for `window` seconds. `async_get_read_db` reads it and routes the
+    client to the primary while it is set.
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The ASGI application to wrap.
+    window: int
+        Lifetime of the cookie in seconds. It must be longer than the time a write takes to reach the replicas.
+
+    Note
+    ----
+        - The guarantee is per client: a user reading from two browsers only reads the writes of the other one once
+        the replica caught up.
+        - API clients that do not keep cookies can send the cookie they received back themselves.
+    """
+
+    def __init__(self, app: ASGIApp, window: int = 10) -> None:
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={self.window}; Path=/; HttpOnly; SameSite=lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -62,6 +62,9 @@ class Timer(Base):
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
     paused_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
+    # Anchors of the state kept in Redis, persisted on every transition (see core/utils/timer_engine.py)
+    accumulated_pause_seconds: Mapped[float] = mapped_column(default=0.0)
+    state_version: Mapped[int] = mapped_column(default=0)
     
     # Display Configuration
     show_title: Mapped[bool] = mapped_column(default=True)
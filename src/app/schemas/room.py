@@ -4,6 +4,8 @@ from typing import Annotated
 from pydantic import BaseModel, ConfigDict, Field
 
 from ..core.schemas import PersistentDeletion, TimestampSchema
+from .display import DisplayRead
+from .timer import TimerRead
 
 
 class RoomBase(BaseModel):
@@ -30,6 +32,13 @@ class RoomRead(BaseModel):
     is_deleted: bool
 
 
+class RoomSnapshot(BaseModel):
+    seq: int
+    room: RoomRead
+    timers: list[TimerRead]
+    displays: list[DisplayRead]
+
+
 class RoomCreate(RoomBase):
     model_config = ConfigDict(extra="forbid")
 
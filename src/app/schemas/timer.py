@@ -56,6 +56,8 @@ class Timer(TimestampSchema, TimerBase, PersistentDeletion):
     started_at: datetime | None
     paused_at: datetime | None
     completed_at: datetime | None
+    accumulated_pause_seconds: float
+    state_version: int
 
 
 class TimerRead(BaseModel):
@@ -79,6 +81,8 @@ class TimerRead(BaseModel):
     started_at: datetime | None
     paused_at: datetime | None
     completed_at: datetime | None
+    accumulated_pause_seconds: float
+    state_version: int
     show_title: bool
     show_speaker: bool
     show_notes: bool
@@ -126,6 +130,28 @@ class TimerUpdateInternal(TimerUpdate):
     updated_at: datetime
 
 
+class TimerTransition(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    seconds: Annotated[int, Field(default=0, examples=[60])]
+
+
+class TimerStateRead(BaseModel):
+    timer_id: int
+    timer_type: TimerType
+    duration_ms: int | None
+    status: str
+    started_at: int | None
+    paused_at: int | None
+    pause_ms: int
+    version: int
+    server_time: int
+    elapsed_ms: int
+    remaining_ms: int | None
+    finished: bool
+    ends_at: int | None
+
+
 class TimerDelete(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
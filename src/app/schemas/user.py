@@ -29,6 +29,10 @@ class UserRead(BaseModel):
     tier_id: int | None
 
 
+class UserContext(UserRead):
+    is_superuser: bool
+
+
 class UserCreate(UserBase):
     model_config = ConfigDict(extra="forbid")
 
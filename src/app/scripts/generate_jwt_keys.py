@@ -0,0 +1,61 @@
+"""Generate a key pair to sign access and refresh tokens with an asymmetric algorithm.
+
+Writes the private key to `{directory}/{kid}.key` and the public key to `{directory}/public/{kid}.pem`:
+
+    python -m app.scripts.generate_jwt_keys --algorithm ES256 --kid 2026-10 --directory keys
+
+Point `JWT_PRIVATE_KEY_FILE` and `JWT_KEY_ID` of the services issuing tokens at the private key, and
+`JWT_PUBLIC_KEYS_DIR` of every service verifying tokens at the public directory.
+"""
+
+import argparse
+import logging
+from collections.abc import Callable
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PrivateKey = ec.EllipticCurvePrivateKey | ed25519.Ed25519PrivateKey | rsa.RSAPrivateKey
+
+PRIVATE_KEY_FACTORIES: dict[str, Callable[[], PrivateKey]] = {
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "ES384": lambda: ec.generate_private_key(ec.SECP384R1()),
+    "EdDSA": ed25519.Ed25519PrivateKey.generate,
+    "RS256": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithm", choices=sorted(PRIVATE_KEY_FACTORIES), default="ES256")
+    parser.add_argument("--kid", required=True, help="Key id, written to the kid header of the tokens.")
+    parser.add_argument("--directory", type=Path, default=Path("keys"))
+    args = parser.parse_args()
+
+    private_key: PrivateKey = PRIVATE_KEY_FACTORIES[args.algorithm]()
+    public_dir = args.directory / "public"
+    public_dir.mkdir(parents=True, exist_ok=True)
+
+    private_file = args.directory / f"{args.kid}.key"
+    private_file.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    )
+    private_file.chmod(0o600)
+
+    public_file = public_dir / f"{args.kid}.pem"
+    public_file.write_bytes(
+        private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    logger.info(f"Wrote the {args.algorithm} private key to {private_file} and its public key to {public_file}")
+
+
+if __name__ == "__main__":
+    main()
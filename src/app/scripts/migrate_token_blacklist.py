@@ -0,0 +1,45 @@
+"""Copy the `token_blacklist` table into the Redis token blacklist and purge its expired rows.
+
+Run it once when upgrading from the table-only blacklist, before the new version serves requests, and whenever the
+blacklist Redis lost its data:
+
+    python -m app.scripts.migrate_token_blacklist
+"""
+
+import asyncio
+import logging
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.db.database import local_session
+from app.core.utils.token_blacklist import purge_expired_tokens, token_blacklist
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    """Purge the expired rows, then copy the remaining ones into Redis."""
+    client = redis.Redis.from_url(settings.REDIS_TOKEN_BLACKLIST_URL)
+    token_blacklist.client = client
+    token_blacklist.channel = settings.TOKEN_BLACKLIST_CHANNEL
+    try:
+        async with local_session() as session:
+            purged = await purge_expired_tokens(session)
+            logger.info(f"Purged {purged} expired blacklisted tokens")
+
+            copied = await token_blacklist.restore(session)
+            logger.info(f"Copied {copied} blacklisted tokens to Redis")
+
+    except Exception as e:
+        logger.error(f"Token blacklist migration failed: {e}")
+        raise
+
+    finally:
+        token_blacklist.client = None
+        await client.aclose()  # type: ignore
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""Add the timer state anchors
+
+Revision ID: 4d6ae7dc0bc6
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4d6ae7dc0bc6"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def _columns() -> list[sa.Column]:
+    return [
+        sa.Column("accumulated_pause_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("state_version", sa.Integer(), nullable=False, server_default="0"),
+    ]
+
+
+def _timer_columns() -> set[str] | None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("timers"):
+        return None
+    return {column["name"] for column in inspector.get_columns("timers")}
+
+
+def upgrade() -> None:
+    # Tables created on startup already hold these columns, so only the missing ones are added
+    existing = _timer_columns()
+    if existing is None:
+        return
+    for column in _columns():
+        if column.name not in existing:
+            op.add_column("timers", column)
+
+
+def downgrade() -> None:
+    existing = _timer_columns()
+    if existing is None:
+        return
+    for column in reversed(_columns()):
+        if column.name in existing:
+            op.drop_column("timers", column.name)
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, Mock
 
 import pytest
 from faker import Faker
+from fakeredis import FakeAsyncRedis, FakeServer
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -58,6 +59,12 @@ def mock_redis():
     return mock_redis
 
 
+@pytest.fixture
+def fake_redis() -> FakeAsyncRedis:
+    """In-memory Redis server running Lua scripts, for tests of what is actually stored in Redis."""
+    return FakeAsyncRedis(server=FakeServer())
+
+
 @pytest.fixture
 def sample_user_data():
     """Generate sample user data for tests."""
@@ -0,0 +1,642 @@
+"""Unit tests for the cache decorator and the local cache."""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+from fastapi import Response
+from httpx import ASGITransport, AsyncClient
+from redis.exceptions import NoScriptError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.app.api.dependencies import get_current_superuser
+from src.app.core.exceptions.cache_exceptions import CacheKeyTemplateError
+from src.app.core.exceptions.http_exceptions import NotFoundException
+from src.app.core.utils import cache as cache_module
+from src.app.core.utils.cache import CacheEntry, CacheKeyTemplate, cache
+from src.app.core.utils.local_cache import LocalCache
+from src.app.core.utils.lua import LuaScript
+from src.app.core.utils.serializers import JsonSerializer
+from src.app.main import app
+
+
+def make_request(method: str = "GET", headers: dict[str, str] | None = None) -> Mock:
+    request = Mock()
+    request.method = method
+    request.headers = headers or {}
+    return request
+
+
+def mock_pipeline(mock_redis: Mock, results: list | None = None) -> MagicMock:
+    pipe = MagicMock()
+    pipe.__aenter__.return_value = pipe
+    pipe.execute = AsyncMock(return_value=results if results is not None else [1])
+    mock_redis.pipeline = Mock(return_value=pipe)
+    return pipe
+
+
+def register_scripts(mock_redis: Mock) -> dict[str, AsyncMock]:
+    scripts: dict[str, AsyncMock] = {}
+    mock_redis.register_script = Mock(side_effect=lambda source: scripts.setdefault(source, AsyncMock()))
+    return scripts
+
+
+class TestLocalCache:
+    """Test the in-process L1 cache."""
+
+    def test_lru_eviction_by_entries(self):
+        """Test that the least recently used entry is evicted first."""
+        local = LocalCache(max_entries=2, ttl=60)
+        local.set("a", b"1", group="g")
+        local.set("b", b"2", group="g")
+        assert local.get("a", group="g") == b"1"
+
+        local.set("c", b"3", group="g")
+
+        assert local.get("b", group="g") is None
+        assert local.get("a", group="g") == b"1"
+        assert local.stats()["g"]["evictions"] == 1
+
+    def test_eviction_by_bytes(self):
+        """Test that the byte budget is enforced."""
+        local = LocalCache(max_entries=100, max_bytes=20, ttl=60)
+        local.set("a", b"x" * 10)
+        local.set("b", b"x" * 10)
+
+        assert len(local) == 1
+        assert local.current_bytes <= 20
+
+    def test_ttl_expiration(self):
+        """Test that expired entries are not served."""
+        local = LocalCache(ttl=60)
+        with patch("src.app.core.utils.local_cache.time.monotonic", side_effect=[0.0, 100.0]):
+            local.set("a", b"1", ttl=10)
+            assert local.get("a") is None
+
+    def test_delete_pattern(self):
+        """Test glob-style invalidation."""
+        local = LocalCache(ttl=60)
+        local.set("user_1_timers:page_1:1", b"1", group="timers")
+        local.set("user_1_timers:page_2:1", b"2", group="timers")
+        local.set("user_2_timers:page_1:2", b"3", group="timers")
+
+        local.delete_pattern("user_1_timers:*")
+
+        assert len(local) == 1
+        assert local.stats()["timers"]["invalidations"] == 2
+
+
+class TestLuaScript:
+    """Test the registration of Lua scripts."""
+
+    @pytest.mark.asyncio
+    async def test_registered_once_per_client(self):
+        """Test that a script is sent to each client once, under the digest Redis gives it."""
+        script = LuaScript("return 1")
+        first, second = Mock(), Mock()
+        first.register_script = Mock(return_value=AsyncMock(return_value=1))
+        second.register_script = Mock(return_value=AsyncMock(return_value=2))
+
+        assert await script.register(first)(keys=["a"]) == 1
+        assert await script.register(first)(keys=["a"]) == 1
+        assert await script.register(second)() == 2
+
+        first.register_script.assert_called_once_with("return 1")
+        assert script.sha == "e0e1f9fabfc9d4800c877a703b823ac0578ff8db"
+
+
+class TestCacheDecoratorLocalCache:
+    """Test the cache decorator with the local cache enabled."""
+
+    @pytest.mark.asyncio
+    async def test_hit_served_from_local_cache(self, mock_redis):
+        """Test that a second GET does not reach Redis."""
+        mock_redis.expire = AsyncMock()
+        mock_redis.register_script = Mock(return_value=AsyncMock())
+        endpoint = AsyncMock(return_value={"id": 1})
+        decorated = cache(key_prefix="item", resource_id_name="item_id")(endpoint)
+
+        with (
+            patch.object(cache_module, "client", mock_redis),
+            patch.object(cache_module, "local_cache", LocalCache(ttl=60)),
+        ):
+            first = await decorated(make_request(), item_id=1)
+            second = await decorated(make_request(), item_id=1)
+
+        assert first == second == {"id": 1}
+        endpoint.assert_awaited_once()
+        mock_redis.get.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_counters_served_by_the_stats_route(self):
+        """Test that the local cache counters of the worker are exposed to superusers."""
+        local = LocalCache(ttl=60)
+        local.set("item:1", b"1", group="item")
+        local.get("item:1", group="item")
+        local.get("item:2", group="item")
+
+        app.dependency_overrides[get_current_superuser] = lambda: {"id": 1, "is_superuser": True}
+        try:
+            with patch.object(cache_module, "local_cache", local):
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    response = await client.get("/api/v1/stats")
+        finally:
+            app.dependency_overrides.pop(get_current_superuser)
+
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["local_cache"]["item"]["hits"] == 1
+        assert stats["local_cache"]["item"]["misses"] == 1
+        assert "class" in stats["database_pool"]
+
+    @pytest.mark.asyncio
+    async def test_invalidation_is_published(self, mock_redis):
+        """Test that non-GET requests drop local entries and notify other processes."""
+        mock_redis.publish = AsyncMock()
+        mock_pipeline(mock_redis)
+        local = LocalCache(ttl=60)
+        local.set("item:1", b'{"id": 1}')
+        endpoint = AsyncMock(return_value={"message": "updated"})
+        decorated = cache(key_prefix="item", resource_id_name="item_id")(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis), patch.object(cache_module, "local_cache", local):
+            await decorated(make_request("PATCH"), item_id=1)
+
+        assert local.get("item:1") is None
+        channel, message = mock_redis.publish.await_args.args
+        assert channel == cache_module.invalidation_channel
+        assert json.loads(message)["keys"] == ["item:1"]
+
+    def test_remote_invalidation_applied(self):
+        """Test that invalidations from other processes are applied and our own are ignored."""
+        local = LocalCache(ttl=60)
+        local.set("item:1", b"1")
+        local.set("item:2", b"2")
+
+        with patch.object(cache_module, "local_cache", local):
+            own = json.dumps({"origin": cache_module._instance_id, "keys": ["item:1"], "patterns": []})
+            cache_module._apply_invalidation(own)
+            assert local.get("item:1") == b"1"
+
+            remote = json.dumps({"origin": "other", "keys": ["item:1"], "patterns": ["item:*"]})
+            cache_module._apply_invalidation(remote)
+
+        assert len(local) == 0
+
+
+class TestCacheDecoratorSingleFlight:
+    """Test that concurrent cache misses are coalesced."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_run_endpoint_once(self, mock_redis):
+        """Test that 500 concurrent misses for the same key result in a single DB query."""
+        mock_redis.expire = AsyncMock()
+        mock_redis.register_script = Mock(return_value=AsyncMock())
+        db_queries = 0
+
+        async def read_item(request, item_id: int) -> dict:
+            nonlocal db_queries
+            db_queries += 1
+            await asyncio.sleep(0.05)
+            return {"id": item_id}
+
+        decorated = cache(key_prefix="item", resource_id_name="item_id")(read_item)
+
+        with patch.object(cache_module, "client", mock_redis):
+            results = await asyncio.gather(*[decorated(make_request(), item_id=1) for _ in range(500)])
+
+        assert db_queries == 1
+        assert all(result == {"id": 1} for result in results)
+        assert cache_module._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_waits_for_other_process(self, mock_redis):
+        """Test that a miss waits for the value when another process holds the lock."""
+        mock_redis.set = AsyncMock(return_value=None)
+        mock_redis.get = AsyncMock(side_effect=[None, None, b'{"id": 1}'])
+        mock_redis.exists = AsyncMock(return_value=1)
+        endpoint = AsyncMock(return_value={"id": 1})
+        decorated = cache(key_prefix="item", resource_id_name="item_id")(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis):
+            result = await decorated(make_request(), item_id=1)
+
+        assert result == {"id": 1}
+        endpoint.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_exception_propagated_to_waiters(self, mock_redis):
+        """Test that every coalesced request sees the endpoint exception."""
+        mock_redis.register_script = Mock(return_value=AsyncMock())
+
+        async def read_item(request, item_id: int) -> dict:
+            await asyncio.sleep(0.01)
+            raise NotFoundException("Item not found")
+
+        decorated = cache(key_prefix="item", resource_id_name="item_id")(read_item)
+
+        with patch.object(cache_module, "client", mock_redis):
+            results = await asyncio.gather(
+                *[decorated(make_request(), item_id=1) for _ in range(10)], return_exceptions=True
+            )
+
+        assert all(isinstance(result, NotFoundException) for result in results)
+
+
+class TestCacheDecoratorStaleWhileRevalidate:
+    """Test stale-while-revalidate and early recomputation."""
+
+    @pytest.mark.asyncio
+    async def test_value_and_ttl_set_atomically(self, mock_redis):
+        """Test that entries are stored with their TTL in a single script call."""
+        scripts = register_scripts(mock_redis)
+        endpoint = AsyncMock(return_value={"id": 1})
+        decorated = cache(key_prefix="item", resource_id_name="item_id", expiration=60, stale_ttl=30)(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis):
+            await decorated(make_request(), item_id=1)
+
+        store = scripts[cache_module.STORE_ENTRY_SCRIPT]
+        store.assert_awaited_once()
+        assert store.await_args.kwargs["keys"][0] == "item:1"
+        value, ttl, _ = store.await_args.kwargs["args"]
+        assert ttl == 90
+        assert CacheEntry.decode(value).body == b'{"id":1}'
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_and_refreshed(self, mock_redis, mock_db):
+        """Test that a stale entry is served immediately and refreshed with a new session in the background."""
+        stale_entry = CacheEntry(b'{"id": 1, "version": 1}', expires_at=time.time() - 1)
+        mock_redis.get = AsyncMock(return_value=stale_entry.encode())
+        mock_redis.register_script = Mock(return_value=AsyncMock())
+        endpoint = AsyncMock(return_value={"id": 1, "version": 2})
+        decorated = cache(key_prefix="item", resource_id_name="item_id", stale_ttl=30)(endpoint)
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__.return_value = mock_db
+
+        with (
+            patch.object(cache_module, "client", mock_redis),
+            patch.object(cache_module, "local_session", session_factory),
+        ):
+            result = await decorated(make_request(), item_id=1, db=Mock(spec=AsyncSession))
+            await asyncio.gather(*cache_module._background_tasks)
+
+        assert result == {"id": 1, "version": 1}
+        endpoint.assert_awaited_once()
+        assert endpoint.await_args.kwargs["db"] is mock_db
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_not_refreshed(self, mock_redis):
+        """Test that a fresh entry is served without recomputation."""
+        fresh_entry = CacheEntry(b'{"id": 1}', expires_at=time.time() + 60)
+        mock_redis.get = AsyncMock(return_value=fresh_entry.encode())
+        endpoint = AsyncMock()
+        decorated = cache(key_prefix="item", resource_id_name="item_id")(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis):
+            result = await decorated(make_request(), item_id=1)
+
+        assert result == {"id": 1}
+        assert cache_module._background_tasks == set()
+        endpoint.assert_not_awaited()
+
+    def test_legacy_entry_never_stale(self):
+        """Test that values written without metadata are decoded as fresh entries."""
+        entry = CacheEntry.decode(b'{"id": 1}')
+
+        assert entry.body == b'{"id": 1}'
+        assert not entry.is_stale(time.time())
+
+    def test_early_refresh_probability(self):
+        """Test that early recomputation becomes more likely as expiration approaches."""
+        entry = CacheEntry(b"{}", expires_at=100.0, delta=1.0)
+
+        far = sum(entry.should_refresh_early(now=90.0) for _ in range(1000))
+        close = sum(entry.should_refresh_early(now=99.5) for _ in range(1000))
+
+        assert far < close
+        assert entry.should_refresh_early(now=100.0)
+
+
+class TestCacheDecoratorRawResponse:
+    """Test serving cached payloads as raw bytes."""
+
+    @pytest.mark.asyncio
+    async def test_hit_returns_stored_bytes(self, mock_redis):
+        """Test that a hit returns the stored payload without parsing it."""
+        entry = CacheEntry(b'{"id":1}', expires_at=time.time() + 60)
+        mock_redis.get = AsyncMock(return_value=entry.encode())
+        decorated = cache(key_prefix="item", resource_id_name="item_id", raw_response=True)(AsyncMock())
+
+        with patch.object(cache_module, "client", mock_redis):
+            response = await decorated(make_request(), item_id=1)
+
+        assert isinstance(response, Response)
+        assert response.body == b'{"id":1}'
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["etag"] == entry.etag
+
+    @pytest.mark.asyncio
+    async def test_miss_returns_response(self, mock_redis):
+        """Test that a miss returns the same bytes that are stored."""
+        scripts = register_scripts(mock_redis)
+        endpoint = AsyncMock(return_value={"id": 1})
+        decorated = cache(key_prefix="item", resource_id_name="item_id", raw_response=True)(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis):
+            response = await decorated(make_request(), item_id=1)
+
+        stored = CacheEntry.decode(scripts[cache_module.STORE_ENTRY_SCRIPT].await_args.kwargs["args"][0])
+        assert response.body == stored.body
+        assert response.headers["etag"] == stored.etag
+
+    @pytest.mark.asyncio
+    async def test_serializer_mismatch_is_a_miss(self, mock_redis):
+        """Test that entries stored with another content type are recomputed."""
+        entry = CacheEntry(b"\x81\xa2id\x01", content_type="application/msgpack")
+        mock_redis.get = AsyncMock(return_value=entry.encode())
+        mock_redis.register_script = Mock(return_value=AsyncMock())
+        endpoint = AsyncMock(return_value={"id": 1})
+        decorated = cache(key_prefix="item", resource_id_name="item_id", serializer=JsonSerializer())(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis):
+            result = await decorated(make_request(), item_id=1)
+
+        assert result == {"id": 1}
+        endpoint.assert_awaited_once()
+
+
+class TestCacheDecoratorTags:
+    """Test the tag index used for invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_entry_registered_in_tags(self, mock_redis):
+        """Test that entries are registered under their formatted tags, and their namespace once a pattern uses it."""
+        scripts = register_scripts(mock_redis)
+        endpoint = AsyncMock(return_value={"id": 1})
+
+        with patch.object(cache_module, "client", mock_redis), patch.object(cache_module, "_pattern_namespaces", []):
+            decorated = cache(
+                key_prefix="user_{user_id}_items:page_{page}", resource_id_name="user_id", tags=["user:{user_id}:items"]
+            )(endpoint)
+            await decorated(make_request(), user_id=42, page=1)
+            assert scripts[cache_module.STORE_ENTRY_SCRIPT].await_args.kwargs["keys"] == [
+                "user_42_items:page_1:42",
+                "tag:user:42:items",
+            ]
+
+            cache(key_prefix="item", resource_id_name="item_id", pattern_to_invalidate_extra=["user_{user_id}_items:"])(
+                AsyncMock()
+            )
+            await decorated(make_request(), user_id=42, page=2)
+            assert scripts[cache_module.STORE_ENTRY_SCRIPT].await_args.kwargs["keys"] == [
+                "user_42_items:page_2:42",
+                "tag:user_42_items",
+                "tag:user:42:items",
+            ]
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_pruned_from_tags(self, fake_redis):
+        """Test that writes drop the members of a tag whose entry expired, so the tag does not keep growing."""
+        await fake_redis.set("items:1", b"1", ex=60)
+        await fake_redis.sadd("tag:items", "items:1", *(f"items:{i}" for i in range(100, 110)))
+
+        with patch.object(cache_module, "client", fake_redis):
+            await cache_module._store_entry("items:2", b"2", 60, ["items"])
+
+        assert await fake_redis.smembers("tag:items") == {b"items:1", b"items:2"}
+        assert 0 < await fake_redis.ttl("tag:items") <= 60
+
+    @pytest.mark.asyncio
+    async def test_tags_invalidated_without_keys(self, fake_redis):
+        """Test that invalidating only tags deletes their entries and sends no empty key deletion."""
+        with patch.object(cache_module, "client", fake_redis):
+            await cache_module._store_entry("room:3", b"{}", 60, ["room:3"])
+            await cache_module.invalidate_tags("room:3", "room:4")
+
+        assert not await fake_redis.exists("room:3", "tag:room:3")
+
+    def test_namespace_pattern(self):
+        """Test that patterns resolved through a namespace tag match the namespaces of the keys they invalidate."""
+        namespace = CacheKeyTemplate("user_{current_user[id]}_timers:*").namespace_pattern()
+        assert namespace is not None
+        assert namespace.fullmatch("user_42_timers")
+        assert not namespace.fullmatch("user_42_rooms")
+        assert CacheKeyTemplate("user_*_items:*").namespace_pattern() is None
+        assert CacheKeyTemplate("{username}_posts*").namespace_pattern() is None
+
+    @pytest.mark.asyncio
+    async def test_patterns_and_tags_invalidated_in_one_call(self, mock_redis):
+        """Test that patterns go through the tag index and are invalidated with the tags in one script call."""
+        register_scripts(mock_redis)
+        pipe = mock_pipeline(mock_redis, results=[1, [b"user_42_items:page_1:42"]])
+        mock_redis.scan_iter = Mock()
+        endpoint = AsyncMock(return_value={"message": "updated"})
+        decorated = cache(
+            key_prefix="item",
+            resource_id_name="item_id",
+            pattern_to_invalidate_extra=["user_{user_id}_items:", "user_{user_id}_items:page_"],
+            tags_to_invalidate=["user:{user_id}:items"],
+        )(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis):
+            await decorated(make_request("PATCH"), item_id=1, user_id=42)
+
+        sha = cache_module._scripts[cache_module.INVALIDATE_TAGS_SCRIPT].sha
+        pipe.evalsha.assert_called_once_with(sha, 2, "tag:user:42:items", "tag:user_42_items", "", "user_42_items:")
+        mock_redis.scan_iter.assert_not_called()
+
+    def test_pattern_to_tag(self):
+        """Test that patterns are mapped to the tag of their namespace and their literal prefix."""
+        assert cache_module._pattern_to_tag("user_42_items:*") == ("tag:user_42_items", "user_42_items:")
+        assert cache_module._pattern_to_tag("user_42_items:page_?:*") == ("tag:user_42_items", "user_42_items:page_")
+        assert cache_module._pattern_to_tag("user_*_items:*") is None
+        assert cache_module._pattern_to_tag("user_42_items*") is None
+
+
+class TestCacheDecoratorBatchedInvalidation:
+    """Test that invalidations are batched in a single pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_keys_unlinked_in_one_pipeline(self, mock_redis):
+        """Test that the main key and the extra keys are unlinked with a single command and round-trip."""
+        register_scripts(mock_redis)
+        pipe = mock_pipeline(mock_redis)
+        decorated = cache(
+            key_prefix="item",
+            resource_id_name="item_id",
+            to_invalidate_extra={"user_{user_id}_items": "{user_id}", "items": "{user_id}"},
+        )(AsyncMock())
+
+        with patch.object(cache_module, "client", mock_redis):
+            await decorated(make_request("DELETE"), item_id=1, user_id=42)
+
+        pipe.unlink.assert_called_once_with("item:1", "user_42_items:42", "items:42")
+        pipe.execute.assert_awaited_once()
+        pipe.evalsha.assert_not_called()
+        mock_redis.delete.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_leading_wildcard_pattern_falls_back_to_scan(self, mock_redis):
+        """Test that patterns that can match any namespace are scanned and unlinked with the other keys."""
+
+        async def scan_iter(match: str, count: int):
+            yield b"user_1_items:page_1:1"
+
+        register_scripts(mock_redis)
+        pipe = mock_pipeline(mock_redis)
+        mock_redis.scan_iter = Mock(side_effect=scan_iter)
+        decorated = cache(key_prefix="item", resource_id_name="item_id", pattern_to_invalidate_extra=["user_*_items:"])(
+            AsyncMock()
+        )
+
+        with patch.object(cache_module, "client", mock_redis):
+            await decorated(make_request("PATCH"), item_id=1)
+
+        mock_redis.scan_iter.assert_called_once_with(match="user_*_items:*", count=100)
+        pipe.unlink.assert_called_once_with("item:1", b"user_1_items:page_1:1")
+
+    @pytest.mark.asyncio
+    async def test_script_loaded_when_missing(self, mock_redis):
+        """Test that the invalidation script is sent again if Redis does not know it."""
+        scripts = register_scripts(mock_redis)
+        mock_pipeline(mock_redis, results=[1, NoScriptError("No matching script")])
+        decorated = cache(key_prefix="item", resource_id_name="item_id", tags_to_invalidate=["items"])(AsyncMock())
+
+        with patch.object(cache_module, "client", mock_redis):
+            await decorated(make_request("PATCH"), item_id=1)
+
+        scripts[cache_module.INVALIDATE_TAGS_SCRIPT].assert_awaited_once_with(keys=["tag:items"], args=[""])
+
+    @pytest.mark.asyncio
+    async def test_deferred_invalidation(self, mock_redis):
+        """Test that a deferred invalidation runs after the endpoint returns."""
+        register_scripts(mock_redis)
+        pipe = mock_pipeline(mock_redis)
+        decorated = cache(key_prefix="item", resource_id_name="item_id", defer_invalidation=True)(
+            AsyncMock(return_value={"message": "updated"})
+        )
+
+        with patch.object(cache_module, "client", mock_redis):
+            result = await decorated(make_request("PATCH"), item_id=1)
+            pipe.execute.assert_not_awaited()
+            await asyncio.gather(*cache_module._background_tasks)
+
+        assert result == {"message": "updated"}
+        pipe.unlink.assert_called_once_with("item:1")
+        pipe.execute.assert_awaited_once()
+
+
+class TestCacheKeyTemplate:
+    """Test cache key templates compiled at decoration time."""
+
+    def test_format_with_item_access(self):
+        """Test that fields can read items of an argument."""
+        template = CacheKeyTemplate("user_{current_user[id]}_timers:page_{page}")
+
+        assert template.arguments == {"current_user", "page"}
+        assert template.format({"current_user": {"id": 42}, "page": 1, "db": None}) == "user_42_timers:page_1"
+
+    def test_unknown_argument_fails_at_decoration(self):
+        """Test that a template naming a missing argument is rejected when the endpoint is decorated."""
+
+        async def read_items(request, current_user: dict, page: int = 1) -> dict:
+            return {}
+
+        with pytest.raises(CacheKeyTemplateError, match="current_user_id"):
+            cache(key_prefix="user_{current_user_id}_items:page_{page}", resource_id_name="page")(read_items)
+
+        with pytest.raises(CacheKeyTemplateError, match="user_id"):
+            cache(key_prefix="items", resource_id_name="page", pattern_to_invalidate_extra=["user_{user_id}:"])(
+                read_items
+            )
+
+    def test_malformed_template(self):
+        """Test that malformed templates are rejected."""
+        with pytest.raises(CacheKeyTemplateError):
+            CacheKeyTemplate("user_{id")
+
+    @pytest.mark.asyncio
+    async def test_keys_built_from_compiled_templates(self, mock_redis):
+        """Test the keys built for a write endpoint using item access in every template."""
+        register_scripts(mock_redis)
+        pipe = mock_pipeline(mock_redis)
+
+        async def delete_item(request, item_id: int, current_user: dict) -> dict:
+            return {"message": "deleted"}
+
+        decorated = cache(
+            "user_{current_user[id]}_item_{item_id}",
+            resource_id_name="item_id",
+            to_invalidate_extra={"user_{current_user[id]}_items": "{current_user[id]}", "latest_items": "all"},
+        )(delete_item)
+
+        with patch.object(cache_module, "client", mock_redis):
+            await decorated(make_request("DELETE"), item_id=7, current_user={"id": 42})
+
+        pipe.unlink.assert_called_once_with("user_42_item_7:7", "user_42_items:42", "latest_items:all")
+
+
+class TestCacheDecoratorConditionalGet:
+    """Test answering If-None-Match with 304 Not Modified."""
+
+    @pytest.mark.asyncio
+    async def test_matching_etag_returns_304_without_payload(self, mock_redis):
+        """Test that a matching ETag is answered from the entry header, without running the endpoint."""
+        entry = CacheEntry(b'{"id":1}', expires_at=time.time() + 60)
+        header_only = entry.encode()[: entry.encode().index(b"\n") + 1]
+        scripts = register_scripts(mock_redis)
+        scripts[cache_module.NOT_MODIFIED_SCRIPT] = AsyncMock(return_value=[1, header_only])
+        endpoint = AsyncMock()
+        decorated = cache(
+            key_prefix="item", resource_id_name="item_id", raw_response=True, cache_control="private, no-cache"
+        )(endpoint)
+
+        with patch.object(cache_module, "client", mock_redis):
+            response = await decorated(make_request(headers={"if-none-match": f"W/{entry.etag}"}), item_id=1)
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == entry.etag
+        assert response.headers["cache-control"] == "private, no-cache"
+        assert scripts[cache_module.NOT_MODIFIED_SCRIPT].await_args.kwargs == {"keys": ["item:1"], "args": [entry.etag]}
+        mock_redis.get.assert_not_awaited()
+        endpoint.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_different_etag_returns_payload(self, mock_redis):
+        """Test that a client holding another version gets the full payload."""
+        entry = CacheEntry(b'{"id":1}', expires_at=time.time() + 60)
+        scripts = register_scripts(mock_redis)
+        scripts[cache_module.NOT_MODIFIED_SCRIPT] = AsyncMock(return_value=[0, entry.encode()])
+        decorated = cache(key_prefix="item", resource_id_name="item_id", raw_response=True)(AsyncMock())
+
+        with patch.object(cache_module, "client", mock_redis):
+            response = await decorated(make_request(headers={"if-none-match": '"outdated"'}), item_id=1)
+
+        assert response.status_code == 200
+        assert response.body == b'{"id":1}'
+        assert response.headers["etag"] == entry.etag
+
+    @pytest.mark.asyncio
+    async def test_local_cache_hit_returns_304(self, mock_redis):
+        """Test that entries held in the local cache are matched without reaching Redis."""
+        entry = CacheEntry(b'{"id":1}', expires_at=time.time() + 60)
+        local = LocalCache(ttl=60)
+        local.set("item:1", entry.encode())
+        register_scripts(mock_redis)
+        decorated = cache(key_prefix="item", resource_id_name="item_id", raw_response=True)(AsyncMock())
+
+        with patch.object(cache_module, "client", mock_redis), patch.object(cache_module, "local_cache", local):
+            response = await decorated(make_request(headers={"if-none-match": entry.etag}), item_id=1)
+
+        assert response.status_code == 304
+        mock_redis.register_script.assert_not_called()
+
+    def test_parse_if_none_match(self):
+        """Test parsing lists of strong and weak entity tags."""
+        assert cache_module._parse_if_none_match('"a", W/"b"') == ['"a"', '"b"']
+        assert cache_module._parse_if_none_match("*") == ["*"]
+        assert cache_module._parse_if_none_match(None) == []
@@ -0,0 +1,63 @@
+"""Unit tests for the client cache middleware."""
+
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.app.middleware.client_cache_middleware import ClientCacheMiddleware
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ClientCacheMiddleware, max_age=30)
+
+    @app.get("/items")
+    async def read_items() -> dict:
+        return {"items": []}
+
+    @app.get("/timer")
+    async def read_timer() -> Response:
+        return Response(content=b"{}", media_type="application/json", headers={"Cache-Control": "private, no-cache"})
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def chunks():
+            for chunk in (b"a", b"b", b"c"):
+                yield chunk
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.post("/items")
+    async def write_item() -> dict:
+        return {"message": "created"}
+
+    return app
+
+
+class TestClientCacheMiddleware:
+    """Test the default Cache-Control policies."""
+
+    def test_safe_methods_are_private(self):
+        """Test that GET responses are only cacheable by the client."""
+        response = TestClient(make_app()).get("/items")
+
+        assert response.headers["cache-control"] == "private, max-age=30"
+
+    def test_mutations_are_not_stored(self):
+        """Test that responses to mutations must not be stored."""
+        response = TestClient(make_app()).post("/items")
+
+        assert response.headers["cache-control"] == "no-store"
+
+    def test_route_policy_is_kept(self):
+        """Test that a route setting its own Cache-Control is not overridden."""
+        response = TestClient(make_app()).get("/timer")
+
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_streaming_response(self):
+        """Test that streamed bodies go through untouched."""
+        response = TestClient(make_app()).get("/stream")
+
+        assert response.content == b"abc"
+        assert response.headers["cache-control"] == "private, max-age=30"
@@ -0,0 +1,96 @@
+"""Unit tests for the clock synchronization of displays."""
+
+import json
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.app.api.v1 import clock, room_events
+from src.app.core.utils.clock_sync import ClockSync, clock_sync
+
+
+def redis_time(offset_ms: float) -> tuple[int, int]:
+    return divmod(round((time.time() * 1000 + offset_ms) * 1000), 1_000_000)
+
+
+class TestClockSync:
+    """Test the server time and the client statistics."""
+
+    @pytest.mark.asyncio
+    async def test_aligns_on_the_redis_clock(self):
+        """Test that the server time follows the Redis clock, measured once and then read locally."""
+        sync = ClockSync()
+        sync.client = Mock()
+        sync.client.time = AsyncMock(side_effect=lambda: redis_time(5000))
+
+        await sync.calibrate(samples=3)
+
+        assert sync.client.time.await_count == 3
+        assert abs(sync.now_ms() - time.time() * 1000 - 5000) < 50
+        assert sync.stats()["calibration_rtt_ms"] is not None
+
+    def test_reply_echoes_the_client_time(self):
+        """Test that the answer carries the client time and the server receive and transmit times in order."""
+        sync = ClockSync()
+        received_at = sync.now_ms()
+
+        reply = sync.reply(1234.5, received_at)
+
+        assert reply["type"] == "time_sync"
+        assert reply["t0"] == 1234.5
+        assert reply["t1"] <= reply["t2"]
+
+    def test_keeps_the_most_recent_clients(self):
+        """Test that client estimates are bounded, forgetting the least recently seen client first."""
+        sync = ClockSync()
+        sync.max_clients = 2
+        sync.record("a", offset_ms=-12.0, rtt_ms=30.0)
+        sync.record("b", offset_ms=4.0, rtt_ms=10.0)
+        sync.record("a", offset_ms=-11.0, rtt_ms=20.0)
+        sync.record("c", offset_ms=2.0, rtt_ms=8.0)
+
+        assert sync.client_stats("b") is None
+        assert sync.client_stats("a")["samples"] == 2
+        assert sync.client_stats("a")["min_rtt_ms"] == 20.0
+        stats = sync.stats()
+        assert stats["clients"] == 2
+        assert stats["offset_ms"]["p100"] == 11.0
+
+
+class TestClockSyncEndpoints:
+    """Test the HTTP and WebSocket synchronization requests."""
+
+    def test_http_request_needs_no_authentication(self):
+        """Test that the time endpoint answers anonymous requests and records the reported estimate."""
+        app = FastAPI()
+        app.include_router(clock.router)
+
+        with patch.object(clock_sync, "_clients", {}) as clients:
+            response = TestClient(app).get("/time", params={"t0": 100, "client_id": "d1", "offset": 3, "rtt": 40})
+
+            assert response.status_code == 200
+            assert response.headers["cache-control"] == "no-store"
+            assert response.json()["t0"] == 100
+            assert clients["d1"].offset_ms == 3
+
+    def test_websocket_request_is_answered_directly(self):
+        """Test that a time_sync message gets an answer without going through the room events."""
+        app = FastAPI()
+        app.include_router(room_events.router)
+
+        with (
+            patch.object(room_events, "playback_status_message", AsyncMock(return_value=None)),
+            patch.object(clock_sync, "record") as record,
+            TestClient(app) as client,
+            client.websocket_connect("/room/1/ws") as websocket,
+        ):
+            websocket.send_text("not json")
+            websocket.send_text(json.dumps({"type": "time_sync", "t0": 42, "offset": 1.5, "rtt": 20}))
+            reply = websocket.receive_json()
+
+        assert reply["type"] == "time_sync"
+        assert reply["t0"] == 42
+        record.assert_called_once_with("1/testclient:50000", 1.5, 20.0)
@@ -0,0 +1,80 @@
+"""Unit tests for the instrumented connection pool."""
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.app.core.db.pool import InstrumentedAsyncQueuePool, asyncpg_connect_args, pool_stats
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+
+
+class TestInstrumentedPool:
+    """Test connection checkouts and their metrics."""
+
+    @pytest.mark.asyncio
+    async def test_unused_sessions_do_not_check_out_connections(self, engine):
+        """Test that a connection is only checked out once a session executes a statement."""
+        session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with session_maker():
+            assert pool_stats(engine.pool)["checked_out"] == 0
+
+        async with session_maker() as session:
+            await session.execute(text("SELECT 1"))
+            assert pool_stats(engine.pool)["checked_out"] == 1
+
+        stats = pool_stats(engine.pool)
+        await engine.dispose()
+        assert stats["checkouts"] == 1
+        assert stats["checked_out"] == 0
+
+    @pytest.mark.asyncio
+    async def test_timeouts_and_wait_times_are_recorded(self, engine):
+        """Test that checkouts failing on an exhausted pool are counted and their wait measured."""
+        async with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = pool_stats(engine.pool)
+        await engine.dispose()
+        assert stats["class"] == "InstrumentedAsyncQueuePool"
+        assert stats["size"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["wait_ms_max"] >= 50
+
+
+class TestPoolerMode:
+    """Test the settings used behind a transaction pooler."""
+
+    def test_statement_caches_are_disabled_and_names_unique(self):
+        """Test that pooler mode disables both statement caches and names every prepared statement uniquely."""
+        connect_args = asyncpg_connect_args(statement_cache_size=500, pooler_mode=True)
+        name_func = connect_args["prepared_statement_name_func"]
+
+        assert connect_args["prepared_statement_cache_size"] == 0
+        assert connect_args["statement_cache_size"] == 0
+        assert name_func() != name_func()
+        assert asyncpg_connect_args(statement_cache_size=500) == {"prepared_statement_cache_size": 500}
+
+    @pytest.mark.asyncio
+    async def test_null_pool_keeps_no_connection(self, tmp_path):
+        """Test that without an app-side pool, sessions close their connection and stats only report the class."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", poolclass=NullPool)
+        async with async_sessionmaker(bind=engine)() as session:
+            await session.execute(text("SELECT 1"))
+
+        stats = pool_stats(engine.pool)
+        await engine.dispose()
+        assert stats == {"class": "NullPool"}
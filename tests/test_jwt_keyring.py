@@ -0,0 +1,80 @@
+"""Unit tests for the JWT keyring and its backends."""
+
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from src.app.core.utils.jwt_keyring import InvalidTokenError, Keyring
+
+
+def write_key_pair(directory, private_key, kid: str) -> str:
+    private_file = directory / f"{kid}.key"
+    private_file.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    )
+    public_dir = directory / "public"
+    public_dir.mkdir(exist_ok=True)
+    (public_dir / f"{kid}.pem").write_bytes(
+        private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    return str(private_file)
+
+
+class TestKeyring:
+    """Test signing, verification and rotation of keys."""
+
+    @pytest.mark.parametrize("backend", ["jose", "pyjwt"])
+    def test_symmetric_round_trip(self, backend):
+        """Test that the secret signs and verifies tokens, and that expired tokens are rejected."""
+        keyring = Keyring.load("HS256", backend=backend, secret_key="s" * 32)
+
+        assert keyring.decode(keyring.encode({"sub": "alice", "exp": time.time() + 60}))["sub"] == "alice"
+        with pytest.raises(InvalidTokenError):
+            keyring.decode(keyring.encode({"sub": "alice", "exp": time.time() - 60}))
+        with pytest.raises(InvalidTokenError):
+            Keyring.load("HS256", backend=backend, secret_key="o" * 32).decode(keyring.encode({"sub": "alice"}))
+
+    @pytest.mark.parametrize("backend", ["jose", "pyjwt"])
+    def test_verifiers_only_need_public_keys(self, backend, tmp_path):
+        """Test that tokens signed with the private key are verified from the public key directory alone."""
+        private_key_file = write_key_pair(tmp_path, ec.generate_private_key(ec.SECP256R1()), "2026-10")
+        signer = Keyring.load("ES256", backend=backend, key_id="2026-10", private_key_file=private_key_file)
+        verifier = Keyring.load("ES256", backend=backend, public_keys_dir=str(tmp_path / "public"))
+
+        token = signer.encode({"sub": "alice"})
+
+        assert signer.backend.get_unverified_header(token)["kid"] == "2026-10"
+        assert verifier.decode(token) == {"sub": "alice"}
+        with pytest.raises(Exception, match="no signing key"):
+            verifier.encode({"sub": "alice"})
+
+    def test_rotation(self, tmp_path):
+        """Test that tokens signed with the previous and the current key are both accepted, and others rejected."""
+        old_key_file = write_key_pair(tmp_path, ec.generate_private_key(ec.SECP256R1()), "old")
+        new_key_file = write_key_pair(tmp_path, ec.generate_private_key(ec.SECP256R1()), "new")
+        old_signer = Keyring.load("ES256", key_id="old", private_key_file=old_key_file)
+        new_signer = Keyring.load(
+            "ES256", key_id="new", private_key_file=new_key_file, public_keys_dir=str(tmp_path / "public")
+        )
+        stranger = Keyring.load("ES256", key_id="stranger", private_key_file=old_key_file)
+
+        assert new_signer.kids == ["new", "old"]
+        assert new_signer.decode(old_signer.encode({"sub": "alice"})) == {"sub": "alice"}
+        assert new_signer.decode(new_signer.encode({"sub": "bob"})) == {"sub": "bob"}
+        with pytest.raises(InvalidTokenError, match="Unknown key id"):
+            new_signer.decode(stranger.encode({"sub": "mallory"}))
+
+    def test_eddsa_requires_pyjwt(self, tmp_path):
+        """Test that EdDSA keys work with the PyJWT backend and are refused by python-jose."""
+        private_key_file = write_key_pair(tmp_path, ed25519.Ed25519PrivateKey.generate(), "ed")
+        keyring = Keyring.load("EdDSA", backend="pyjwt", key_id="ed", private_key_file=private_key_file)
+
+        assert keyring.decode(keyring.encode({"sub": "alice"})) == {"sub": "alice"}
+        with pytest.raises(ValueError, match="does not support EdDSA"):
+            Keyring.load("EdDSA", backend="jose", key_id="ed", private_key_file=private_key_file)
@@ -0,0 +1,100 @@
+"""Unit tests for password hashing in the worker pool."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import bcrypt
+import pytest
+
+from src.app.core import security
+from src.app.core.exceptions.http_exceptions import ServiceUnavailableException
+from src.app.core.security import authenticate_user
+from src.app.core.utils.password_hasher import PasswordHasher
+
+
+class TestPasswordHasher:
+    """Test hashing, verification and backpressure of the worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify(self):
+        """Test that hashes use the configured cost and verify against the right password only."""
+        hasher = PasswordHasher(rounds=4)
+        hashed_password = await hasher.hash("Str1ngst!")
+
+        assert hashed_password.startswith("$2b$04$")
+        assert await hasher.verify("Str1ngst!", hashed_password) is True
+        assert await hasher.verify("wrong", hashed_password) is False
+        assert hasher.needs_rehash(hashed_password) is False
+        assert PasswordHasher(rounds=5).needs_rehash(hashed_password) is True
+
+    @pytest.mark.asyncio
+    async def test_calls_waiting_too_long_are_rejected(self):
+        """Test that a call which cannot get a worker within the maximum wait fails with a 503."""
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_wait=0.05)
+
+        def slow_checkpw(password: bytes, hashed_password: bytes) -> bool:
+            time.sleep(0.2)
+            return True
+
+        with patch("src.app.core.utils.password_hasher.bcrypt.checkpw", slow_checkpw):
+            results = await asyncio.gather(hasher.verify("a", "b"), hasher.verify("a", "b"), return_exceptions=True)
+
+        assert results[0] is True
+        assert isinstance(results[1], ServiceUnavailableException)
+        assert results[1].status_code == 503
+        assert results[1].headers == {"Retry-After": "1"}
+
+    @pytest.mark.asyncio
+    async def test_event_loop_is_not_blocked(self):
+        """Test that the event loop keeps running while a password is verified."""
+        hasher = PasswordHasher(rounds=10)
+        hashed_password = bcrypt.hashpw(b"Str1ngst!", bcrypt.gensalt(rounds=10)).decode()
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await hasher.verify("Str1ngst!", hashed_password)
+        ticker.cancel()
+
+        assert ticks > 1
+
+
+class TestRehashOnLogin:
+    """Test that password hashes are upgraded to the configured cost on login."""
+
+    @pytest.mark.asyncio
+    async def test_outdated_hash_is_upgraded(self, mock_db):
+        """Test that a hash made with another cost factor is replaced after a successful login."""
+        user = {"id": 1, "hashed_password": bcrypt.hashpw(b"Str1ngst!", bcrypt.gensalt(rounds=4)).decode()}
+        with (
+            patch.object(security, "password_hasher", PasswordHasher(rounds=5)),
+            patch.object(security, "crud_users") as mock_crud,
+        ):
+            mock_crud.get = AsyncMock(return_value=user)
+            mock_crud.update = AsyncMock()
+            assert await authenticate_user("alice", "Str1ngst!", mock_db) == user
+
+        new_hash = mock_crud.update.await_args.kwargs["object"]["hashed_password"]
+        assert new_hash.startswith("$2b$05$")
+        assert bcrypt.checkpw(b"Str1ngst!", new_hash.encode())
+
+    @pytest.mark.asyncio
+    async def test_current_hash_is_kept(self, mock_db):
+        """Test that a hash made with the configured cost is not rewritten."""
+        user = {"id": 1, "hashed_password": bcrypt.hashpw(b"Str1ngst!", bcrypt.gensalt(rounds=4)).decode()}
+        with (
+            patch.object(security, "password_hasher", PasswordHasher(rounds=4)),
+            patch.object(security, "crud_users") as mock_crud,
+        ):
+            mock_crud.get = AsyncMock(return_value=user)
+            mock_crud.update = AsyncMock()
+            assert await authenticate_user("alice", "Str1ngst!", mock_db) == user
+            assert await authenticate_user("alice", "wrong", mock_db) is False
+
+        mock_crud.update.assert_not_called()
@@ -0,0 +1,276 @@
+"""Unit tests for the rate limiter and the rate limiter dependency."""
+
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+from fastapi import Response
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.app.admin import initialize
+from src.app.admin.initialize import RateLimitPolicyChangeMiddleware
+from src.app.api.dependencies import rate_limiter_dependency
+from src.app.core.exceptions.http_exceptions import RateLimitException
+from src.app.core.utils.rate_limit import SCRIPTS, LocalCounters, RateLimitAlgorithm, RateLimiter, RateLimitResult
+from src.app.core.utils.rate_limit_policies import RateLimitPolicies, RateLimitPolicy
+
+
+def mock_pipeline(results: list | Exception) -> MagicMock:
+    pipe = MagicMock()
+    pipe.__aenter__.return_value = pipe
+    if isinstance(results, Exception):
+        pipe.execute = AsyncMock(side_effect=results)
+    else:
+        pipe.execute = AsyncMock(return_value=results)
+    return pipe
+
+
+@pytest.fixture
+def limiter():
+    instance = RateLimiter()
+    client, scripts, algorithm = instance.client, instance._scripts, instance.algorithm
+    instance.client = Mock()
+    instance._scripts = {}
+    instance.algorithm = RateLimitAlgorithm.SLIDING_WINDOW_COUNTER
+    yield instance
+    instance.client, instance._scripts, instance.algorithm = client, scripts, algorithm
+    instance.local_counters = None
+
+
+class TestRateLimiter:
+    """Test the Lua-scripted rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_check_runs_the_algorithm_script_once_registered(self, limiter):
+        """Test that the script is registered once and called with the key, limit and period."""
+        script = AsyncMock(return_value=[0, 4, 1500, 0])
+        limiter.client.register_script = Mock(return_value=script)
+
+        await limiter.check(user_id=1, path="/api/v1/rooms", limit=5, period=60)
+        result = await limiter.check(user_id=1, path="/api/v1/rooms", limit=5, period=60)
+
+        limiter.client.register_script.assert_called_once_with(SCRIPTS[RateLimitAlgorithm.SLIDING_WINDOW_COUNTER])
+        script.assert_called_with(keys=["ratelimit:sliding_window_counter:1:api_v1_rooms"], args=[5, 60])
+        assert result == RateLimitResult(limited=False, limit=5, remaining=4, reset_after=1.5, retry_after=0)
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_log_sends_a_unique_member(self, limiter):
+        """Test that every request of the sliding log gets its own sorted set member."""
+        script = AsyncMock(return_value=[0, 1, 1000, 0])
+        limiter.client.register_script = Mock(return_value=script)
+
+        for _ in range(2):
+            await limiter.check(1, "/rooms", 2, 1, algorithm=RateLimitAlgorithm.SLIDING_WINDOW_LOG)
+
+        members = [call.kwargs["args"][2] for call in script.await_args_list]
+        assert members[0] != members[1]
+
+    @pytest.mark.asyncio
+    async def test_is_rate_limited(self, limiter):
+        """Test the boolean wrapper around check."""
+        limiter.client.register_script = Mock(return_value=AsyncMock(return_value=[1, 0, 2000, 2000]))
+
+        assert await limiter.is_rate_limited(db=Mock(), user_id=1, path="/rooms", limit=1, period=10) is True
+
+    def test_headers(self):
+        """Test that Retry-After is only sent when the request is limited, rounded up to whole seconds."""
+        allowed = RateLimitResult(limited=False, limit=10, remaining=3, reset_after=12.2, retry_after=0)
+        limited = RateLimitResult(limited=True, limit=10, remaining=0, reset_after=12.2, retry_after=0.4)
+
+        assert allowed.headers() == {"X-RateLimit-Limit": "10", "X-RateLimit-Remaining": "3", "X-RateLimit-Reset": "13"}
+        assert limited.headers()["Retry-After"] == "1"
+
+
+class TestLocalCounters:
+    """Test the approximate mode of the rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_reports_in_batches_and_enforces_the_global_count(self):
+        """Test that requests are reported every sync_hits requests and limited by the returned global count."""
+        client = Mock()
+        pipe = mock_pipeline([10, True])
+        client.pipeline = Mock(return_value=pipe)
+        counters = LocalCounters(client, sync_interval=60, sync_hits=3, max_error=1)
+
+        results = [await counters.hit("10.0.0.1", "/api/v1/rooms", limit=10, period=60) for _ in range(4)]
+        await counters.stop()
+
+        assert client.pipeline.call_count == 1
+        pipe.incrby.assert_called_once()
+        assert pipe.incrby.call_args.args[1] == 3
+        assert [result.limited for result in results] == [False, False, False, True]
+
+    @pytest.mark.asyncio
+    async def test_low_limits_are_reported_more_often(self):
+        """Test that max_error caps the number of requests counted in memory."""
+        client = Mock()
+        client.pipeline = Mock(side_effect=lambda transaction: mock_pipeline([1, True]))
+        counters = LocalCounters(client, sync_interval=60, sync_hits=50, max_error=0.1)
+
+        await counters.hit("10.0.0.1", "/api/v1/rooms", limit=5, period=60)
+        await counters.hit("10.0.0.1", "/api/v1/rooms", limit=5, period=60)
+        await counters.stop()
+
+        assert client.pipeline.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_sync_keeps_the_pending_requests(self):
+        """Test that requests are reported again after a failed synchronization."""
+        client = Mock()
+        client.pipeline = Mock(return_value=mock_pipeline(ConnectionError("down")))
+        counters = LocalCounters(client, sync_interval=60, sync_hits=2, max_error=1)
+
+        for _ in range(2):
+            await counters.hit("10.0.0.1", "/api/v1/rooms", limit=10, period=60)
+
+        pipe = mock_pipeline([2, True])
+        client.pipeline = Mock(return_value=pipe)
+        await counters.stop()
+
+        assert pipe.incrby.call_args.args[1] == 2
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_uses_local_counters(self, limiter):
+        """Test that check counts in memory once local counters are enabled, unless approximate=False."""
+        limiter.use_local_counters(sync_interval=60, sync_hits=50)
+        limiter.client.register_script = Mock(return_value=AsyncMock(return_value=[0, 4, 1500, 0]))
+        limiter.client.pipeline = Mock(return_value=mock_pipeline([1, True]))
+
+        approximate = await limiter.check(1, "/rooms", limit=100, period=60)
+        exact = await limiter.check(1, "/rooms", limit=100, period=60, approximate=False)
+        limiter.client.pipeline.assert_not_called()
+        await limiter.local_counters.stop()
+
+        assert approximate.remaining == 99
+        assert exact.remaining == 4
+        limiter.client.pipeline.assert_called_once()
+
+
+class TestRateLimitPolicies:
+    """Test the in-process tier and rate limit table."""
+
+    def test_exact_paths_win_over_longer_patterns(self):
+        """Test that exact paths are preferred, then the longest matching pattern."""
+        policies = RateLimitPolicies()
+        policies.build(
+            tiers={1: "free"},
+            rate_limits=[(1, "api_v1_*", 100, 60), (1, "api_v1_rooms_*", 10, 60), (1, "api_v1_rooms_5", 1, 60)],
+            version=1,
+        )
+
+        assert policies.lookup(1, "api_v1_rooms_5") == RateLimitPolicy(limit=1, period=60)
+        assert policies.lookup(1, "api_v1_rooms_6") == RateLimitPolicy(limit=10, period=60)
+        assert policies.lookup(1, "api_v1_users") == RateLimitPolicy(limit=100, period=60)
+        assert policies.lookup(1, "health") is None
+        assert policies.lookup(2, "api_v1_users") is None
+
+    @pytest.mark.asyncio
+    async def test_get_loads_the_table_once(self, mock_db):
+        """Test that the database is only queried by the first lookup."""
+        tiers, rate_limits = Mock(), Mock()
+        tiers.all.return_value = [(1, "free")]
+        rate_limits.all.return_value = [(1, "api_v1_rooms", 5, 60)]
+        mock_db.execute = AsyncMock(side_effect=[tiers, rate_limits])
+        policies = RateLimitPolicies()
+
+        assert await policies.get(mock_db, tier_id=1, path="api_v1_rooms") == RateLimitPolicy(limit=5, period=60)
+        assert await policies.get(mock_db, tier_id=1, path="api_v1_rooms") == RateLimitPolicy(limit=5, period=60)
+        assert mock_db.execute.await_count == 2
+        assert policies.tiers == {1: "free"}
+
+    @pytest.mark.asyncio
+    async def test_publish_change_bumps_the_version(self, mock_db):
+        """Test that a change reloads the local table and publishes the new version."""
+        policies = RateLimitPolicies()
+        policies._client = Mock()
+        policies._client.incr = AsyncMock(return_value=7)
+        policies._client.publish = AsyncMock()
+
+        with patch.object(policies, "load", AsyncMock()) as mock_load:
+            await policies.publish_change(mock_db)
+
+        policies._client.incr.assert_awaited_once_with("ratelimit:policies:version")
+        mock_load.assert_awaited_once_with(mock_db, version=7)
+        policies._client.publish.assert_awaited_once_with("ratelimit:policies", "7")
+
+    def test_admin_edits_of_tiers_publish_a_change(self, mock_db):
+        """Test that writes to tiers or rate limits in the admin interface publish a change, and other requests not."""
+
+        async def endpoint(request):
+            return PlainTextResponse("ok")
+
+        app = Starlette(routes=[Route("/{model}/{action}", endpoint, methods=["GET", "POST"])])
+        app.add_middleware(RateLimitPolicyChangeMiddleware)
+        client = TestClient(app)
+        session = MagicMock()
+        session.return_value.__aenter__.return_value = mock_db
+
+        with (
+            patch.object(initialize, "local_session", session),
+            patch.object(initialize.rate_limit_policies, "publish_change", AsyncMock()) as publish_change,
+        ):
+            client.get("/Tier/list")
+            client.post("/Room/update")
+            publish_change.assert_not_awaited()
+
+            client.post("/Tier/update")
+            publish_change.assert_awaited_once_with(mock_db)
+
+
+class TestRateLimiterDependency:
+    """Test the rate limiter dependency."""
+
+    @pytest.mark.asyncio
+    async def test_sets_headers_on_allowed_requests(self, mock_db):
+        """Test that allowed requests get the X-RateLimit-* headers."""
+        request = Mock()
+        request.url.path = "/api/v1/rooms"
+        request.client.host = "10.0.0.1"
+        del request.app.state.initialization_complete
+        response = Response()
+        result = RateLimitResult(limited=False, limit=10, remaining=9, reset_after=60, retry_after=0)
+
+        with patch("src.app.api.dependencies.rate_limiter") as mock_limiter:
+            mock_limiter.check = AsyncMock(return_value=result)
+            await rate_limiter_dependency(request, response, mock_db, user=None)
+
+        mock_limiter.check.assert_awaited_once_with(user_id="10.0.0.1", path="api_v1_rooms", limit=10, period=3600)
+        assert response.headers["X-RateLimit-Remaining"] == "9"
+
+    @pytest.mark.asyncio
+    async def test_uses_the_policy_of_the_user_tier(self, mock_db):
+        """Test that authenticated users are limited by the policy table, without querying the database."""
+        request = Mock()
+        request.url.path = "/api/v1/rooms/5"
+        del request.app.state.initialization_complete
+        result = RateLimitResult(limited=False, limit=3, remaining=2, reset_after=10, retry_after=0)
+        policies = RateLimitPolicies()
+        policies.build(tiers={1: "free"}, rate_limits=[(1, "api_v1_rooms_*", 3, 10)], version=1)
+
+        with (
+            patch("src.app.api.dependencies.rate_limiter") as mock_limiter,
+            patch("src.app.api.dependencies.rate_limit_policies", policies),
+        ):
+            mock_limiter.check = AsyncMock(return_value=result)
+            await rate_limiter_dependency(request, Response(), mock_db, user={"id": 1, "tier_id": 1})
+
+        mock_limiter.check.assert_awaited_once_with(user_id=1, path="api_v1_rooms_5", limit=3, period=10)
+        mock_db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_raises_with_retry_after(self, mock_db):
+        """Test that limited requests are rejected with Retry-After."""
+        request = Mock()
+        request.url.path = "/api/v1/rooms"
+        del request.app.state.initialization_complete
+        result = RateLimitResult(limited=True, limit=10, remaining=0, reset_after=60, retry_after=30)
+
+        with patch("src.app.api.dependencies.rate_limiter") as mock_limiter:
+            mock_limiter.check = AsyncMock(return_value=result)
+            with pytest.raises(RateLimitException) as exc_info:
+                await rate_limiter_dependency(request, Response(), mock_db, user=None)
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "30"
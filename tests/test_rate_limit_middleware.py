@@ -0,0 +1,87 @@
+"""Unit tests for the rate limit middleware."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src.app.core.security import create_access_token, create_refresh_token
+from src.app.core.utils.rate_limit import RateLimitResult
+from src.app.middleware.rate_limit_middleware import RateLimitMiddleware
+
+ALLOWED = RateLimitResult(limited=False, limit=2, remaining=1, reset_after=30, retry_after=0)
+LIMITED = RateLimitResult(limited=True, limit=2, remaining=0, reset_after=30, retry_after=12)
+
+
+def make_app(session_checkouts: list) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limit=2, period=60, exclude_paths=("/health",))
+
+    async def get_db():
+        session_checkouts.append(True)
+        yield None
+
+    @app.get("/items")
+    async def read_items(db: None = Depends(get_db)) -> dict:
+        return {"items": []}
+
+    @app.get("/health")
+    async def health() -> dict:
+        return {"status": "ok"}
+
+    return app
+
+
+class TestRateLimitMiddleware:
+    """Test that callers are identified and limited before the application runs."""
+
+    def test_allowed_requests_get_rate_limit_headers(self):
+        """Test that allowed requests reach the route with the X-RateLimit-* headers."""
+        checkouts: list = []
+        with patch("src.app.middleware.rate_limit_middleware.rate_limiter") as mock_limiter:
+            mock_limiter.check = AsyncMock(return_value=ALLOWED)
+            response = TestClient(make_app(checkouts)).get("/items")
+
+        assert response.status_code == 200
+        assert response.headers["x-ratelimit-remaining"] == "1"
+        assert checkouts == [True]
+        mock_limiter.check.assert_awaited_once_with(user_id="ip:testclient", path="middleware", limit=2, period=60)
+
+    def test_limited_requests_never_reach_the_application(self):
+        """Test that over-limit requests are rejected before any dependency runs."""
+        checkouts: list = []
+        with patch("src.app.middleware.rate_limit_middleware.rate_limiter") as mock_limiter:
+            mock_limiter.check = AsyncMock(return_value=LIMITED)
+            response = TestClient(make_app(checkouts)).get("/items")
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "12"
+        assert checkouts == []
+
+    @pytest.mark.asyncio
+    async def test_callers_are_identified_by_token_subject(self):
+        """Test that a valid access token identifies the caller, and other tokens fall back to the IP address."""
+        access_token = await create_access_token({"sub": "alice"})
+        refresh_token = await create_refresh_token({"sub": "alice"})
+        with patch("src.app.middleware.rate_limit_middleware.rate_limiter") as mock_limiter:
+            mock_limiter.check = AsyncMock(return_value=ALLOWED)
+            client = TestClient(make_app([]))
+            client.get("/items", headers={"Authorization": f"Bearer {access_token}"})
+            client.get("/items", headers={"Authorization": f"Bearer {refresh_token}"})
+            client.get("/items", headers={"Authorization": "Bearer forged"})
+
+        callers = [call.kwargs["user_id"] for call in mock_limiter.check.await_args_list]
+        assert callers == ["user:alice", "ip:testclient", "ip:testclient"]
+
+    def test_excluded_paths_and_redis_errors_let_requests_through(self):
+        """Test that excluded paths are not counted and that Redis errors do not fail requests."""
+        with patch("src.app.middleware.rate_limit_middleware.rate_limiter") as mock_limiter:
+            mock_limiter.check = AsyncMock(side_effect=ConnectionError("down"))
+            client = TestClient(make_app([]))
+            health = client.get("/health")
+            items = client.get("/items")
+
+        assert health.status_code == 200
+        assert items.status_code == 200
+        mock_limiter.check.assert_awaited_once()
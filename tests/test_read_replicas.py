@@ -0,0 +1,102 @@
+"""Unit tests for read replica routing, using SQLite files as stand-ins for the primary and the replica."""
+
+import time
+from typing import Annotated
+from unittest.mock import patch
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.app.core.db import database
+from src.app.core.db.replicas import LAST_WRITE_COOKIE, Replica, ReplicaRouter
+from src.app.middleware.read_your_writes_middleware import ReadYourWritesMiddleware
+
+
+def make_replica(path, lag_query=None) -> Replica:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    return Replica(
+        name=str(path),
+        engine=engine,
+        session_maker=async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False),
+        lag_query=lag_query,
+    )
+
+
+@pytest.fixture
+def primary(tmp_path):
+    return async_sessionmaker(bind=create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}"))
+
+
+class TestReplicaRouter:
+    """Test the choice between the primary and the replicas."""
+
+    @pytest.mark.asyncio
+    async def test_reads_go_to_up_to_date_replicas(self, primary, tmp_path):
+        """Test that reads use a checked replica, unless the client wrote recently."""
+        replica = make_replica(tmp_path / "replica.db")
+        router = ReplicaRouter(primary, [replica], max_lag=5.0)
+        assert router.choose() is primary
+
+        await router.start(check_interval=60)
+        try:
+            assert replica.healthy and replica.lag == 0.0
+            assert router.choose() is replica.session_maker
+            assert router.choose(last_write=time.time() - 1) is primary
+        finally:
+            await router.stop()
+
+        assert router.stats()["replica_reads"] == 1
+        assert router.stats()["primary_reads"] == 2
+
+    @pytest.mark.asyncio
+    async def test_lagging_and_failing_replicas_are_skipped(self, primary, tmp_path):
+        """Test that replicas over the maximum lag or failing their check do not serve reads."""
+        lagging = make_replica(tmp_path / "lagging.db", lag_query="SELECT 30")
+        unreachable = make_replica(tmp_path / "missing" / "replica.db")
+        router = ReplicaRouter(primary, [lagging, unreachable], max_lag=5.0)
+
+        await router.check()
+        await router.stop()
+
+        assert lagging.healthy and lagging.lag == 30.0
+        assert not unreachable.healthy and unreachable.errors == 1
+        assert router.choose() is primary
+
+
+class TestReadYourWrites:
+    """Test that clients read from the primary after writing."""
+
+    def test_writes_pin_the_next_reads_to_the_primary(self, primary, tmp_path):
+        """Test that a successful write sets the cookie that routes the next reads to the primary."""
+        replica = make_replica(tmp_path / "replica.db")
+        replica.healthy, replica.lag = True, 0.0
+        router = ReplicaRouter(primary, [replica])
+
+        app = FastAPI()
+        app.add_middleware(ReadYourWritesMiddleware, window=10)
+
+        @app.get("/items")
+        async def read_items(db: Annotated[AsyncSession, Depends(database.async_get_read_db)]) -> dict:
+            return {"primary": db.bind is primary.kw["bind"]}
+
+        @app.post("/items")
+        async def write_item() -> dict:
+            return {}
+
+        @app.post("/invalid", status_code=422)
+        async def invalid_item() -> dict:
+            return {}
+
+        with patch.object(database, "read_router", router):
+            client = TestClient(app)
+            assert client.get("/items").json() == {"primary": False}
+
+            assert LAST_WRITE_COOKIE not in client.post("/invalid").cookies
+            response = client.post("/items")
+            assert "Max-Age=10" in response.headers["set-cookie"]
+            assert client.get("/items").json() == {"primary": True}
+
+            client.cookies.set(LAST_WRITE_COOKIE, str(time.time() - 60))
+            assert client.get("/items").json() == {"primary": False}
@@ -0,0 +1,165 @@
+"""Unit tests for the room event fan-out."""
+
+import asyncio
+import json
+import time
+from functools import partial
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.app.api.v1 import room_events
+from src.app.core.utils.room_events import HEARTBEAT_MESSAGE, RoomEventHub, Subscription, room_event_hub
+
+
+class TestSubscription:
+    """Test the per-connection buffers."""
+
+    @pytest.mark.asyncio
+    async def test_oldest_messages_are_dropped_when_full(self):
+        """Test that a full buffer keeps the latest messages and counts the dropped ones."""
+        subscription = Subscription("1", buffer_size=3)
+        for number in range(5):
+            subscription.put(str(number))
+
+        assert await subscription.next_batch() == ["2", "3", "4"]
+        assert subscription.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_closing_wakes_up_the_connection(self):
+        """Test that a connection waiting for messages gets an empty batch once its subscription is closed."""
+        subscription = Subscription("1")
+        asyncio.get_running_loop().call_soon(subscription.close)
+
+        assert await subscription.next_batch() == []
+
+
+class TestRoomEventHub:
+    """Test the fan-out of published events to local connections."""
+
+    def test_messages_reach_every_connection_of_their_room_only(self):
+        """Test that a message is queued for the connections of its room and no other."""
+        hub = RoomEventHub()
+        first, second, other = hub.subscribe("1"), hub.subscribe("1"), hub.subscribe("2")
+
+        assert hub.dispatch(b"room:1", b'{"type": "play"}') == 2
+        assert hub.dispatch("room:3", "{}") == 0
+        assert list(first._messages) == list(second._messages) == ['{"type": "play"}']
+        assert not other._messages
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        assert hub.stats()["rooms"] == 1
+        assert hub.stats()["received"] == 2
+
+    def test_slow_consumers_are_closed(self):
+        """Test that a connection with a full buffer that stopped taking messages is closed as slow."""
+        hub = RoomEventHub()
+        hub.buffer_size, hub.slow_consumer_timeout = 1, 0.0
+        subscription = hub.subscribe("1")
+        subscription.last_drained -= 1
+
+        hub.dispatch("room:1", "a")
+        assert not subscription.closed
+
+        hub.dispatch("room:1", "b")
+        assert subscription.closed and subscription.slow
+        assert hub.stats()["slow_consumers"] == 1
+
+    @pytest.mark.asyncio
+    async def test_idle_connections_get_heartbeats_and_blocked_ones_are_cancelled(self):
+        """Test that the periodic check queues heartbeats and cancels the task of a connection stuck on a send."""
+        hub = RoomEventHub()
+        hub.heartbeat_interval, hub.slow_consumer_timeout = 10.0, 1.0
+        idle, blocked = hub.subscribe("1"), hub.subscribe("1")
+        idle.last_drained -= 10
+        blocked.sending_since = time.monotonic() - 2
+        blocked.task = asyncio.create_task(asyncio.sleep(10))
+
+        hub.check_connections()
+
+        assert await idle.next_batch() == [HEARTBEAT_MESSAGE]
+        assert blocked.closed and blocked.slow
+        with pytest.raises(asyncio.CancelledError):
+            await blocked.task
+
+
+class TestRoomEventsWebSocket:
+    """Test the WebSocket endpoint."""
+
+    def test_status_events_and_heartbeats_are_sent(self):
+        """Test that a display gets the playback status, then published events, then heartbeats when idle."""
+        app = FastAPI()
+        app.include_router(room_events.router)
+        status = json.dumps({"type": "playback_status", "room_id": "1", "status": {"playing": True}})
+
+        with (
+            patch.object(room_events, "playback_status_message", AsyncMock(return_value=status)),
+            TestClient(app) as client,
+        ):
+            client.portal.call(partial(room_event_hub.start, None, heartbeat_interval=0.05))
+            try:
+                with client.websocket_connect("/room/1/ws") as websocket:
+                    assert websocket.receive_text() == status
+
+                    client.portal.call(room_event_hub.dispatch, "room:1", '{"type": "pause"}')
+                    assert websocket.receive_text() == '{"type": "pause"}'
+                    assert websocket.receive_text() == HEARTBEAT_MESSAGE
+            finally:
+                client.portal.call(room_event_hub.stop)
+
+        assert room_event_hub.stats()["connections"] == 0
+
+
+class TestRoomEventsStream:
+    """Test the Server-Sent Events endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_stalled_display_is_dropped(self):
+        """Test that a display that stops reading has its stream ended and its subscription removed."""
+        app = FastAPI()
+        app.include_router(room_events.router)
+        stalled = asyncio.Event()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/room/1/events",
+            "raw_path": b"/room/1/events",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [],
+            "client": ("test", 0),
+            "server": ("test", 80),
+        }
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.body" and b"pause" in message.get("body", b""):
+                stalled.set()
+                await asyncio.Event().wait()
+
+        await room_event_hub.start(None, heartbeat_interval=60, slow_consumer_timeout=60)
+        try:
+            with patch.object(room_events, "playback_status_message", AsyncMock(return_value=None)):
+                request = asyncio.create_task(app(scope, receive, send))
+                while room_event_hub.stats()["connections"] == 0:
+                    await asyncio.sleep(0)
+
+                room_event_hub.dispatch("room:1", '{"type": "pause"}')
+                await asyncio.wait_for(stalled.wait(), 1)
+                room_event_hub.slow_consumer_timeout = 0
+                room_event_hub.check_connections()
+                await asyncio.wait_for(request, 1)
+                await asyncio.sleep(0)
+
+            assert room_event_hub.stats()["slow_consumers"] == 1
+            assert room_event_hub.stats()["connections"] == 0
+        finally:
+            await room_event_hub.stop()
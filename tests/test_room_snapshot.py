@@ -0,0 +1,97 @@
+"""Unit tests for the room snapshot, using a SQLite database without the user table, which SQLite cannot create."""
+
+from datetime import date, time
+from typing import get_type_hints
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.app.admin import initialize
+from src.app.admin.initialize import RoomSnapshotInvalidationMiddleware
+from src.app.api.v1.rooms import read_room_snapshot
+from src.app.core.db.database import Base, async_get_db
+from src.app.crud.crud_rooms import get_room_snapshot
+from src.app.models.display import Display
+from src.app.models.room import Room
+from src.app.models.timer import Timer
+
+TABLES = [Room.__table__, Display.__table__, Timer.__table__]
+
+
+class TestGetRoomSnapshot:
+    """Test the loading of a room with its timers and displays."""
+
+    @pytest.mark.asyncio
+    async def test_loads_the_room_timers_and_displays_in_two_statements(self, tmp_path):
+        """Test that timers come ordered by schedule without deleted ones, with each linked display once."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'snapshot.db'}")
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                room = Room(created_by_user_id=1, name="Main stage", description=None)
+                display = Display(created_by_user_id=1, name="Stage left", logo_image="aGVsbG8=")
+                session.add_all([room, display, Display(created_by_user_id=1, name="Unused")])
+                await session.flush()
+                later = Timer(room_id=room.id, title="Closing", scheduled_start_date=date(2026, 1, 2))
+                unscheduled = Timer(room_id=room.id, title="Spare", display_id=display.id)
+                first = Timer(
+                    room_id=room.id,
+                    title="Keynote",
+                    display_id=display.id,
+                    scheduled_start_date=date(2026, 1, 1),
+                    scheduled_start_time=time(9),
+                )
+                deleted = Timer(room_id=room.id, title="Cancelled", scheduled_start_date=date(2025, 1, 1))
+                deleted.is_deleted = True
+                session.add_all([later, unscheduled, first, deleted])
+                await session.commit()
+
+            statements.clear()
+            async with AsyncSession(engine) as session:
+                snapshot = await get_room_snapshot(session, room_id=room.id, created_by_user_id=1)
+                assert await get_room_snapshot(session, room_id=room.id, created_by_user_id=2) is None
+        finally:
+            await engine.dispose()
+
+        assert len(statements) == 3
+        assert snapshot["room"]["name"] == "Main stage"
+        assert [timer["title"] for timer in snapshot["timers"]] == ["Keynote", "Closing", "Spare"]
+        assert [display["name"] for display in snapshot["displays"]] == ["Stage left"]
+        assert snapshot["displays"][0]["logo_image"] == "aGVsbG8="
+
+    def test_endpoint_reads_the_primary_database(self):
+        """Test that snapshots are not read from a replica, which could lag behind the changes numbered in `seq`."""
+        db = get_type_hints(read_room_snapshot, include_extras=True)["db"]
+        assert db.__metadata__[0].dependency is async_get_db
+
+
+class TestRoomSnapshotInvalidationMiddleware:
+    """Test the invalidation of the snapshots after admin edits."""
+
+    def test_admin_writes_to_rooms_timers_and_displays_drop_the_snapshots(self):
+        """Test that only writes to the models in the snapshots drop them."""
+
+        async def endpoint(request):
+            return PlainTextResponse("ok")
+
+        app = Starlette(routes=[Route("/{model}/{action}", endpoint, methods=["GET", "POST"])])
+        app.add_middleware(RoomSnapshotInvalidationMiddleware)
+        client = TestClient(app)
+
+        with patch.object(initialize, "invalidate_tags", AsyncMock()) as invalidate_tags:
+            client.get("/Timer/list")
+            client.post("/User/update")
+            assert invalidate_tags.await_count == 0
+
+            client.post("/Display/update")
+            invalidate_tags.assert_awaited_once_with("room_snapshots")
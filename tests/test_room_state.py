@@ -0,0 +1,102 @@
+"""Unit tests for the sequenced changes of rooms."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+
+from src.app.api.v1 import room_events
+from src.app.core.utils import cache, room_state
+from src.app.core.utils.lua import LuaScript
+from src.app.core.utils.room_events import RESYNC_MESSAGE
+from src.app.core.utils.room_state import APPEND_SCRIPT
+
+
+def message(seq: int) -> str:
+    return json.dumps({"seq": seq, "type": "room_patch", "room_id": "1", "changes": []})
+
+
+def stream_client(seq: int | None, seqs: list[int]) -> Mock:
+    pipe = MagicMock()
+    pipe.__aenter__.return_value = pipe
+    pipe.execute = AsyncMock(
+        return_value=[
+            None if seq is None else str(seq).encode(),
+            [(f"{entry}-0".encode(), {b"event": message(entry).encode()}) for entry in seqs],
+        ]
+    )
+    client = Mock()
+    client.pipeline = Mock(return_value=pipe)
+    return client
+
+
+@pytest.fixture
+def redis_script():
+    script = AsyncMock(return_value=8)
+    client = Mock()
+    client.register_script = Mock(return_value=script)
+    with patch.object(cache, "client", client), patch.object(room_state, "_script", LuaScript(APPEND_SCRIPT)):
+        yield script
+
+
+class TestAppend:
+    """Test that changes are numbered, kept and published at once."""
+
+    @pytest.mark.asyncio
+    async def test_publishes_changes_with_the_script(self, redis_script):
+        """Test that the changes go to the script as one event, with the stream length and the room channel."""
+        changes = [{"op": "update", "entity": "timer", "id": 7, "fields": {"title": "Keynote"}}]
+
+        seq = await room_state.publish_changes("1", changes, max_length=50)
+
+        assert seq == 8
+        cache.client.register_script.assert_called_once_with(APPEND_SCRIPT)
+        event = {"type": "room_patch", "room_id": "1", "changes": changes}
+        redis_script.assert_awaited_once_with(
+            keys=["room_state:1:seq", "room_state:1:changes"], args=[json.dumps(event), 50, "room:1"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_publish(self, redis_script):
+        """Test that updates changing no field do not take a sequence number."""
+        assert await room_state.publish_changes("1", []) is None
+        redis_script.assert_not_awaited()
+
+    def test_diff_and_event_seq(self):
+        """Test that only changed fields are sent and that the sequence number is read back from the message."""
+        assert room_state.diff({"title": "Keynote", "speaker": "Ada"}, {"title": "Keynote", "speaker": "Grace"}) == {
+            "speaker": "Grace"
+        }
+        assert room_state.event_seq(message(12)) == 12
+        assert room_state.event_seq(RESYNC_MESSAGE) is None
+
+
+class TestEventsSince:
+    """Test resuming a display from its last change."""
+
+    @pytest.mark.asyncio
+    async def test_replays_the_missed_changes(self):
+        """Test that the changes after the last applied one are returned in order, none when it is up to date."""
+        with patch.object(cache, "client", stream_client(5, [4, 5])):
+            assert await room_state.events_since("1", 3) == [message(4), message(5)]
+
+        with patch.object(cache, "client", stream_client(5, [])):
+            assert await room_state.events_since("1", 5) == []
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_the_snapshot(self):
+        """Test that displays too far behind, behind trimmed changes or ahead of a lost sequence must resync."""
+        with patch.object(cache, "client", stream_client(500, [])):
+            assert await room_state.events_since("1", 10, max_events=100) is None
+
+        with patch.object(cache, "client", stream_client(5, [4, 5])):
+            assert await room_state.events_since("1", 1) is None
+
+        with patch.object(cache, "client", stream_client(None, [])):
+            assert await room_state.events_since("1", 3) is None
+            assert await room_events.missed_messages("1", 3) == [RESYNC_MESSAGE]
+
+    def test_server_sent_events_carry_the_sequence_as_id(self):
+        """Test that browsers can resume with Last-Event-ID."""
+        assert room_events._sse_message(message(4)) == f"id: 4\ndata: {message(4)}\n\n"
+        assert room_events._sse_message(RESYNC_MESSAGE) == f"data: {RESYNC_MESSAGE}\n\n"
@@ -0,0 +1,130 @@
+"""Unit tests for the timer state machine."""
+
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.app.core.utils import cache, timer_engine
+from src.app.core.utils.lua import LuaScript
+from src.app.core.utils.timer_engine import (
+    TRANSITION_SCRIPT,
+    TimerAction,
+    TimerState,
+    TimerStatus,
+    TimerTransitionError,
+)
+
+
+def make_state(**kwargs) -> TimerState:
+    values = {
+        "timer_id": 1,
+        "timer_type": "countdown",
+        "duration_ms": 60_000,
+        "status": TimerStatus.RUNNING,
+        "started_at": 1_000_000,
+        "paused_at": None,
+        "pause_ms": 5_000,
+        "version": 3,
+        "server_time": 1_030_000,
+    }
+    return TimerState(**{**values, **kwargs})
+
+
+def hash_reply(state: TimerState) -> list[bytes]:
+    fields = {
+        "type": state.timer_type,
+        "duration_ms": state.duration_ms,
+        "status": state.status.value,
+        "started_at": state.started_at,
+        "paused_at": "" if state.paused_at is None else state.paused_at,
+        "pause_ms": state.pause_ms,
+        "version": state.version,
+    }
+    return [str(item).encode() for field in fields.items() for item in field]
+
+
+@pytest.fixture
+def redis_script():
+    script = AsyncMock()
+    client = Mock()
+    client.register_script = Mock(return_value=script)
+    with patch.object(cache, "client", client), patch.object(timer_engine, "_script", LuaScript(TRANSITION_SCRIPT)):
+        yield script
+
+
+class TestTimerState:
+    """Test the times computed from the anchors."""
+
+    def test_running_countdown(self):
+        """Test that the elapsed time excludes pauses and the end is predicted from the anchors."""
+        state = make_state()
+
+        assert state.elapsed_ms == 25_000
+        assert state.remaining_ms == 35_000
+        assert state.ends_at == 1_065_000
+        assert not state.finished
+
+    def test_paused_timers_are_frozen(self):
+        """Test that the time of a paused timer does not depend on when it is read."""
+        state = make_state(status=TimerStatus.PAUSED, paused_at=1_020_000)
+        later = make_state(status=TimerStatus.PAUSED, paused_at=1_020_000, server_time=2_000_000)
+
+        assert state.elapsed_ms == later.elapsed_ms == 15_000
+        assert state.ends_at is None
+
+    def test_overtime_and_stopwatches(self):
+        """Test that countdowns go negative once finished and stopwatches have no remaining time."""
+        assert make_state(server_time=1_100_000).remaining_ms == -35_000
+        assert make_state(server_time=1_100_000).finished
+        assert make_state(timer_type="stopwatch").remaining_ms is None
+        assert not make_state(timer_type="stopwatch", server_time=2_000_000).finished
+
+    def test_round_trip_through_the_timer_columns(self):
+        """Test that the state persisted on a transition is the one reloaded when Redis lost it."""
+        state = make_state(status=TimerStatus.PAUSED, paused_at=1_020_000)
+        timer = {"id": 1, "timer_type": "countdown", **state.to_columns()}
+
+        assert timer["is_active"] and timer["is_paused"]
+        assert timer["started_at"] == datetime.fromtimestamp(1_000, tz=UTC)
+        assert TimerState.from_timer(timer, server_time=state.server_time) == state
+
+
+class TestTransition:
+    """Test the atomic transitions."""
+
+    @pytest.mark.asyncio
+    async def test_runs_the_script_with_the_seed(self, redis_script):
+        """Test that the script gets the action and the persisted state to seed a missing hash with."""
+        paused = make_state(status=TimerStatus.PAUSED, paused_at=1_020_000, version=4, server_time=1_020_000)
+        redis_script.return_value = [1, 1_020_000, hash_reply(paused)]
+
+        state = await timer_engine.transition(make_state(), TimerAction.PAUSE, ttl=60)
+
+        redis_script.assert_awaited_once_with(
+            keys=["timer:1:state"],
+            args=["pause", 0, 60, "countdown", 60_000, "running", 1_000_000, "", 5_000, 3],
+        )
+        assert state == paused
+
+    @pytest.mark.asyncio
+    async def test_rejected_transitions_raise_with_the_current_state(self, redis_script):
+        """Test that an action not allowed in the current status raises, without counting as a transition."""
+        redis_script.return_value = [0, 1_030_000, hash_reply(make_state())]
+
+        with pytest.raises(TimerTransitionError) as error:
+            await timer_engine.transition(make_state(), TimerAction.RESUME)
+
+        assert error.value.state == make_state()
+        assert "running" in error.value.message
+
+    @pytest.mark.asyncio
+    async def test_script_is_registered_once(self, redis_script):
+        """Test that the script is sent to Redis once and then run by its hash."""
+        redis_script.return_value = [1, 1_030_000, hash_reply(make_state())]
+
+        for _ in range(2):
+            await timer_engine.transition(make_state(), TimerAction.ADJUST, seconds=30)
+
+        cache.client.register_script.assert_called_once_with(TRANSITION_SCRIPT)
+        assert redis_script.await_args.kwargs["args"][1] == 30_000
@@ -0,0 +1,216 @@
+"""Unit tests for timer API endpoints."""
+
+import json
+from unittest.mock import AsyncMock, Mock, call, patch
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from src.app.api.v1 import timers
+from src.app.api.v1.timers import delete_timer, transition_timer, update_timer
+from src.app.core.exceptions.http_exceptions import ForbiddenException, NotFoundException
+from src.app.core.utils import cache as cache_module
+from src.app.core.utils import room_state
+from src.app.core.utils.timer_engine import TimerAction, TimerState, TimerStatus
+from src.app.schemas.timer import TimerUpdate
+
+
+def make_request(method: str) -> Mock:
+    request = Mock()
+    request.method = method
+    request.headers = {}
+    return request
+
+
+@pytest.fixture
+def db_timer():
+    """A timer row as fastcrud returns it with `schema_to_select`: a dict."""
+    return {"id": 7, "room_id": 3, "created_by_user_id": 1, "title": "Keynote", "display_id": None}
+
+
+def streamed_changes(script: AsyncMock) -> tuple[list[str], list[dict]]:
+    """Return the keys the room change script was run on and the changes of its event."""
+    keys, args = script.await_args.kwargs["keys"], script.await_args.kwargs["args"]
+    return keys, json.loads(args[0])["changes"]
+
+
+@pytest.fixture
+def room_stream():
+    """The script numbering the changes of a room, appending them to its stream and publishing them."""
+    script = AsyncMock(return_value=1)
+    with patch.object(room_state, "_get_script", Mock(return_value=script)):
+        yield script
+
+
+@pytest.fixture
+def invalidate(fake_redis, room_stream):
+    """The cache invalidations, run on an in-memory Redis and recorded."""
+    with (
+        patch.object(cache_module, "client", fake_redis),
+        patch.object(cache_module, "_invalidate", wraps=cache_module._invalidate) as invalidate,
+    ):
+        yield invalidate
+
+
+class TestUpdateTimer:
+    """Test timer update endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_update_timer_streams_the_changed_fields(self, mock_db, db_timer, invalidate, room_stream):
+        """Test that the fields an update changes reach the stream of the timer's room."""
+        values = TimerUpdate(title="Opening Keynote", speaker=None)
+        with patch.object(timers, "crud_timer") as mock_crud:
+            mock_crud.get = AsyncMock(return_value=db_timer)
+            mock_crud.update = AsyncMock()
+
+            result = await update_timer(
+                make_request("PATCH"), timer_id=7, values=values, current_user={"id": 1}, db=mock_db
+            )
+
+        assert result == {"message": "Timer updated"}
+        mock_crud.update.assert_awaited_once_with(db=mock_db, object=values, id=7)
+        keys, changes = streamed_changes(room_stream)
+        assert keys == ["room_state:3:seq", "room_state:3:changes"]
+        assert changes == [{"op": "update", "entity": "timer", "id": 7, "fields": {"title": "Opening Keynote"}}]
+        assert invalidate.await_args.kwargs["patterns"] == ["user_1_timers:**"]
+
+    @pytest.mark.asyncio
+    async def test_update_timer_drops_the_room_snapshot(self, mock_db, db_timer, invalidate, fake_redis):
+        """Test that the cached snapshot of the timer's room is deleted once the update is streamed."""
+        await cache_module._store_entry("1_room_snapshot:3", b"{}", 60, ["room_snapshot:3", "room_snapshots"])
+        with patch.object(timers, "crud_timer") as mock_crud:
+            mock_crud.get = AsyncMock(return_value=db_timer)
+            mock_crud.update = AsyncMock()
+
+            await update_timer(
+                make_request("PATCH"),
+                timer_id=7,
+                values=TimerUpdate(title="Closing"),
+                current_user={"id": 1},
+                db=mock_db,
+            )
+
+        assert not await fake_redis.exists("1_room_snapshot:3")
+        assert call([], ["room_snapshot:3"], []) in invalidate.await_args_list
+
+    @pytest.mark.asyncio
+    async def test_update_timer_changing_nothing_is_not_streamed(self, mock_db, db_timer, invalidate, room_stream):
+        """Test that updates leaving every field as it was take no sequence number."""
+        with patch.object(timers, "crud_timer") as mock_crud:
+            mock_crud.get = AsyncMock(return_value=db_timer)
+            mock_crud.update = AsyncMock()
+
+            await update_timer(
+                make_request("PATCH"),
+                timer_id=7,
+                values=TimerUpdate(title="Keynote"),
+                current_user={"id": 1},
+                db=mock_db,
+            )
+
+        room_stream.assert_not_awaited()
+
+
+class TestDeleteTimer:
+    """Test timer deletion endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_delete_timer_invalidates_the_list_pages(self, mock_db, db_timer, invalidate, room_stream):
+        """Test that deleting a timer drops it and every cached page of the owner's timers, and tells its room."""
+        with patch.object(timers, "crud_timer") as mock_crud:
+            mock_crud.get = AsyncMock(return_value=db_timer)
+            mock_crud.delete = AsyncMock()
+
+            result = await delete_timer(make_request("DELETE"), timer_id=7, current_user={"id": 1}, db=mock_db)
+
+        assert result == {"message": "Timer deleted"}
+        mock_crud.delete.assert_awaited_once_with(db=mock_db, id=7)
+        assert invalidate.await_args.kwargs["keys"] == ["user_1_timer_7:7"]
+        assert invalidate.await_args.kwargs["patterns"] == ["user_1_timers:**"]
+        keys, changes = streamed_changes(room_stream)
+        assert keys == ["room_state:3:seq", "room_state:3:changes"]
+        assert changes == [{"op": "delete", "entity": "timer", "id": 7}]
+
+    @pytest.mark.asyncio
+    async def test_delete_timer_forbidden(self, mock_db, db_timer, invalidate, room_stream):
+        """Test that users cannot delete the timers of others."""
+        with patch.object(timers, "crud_timer") as mock_crud:
+            mock_crud.get = AsyncMock(return_value=db_timer)
+            mock_crud.delete = AsyncMock()
+
+            with pytest.raises(ForbiddenException):
+                await delete_timer(make_request("DELETE"), timer_id=7, current_user={"id": 2}, db=mock_db)
+
+        mock_crud.delete.assert_not_awaited()
+        room_stream.assert_not_awaited()
+
+
+class TestTransitionTimer:
+    """Test timer transition endpoint."""
+
+    @pytest.fixture
+    def transition(self, db_timer):
+        db_timer |= {
+            "timer_type": "countdown",
+            "duration_seconds": 600,
+            "is_active": True,
+            "is_paused": False,
+            "is_stopped": False,
+            "started_at": None,
+            "paused_at": None,
+            "accumulated_pause_seconds": 0.0,
+            "state_version": 1,
+        }
+        state = TimerState(
+            timer_id=7,
+            timer_type="countdown",
+            duration_ms=600_000,
+            status=TimerStatus.PAUSED,
+            started_at=1_000_000,
+            paused_at=1_090_000,
+            pause_ms=0,
+            version=2,
+            server_time=1_090_000,
+        )
+        with (
+            patch.object(timers, "_get_room_timer", new_callable=AsyncMock, return_value=db_timer),
+            patch.object(timers.timer_engine, "transition", new_callable=AsyncMock, return_value=state),
+            patch.object(timers.room_state, "append", new_callable=AsyncMock) as append,
+        ):
+            yield append
+
+    @pytest.mark.asyncio
+    async def test_transition_is_persisted_then_published(self, mock_db, invalidate, transition):
+        """Test that the event goes to the room once the row holds the state, and that the list pages are dropped."""
+        calls = Mock()
+        with patch.object(timers, "crud_timer") as mock_crud:
+            mock_crud.update = AsyncMock()
+            calls.attach_mock(mock_crud.update, "update")
+            calls.attach_mock(transition, "append")
+
+            result = await transition_timer(
+                make_request("POST"), timer_id=7, action=TimerAction.PAUSE, current_user={"id": 1}, db=mock_db
+            )
+
+        assert result["status"] == "paused"
+        assert [name for name, _, _ in calls.mock_calls] == ["update", "append"]
+        assert mock_crud.update.await_args.kwargs["state_version__lt"] == 2
+        room_id, event = transition.await_args.args
+        assert room_id == "3"
+        assert event["type"] == "timer_state"
+        assert event["action"] == "pause"
+        assert invalidate.await_args.kwargs["tags"] == ["timer:7"]
+        assert invalidate.await_args.kwargs["patterns"] == ["user_1_timers:**"]
+
+    @pytest.mark.asyncio
+    async def test_transition_of_a_missing_row_is_not_published(self, mock_db, invalidate, transition):
+        """Test that a transition the timer row does not take returns 404 and sends nothing to the room."""
+        with patch.object(timers, "crud_timer") as mock_crud:
+            mock_crud.update = AsyncMock(side_effect=NoResultFound)
+
+            with pytest.raises(NotFoundException):
+                await transition_timer(
+                    make_request("POST"), timer_id=7, action=TimerAction.PAUSE, current_user={"id": 1}, db=mock_db
+                )
+
+        transition.assert_not_awaited()
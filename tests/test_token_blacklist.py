@@ -0,0 +1,113 @@
+"""Unit tests for the Redis token blacklist and token verification."""
+
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.app.core import security
+from src.app.core.security import TokenType, blacklist_token, create_access_token, verify_token
+from src.app.core.utils.token_blacklist import BloomFilter, TokenBlacklist, hash_token
+
+
+@pytest.fixture
+def blacklist():
+    instance = TokenBlacklist()
+    instance.client = Mock()
+    instance.client.exists = AsyncMock(return_value=1)
+    instance.client.set = AsyncMock()
+    instance.client.publish = AsyncMock()
+    return instance
+
+
+class TestBloomFilter:
+    """Test the Bloom filter of token hashes."""
+
+    def test_no_false_negatives(self):
+        """Test that every added hash is reported as present, and an unrelated one usually is not."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        hashes = [hash_token(str(i)) for i in range(1000)]
+        for token_hash in hashes:
+            bloom.add(token_hash)
+
+        assert all(token_hash in bloom for token_hash in hashes)
+        assert sum(hash_token(f"other-{i}") in bloom for i in range(1000)) < 50
+
+
+class TestTokenBlacklist:
+    """Test the Redis blacklist fronted by the Bloom filter."""
+
+    @pytest.mark.asyncio
+    async def test_filter_rules_out_tokens_without_redis(self, blacklist):
+        """Test that tokens absent from a ready filter are not checked with Redis."""
+        blacklist.ready = True
+
+        assert await blacklist.contains(hash_token("valid")) is False
+        blacklist.client.exists.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_redis_is_checked_until_the_filter_is_ready(self, blacklist):
+        """Test that every token is checked with Redis while the filter is not filled."""
+        assert await blacklist.contains(hash_token("revoked")) is True
+        blacklist.client.exists.assert_awaited_once_with(f"blacklist:{hash_token('revoked')}")
+
+    @pytest.mark.asyncio
+    async def test_add_stores_until_expiry_and_publishes(self, blacklist):
+        """Test that a revoked token expires with the token and is announced to the other processes."""
+        blacklist.ready = True
+        token_hash = hash_token("revoked")
+        expires_at = int(time.time()) + 60
+
+        await blacklist.add(token_hash, expires_at)
+        await blacklist.add(hash_token("expired"), int(time.time()) - 1)
+
+        blacklist.client.set.assert_awaited_once_with(f"blacklist:{token_hash}", 1, exat=expires_at)
+        blacklist.client.publish.assert_awaited_once_with("blacklist:revoked", token_hash)
+        assert await blacklist.contains(token_hash) is True
+
+
+class TestVerifyToken:
+    """Test token verification against the Redis blacklist."""
+
+    @pytest.mark.asyncio
+    async def test_valid_token_needs_no_database(self, mock_db, blacklist):
+        """Test that the database is not queried when the Redis blacklist is initialized."""
+        blacklist.ready = True
+        token = await create_access_token({"sub": "alice"})
+
+        with patch.object(security, "token_blacklist", blacklist):
+            token_data = await verify_token(token, TokenType.ACCESS, mock_db)
+
+        assert token_data.username_or_email == "alice"
+        mock_db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_blacklisted_token_is_rejected(self, mock_db, blacklist):
+        """Test that a revoked token is rejected after being blacklisted, even with its claims cached."""
+        token = await create_access_token({"sub": "bob"})
+
+        with (
+            patch.object(security, "token_blacklist", blacklist),
+            patch.object(security, "crud_token_blacklist") as mock_crud,
+        ):
+            mock_crud.create = AsyncMock()
+            blacklist.client.exists = AsyncMock(return_value=0)
+            assert await verify_token(token, TokenType.ACCESS, mock_db) is not None
+
+            await blacklist_token(token, mock_db)
+            blacklist.client.exists = AsyncMock(return_value=1)
+            assert await verify_token(token, TokenType.ACCESS, mock_db) is None
+
+        mock_crud.create.assert_awaited_once()
+        blacklist.client.set.assert_awaited_once()
+
+    def test_decoded_claims_are_cached(self):
+        """Test that a token is only decoded once while its claims are cached."""
+        token = "header.payload.signature"
+        with patch.object(
+            security.token_keyring, "decode", return_value={"sub": "carol", "exp": time.time() + 60}
+        ) as decode:
+            security.decode_token(token)
+            security.decode_token(token)
+
+        decode.assert_called_once()
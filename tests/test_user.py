@@ -23,7 +23,7 @@ class TestWriteUser:
             mock_crud.create = AsyncMock(return_value=Mock(id=1))
             mock_crud.get = AsyncMock(return_value=sample_user_read)
 
-            with patch("src.app.api.v1.users.get_password_hash") as mock_hash:
+            with patch("src.app.api.v1.users.hash_password", new_callable=AsyncMock) as mock_hash:
                 mock_hash.return_value = "hashed_password"
 
                 result = await write_user(Mock(), user_create, mock_db)
@@ -121,7 +121,7 @@ class TestPatchUser:
         user_update = UserUpdate(name="New Name")
 
         with patch("src.app.api.v1.users.crud_users") as mock_crud:
-            mock_crud.get = AsyncMock(return_value=sample_user_read)
+            mock_crud.get = AsyncMock(return_value=sample_user_read.model_dump())
             mock_crud.exists = AsyncMock(return_value=False)  # No conflicts
             mock_crud.update = AsyncMock(return_value=None)
 
@@ -138,7 +138,7 @@ class TestPatchUser:
         user_update = UserUpdate(name="New Name")
 
         with patch("src.app.api.v1.users.crud_users") as mock_crud:
-            mock_crud.get = AsyncMock(return_value=sample_user_read)
+            mock_crud.get = AsyncMock(return_value=sample_user_read.model_dump())
 
             with pytest.raises(ForbiddenException):
                 await patch_user(Mock(), user_update, username, current_user_dict, mock_db)
@@ -155,14 +155,20 @@ class TestEraseUser:
         token = "mock_token"
 
         with patch("src.app.api.v1.users.crud_users") as mock_crud:
-            mock_crud.get = AsyncMock(return_value=sample_user_read)
+            # fastcrud returns a dict with schema_to_select
+            mock_crud.get = AsyncMock(return_value=sample_user_read.model_dump())
             mock_crud.delete = AsyncMock(return_value=None)
 
-            with patch("src.app.api.v1.users.blacklist_token", new_callable=AsyncMock) as mock_blacklist:
+            with (
+                patch("src.app.api.v1.users.blacklist_token", new_callable=AsyncMock) as mock_blacklist,
+                patch("src.app.api.v1.users.user_context_cache") as mock_context,
+            ):
+                mock_context.invalidate = AsyncMock()
                 result = await erase_user(Mock(), username, current_user_dict, mock_db, token)
 
                 assert result == {"message": "User deleted"}
                 mock_crud.delete.assert_called_once_with(db=mock_db, username=username)
+                mock_context.invalidate.assert_awaited_once_with(username, sample_user_read.email)
                 mock_blacklist.assert_called_once_with(token=token, db=mock_db)
 
     @pytest.mark.asyncio
@@ -185,7 +191,7 @@ class TestEraseUser:
         token = "mock_token"
 
         with patch("src.app.api.v1.users.crud_users") as mock_crud:
-            mock_crud.get = AsyncMock(return_value=sample_user_read)
+            mock_crud.get = AsyncMock(return_value=sample_user_read.model_dump())
 
             with pytest.raises(ForbiddenException):
                 await erase_user(Mock(), username, current_user_dict, mock_db, token)
@@ -0,0 +1,140 @@
+"""Unit tests for the user context cache and the user claims of access tokens."""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.app.api import dependencies
+from src.app.api.dependencies import get_current_user, get_optional_user
+from src.app.core import security
+from src.app.core.security import create_access_token, create_user_claims, decode_user_claims
+from src.app.core.utils.user_context import UserContextCache, get_user_context
+
+USER = {
+    "id": 1,
+    "name": "Alice Liddell",
+    "username": "alice",
+    "email": "alice@example.com",
+    "profile_image_url": "https://www.profileimageurl.com",
+    "tier_id": 2,
+    "is_superuser": False,
+}
+
+
+@pytest.fixture
+def context_cache():
+    instance = UserContextCache()
+    instance.client = Mock()
+    instance.client.get = AsyncMock(return_value=None)
+    instance.client.set = AsyncMock()
+    instance.client.delete = AsyncMock()
+    instance.client.publish = AsyncMock()
+    instance.ready = True
+    return instance
+
+
+class TestUserContextCache:
+    """Test the two cache layers and their invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_cached_context_is_served_from_memory(self, context_cache):
+        """Test that a context cached by this process is returned without calling Redis."""
+        await context_cache.set("alice", USER)
+
+        assert await context_cache.get("alice") == USER
+        context_cache.client.get.assert_not_called()
+        context_cache.client.set.assert_awaited_once()
+        assert context_cache.client.set.await_args.kwargs == {"ex": 60}
+
+    @pytest.mark.asyncio
+    async def test_memory_is_skipped_without_subscription(self, context_cache):
+        """Test that Redis is asked while invalidations of other processes cannot be received."""
+        await context_cache.set("alice", USER)
+        context_cache.ready = False
+
+        assert await context_cache.get("alice") is None
+        context_cache.client.get.assert_awaited_once_with("user_context:alice")
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_every_subject_everywhere(self, context_cache):
+        """Test that invalidated subjects are deleted from memory and Redis, and announced to other processes."""
+        await context_cache.set("alice", USER)
+        await context_cache.invalidate("alice", "alice@example.com", None)
+
+        assert await context_cache.get("alice") is None
+        context_cache.client.delete.assert_awaited_once()
+        assert set(context_cache.client.delete.await_args.args) == {
+            "user_context:alice",
+            "user_context:alice@example.com",
+        }
+        context_cache.client.publish.assert_awaited_once_with(
+            "user_context:invalidate", '["alice", "alice@example.com"]'
+        )
+
+    def test_invalidation_messages_are_applied(self, context_cache):
+        """Test that invalidations published by other processes drop the local entries."""
+        context_cache._remember("alice", USER)
+        context_cache._remember("bob", USER)
+
+        context_cache._apply_invalidation(b'["alice"]')
+        assert list(context_cache._entries) == ["bob"]
+
+        context_cache._apply_invalidation(b"*")
+        assert not context_cache._entries
+
+
+class TestCurrentUser:
+    """Test that authenticated requests only fetch the user on a cache miss."""
+
+    @pytest.mark.asyncio
+    async def test_user_is_fetched_once(self, mock_db, context_cache):
+        """Test that the user is read from the database on the first request only."""
+        token = await create_access_token({"sub": "alice"})
+        with (
+            patch("src.app.core.utils.user_context.user_context_cache", context_cache),
+            patch("src.app.core.utils.user_context.crud_users") as mock_crud,
+            patch.object(dependencies, "verify_token", AsyncMock(return_value=Mock(username_or_email="alice"))),
+        ):
+            mock_crud.get = AsyncMock(return_value=USER)
+            assert await get_current_user(token, mock_db) == USER
+            assert await get_current_user(token, mock_db) == USER
+
+        mock_crud.get.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_is_not_cached(self, mock_db, context_cache):
+        """Test that a subject without an active user is looked up again next time."""
+        with (
+            patch("src.app.core.utils.user_context.user_context_cache", context_cache),
+            patch("src.app.core.utils.user_context.crud_users") as mock_crud,
+        ):
+            mock_crud.get = AsyncMock(return_value=None)
+            assert await get_user_context(mock_db, "ghost@example.com") is None
+
+        assert mock_crud.get.await_args.kwargs["email"] == "ghost@example.com"
+        context_cache.client.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_optional_user_is_read_from_token_claims(self, mock_db):
+        """Test that a token carrying user claims identifies the user without any lookup."""
+        with patch.object(security, "ACCESS_TOKEN_USER_CLAIMS", True):
+            token = await create_access_token(create_user_claims(USER))
+
+        request = Mock()
+        request.headers = {"Authorization": f"Bearer {token}"}
+        with (
+            patch.object(dependencies, "verify_token", AsyncMock(return_value=Mock(username_or_email="alice"))),
+            patch.object(dependencies, "get_user_context", AsyncMock()) as mock_get_user_context,
+        ):
+            user = await get_optional_user(request, mock_db)
+
+        assert user == {"id": 1, "username": "alice", "tier_id": 2, "is_superuser": False}
+        mock_get_user_context.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_user_claims_are_opt_in(self):
+        """Test that tokens only carry the subject unless user claims are enabled."""
+        token = await create_access_token(create_user_claims(USER))
+
+        assert create_user_claims(USER) == {"sub": "alice"}
+        assert decode_user_claims(token) is None